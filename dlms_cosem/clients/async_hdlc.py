@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+from typing import *
+
+import attr
+
+from dlms_cosem.protocol.hdlc import connection, exchange, state
+from dlms_cosem.protocol.hdlc.connection import make_hdlc_connection
+
+LOG = logging.getLogger(__name__)
+
+# Read as much as is available, up to this, each time more data is needed.
+READ_SIZE = 4096
+
+
+class _PipeWriter(asyncio.BaseProtocol):
+    """
+    Protocol for a file descriptor opened with `loop.connect_write_pipe`. Has the
+    `write`, `drain` and `close` methods of `asyncio.StreamWriter` that the client
+    uses, so data written to a serial port is flow controlled the same way.
+    """
+
+    def __init__(self):
+        self.transport: Optional[asyncio.WriteTransport] = None
+        self._paused = False
+        self._resumed: Optional[asyncio.Future] = None
+        self._lost: Optional[Exception] = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self._lost = exc or ConnectionError("File descriptor closed")
+        self.resume_writing()
+
+    def pause_writing(self):
+        self._paused = True
+
+    def resume_writing(self):
+        self._paused = False
+        if self._resumed is not None and not self._resumed.done():
+            self._resumed.set_result(None)
+
+    def write(self, data: bytes):
+        self.transport.write(data)
+
+    async def drain(self):
+        if self._lost is not None:
+            raise self._lost
+        if self._paused:
+            self._resumed = asyncio.get_running_loop().create_future()
+            await self._resumed
+            if self._lost is not None:
+                raise self._lost
+
+    def close(self):
+        self.transport.close()
+
+
+@attr.s(auto_attribs=True)
+class AsyncHdlcClient:
+    """
+    HDLC client for asyncio. Drives a HdlcConnection over a stream, either a TCP
+    connection (`open_tcp`) or the file descriptor of a serial port (`open_fd`).
+
+    All I/O is done on the event loop so many clients can run concurrently in one
+    process. If no data is received within `timeout` seconds when a response is
+    expected the exchange sends the last frames again.
+    """
+
+    hdlc_connection: connection.HdlcConnection
+    reader: asyncio.StreamReader
+    writer: Union[asyncio.StreamWriter, _PipeWriter]
+    timeout: float = attr.ib(default=2.0)
+    # A file descriptor is read and written through separate pipe transports.
+    _read_transport: Optional[asyncio.ReadTransport] = attr.ib(
+        default=None, repr=False
+    )
+
+    @classmethod
+    async def open_tcp(cls, host: str, port: int, timeout: float = 2.0, **kwargs):
+        """
+        :param kwargs: Addresses and HDLC parameters, see `make_hdlc_connection`
+        """
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout
+        )
+        return cls(make_hdlc_connection(**kwargs), reader, writer, timeout)
+
+    @classmethod
+    async def open_fd(cls, fd: int, timeout: float = 2.0, **kwargs):
+        """
+        Uses an already opened and configured serial port, or any other character
+        device like a pty. The client takes ownership of the file descriptor.
+
+        :param kwargs: Addresses and HDLC parameters, see `make_hdlc_connection`
+        """
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        read_transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader),
+            os.fdopen(fd, "rb", buffering=0),
+        )
+        _, writer = await loop.connect_write_pipe(
+            _PipeWriter, os.fdopen(os.dup(fd), "wb", buffering=0)
+        )
+        return cls(
+            make_hdlc_connection(**kwargs),
+            reader,
+            writer,
+            timeout,
+            read_transport=read_transport,
+        )
+
+    async def connect(self):
+        """
+        Sets up the HDLC Connection by sending a SNRM request.
+        """
+        ua_response = await self._run(exchange.connect(self.hdlc_connection))
+        LOG.info(f"Received {ua_response!r}")
+        return ua_response
+
+    async def disconnect(self):
+        """
+        Sends a DisconnectFrame
+        """
+        return await self._run(exchange.disconnect(self.hdlc_connection))
+
+    async def send(self, telegram: bytes) -> bytes:
+        """
+        Sends the APDU and returns the response APDU when received in full.
+        """
+        response = await self._run(
+            exchange.send_information(self.hdlc_connection, telegram)
+        )
+        return bytes(response)
+
+    async def close(self):
+        self.writer.close()
+        if self._read_transport is not None:
+            self._read_transport.close()
+        elif hasattr(self.writer, "wait_closed"):
+            await self.writer.wait_closed()
+
+    async def _run(self, hdlc_exchange: exchange.Exchange):
+        to_write = next(hdlc_exchange)
+        while True:
+            if to_write:
+                await self._write_bytes(to_write)
+            try:
+                to_write = hdlc_exchange.send(await self._next_event())
+            except StopIteration as done:
+                return done.value
+
+    async def _next_event(self):
+        while True:
+            event = self.hdlc_connection.next_event()
+            if event is state.NEED_DATA:
+                try:
+                    in_bytes = await asyncio.wait_for(
+                        self.reader.read(READ_SIZE), self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    LOG.info(f"No data received within {self.timeout}s")
+                    return state.TIMEOUT
+                if not in_bytes:
+                    raise ConnectionError("Connection closed while reading HDLC frame")
+                LOG.debug(f"Received: {in_bytes!r}")
+                self.hdlc_connection.receive_data(in_bytes)
+                continue
+            LOG.info(f"Received {event!r}")
+            return event
+
+    async def _write_bytes(self, to_write: bytes):
+        LOG.debug(f"Sending: {to_write!r}")
+        self.writer.write(to_write)
+        await self.writer.drain()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            await self.disconnect()
+        finally:
+            await self.close()
@@ -0,0 +1,233 @@
+import collections
+import logging
+from concurrent.futures import Future
+from typing import *
+
+import attr
+import serial
+
+from dlms_cosem.clients import serial_reader
+from dlms_cosem.protocol.hdlc import (
+    address,
+    connection,
+    exchange,
+    fields,
+    segmentation,
+    state,
+)
+
+LOG = logging.getLogger(__name__)
+
+
+class BusError(Exception):
+    """Error on the multi-drop bus"""
+
+
+@attr.s(auto_attribs=True)
+class _Job:
+    exchange: exchange.Exchange
+    future: Future
+    # Bytes the exchange wants written. None until the exchange is started.
+    to_write: Optional[bytes] = None
+
+
+def _send_information(
+    hdlc_connection: connection.HdlcConnection, telegram: bytes
+) -> exchange.Exchange:
+    """
+    The response of the exchange is a view into the receive buffers, it is copied so
+    the future holds bytes.
+    """
+    response = yield from exchange.send_information(hdlc_connection, telegram)
+    return bytes(response)
+
+
+@attr.s(auto_attribs=True)
+class BusMeter:
+    """
+    A meter on the bus. Each meter has its own HDLC connection and queue of exchanges.
+    Meters with a lower priority value are served first.
+    """
+
+    physical_address: int
+    hdlc_connection: connection.HdlcConnection
+    priority: int = 0
+    jobs: Deque[_Job] = attr.ib(factory=collections.deque, repr=False)
+
+
+@attr.s(auto_attribs=True)
+class SerialHdlcBus:
+    """
+    Shares one serial port between several meters on a multi-drop bus, like RS-485.
+    Each meter is addressed by its physical address and has its own HdlcConnection.
+
+    Work is queued per meter with `connect`, `send` and `disconnect`, which return a
+    `concurrent.futures.Future` that is resolved when the exchange is completed. The
+    queued work is carried out by `run`.
+
+    The bus is half duplex so only one meter can be talking at a time. The scheduler
+    moves to the next meter every time the current exchange has received the answer
+    to what it sent, so a long exchange with one meter (for example a segmented load
+    profile) doesn't block the others. The meter to serve is picked round-robin
+    among the meters with the lowest priority value that has queued work.
+    """
+
+    serial_port: str
+    client_logical_address: int = attr.ib(default=16)
+    serial_baud_rate: int = attr.ib(default=9600)
+    # Proposed in the SNRM. The values used are negotiated with each meter.
+    max_information_length: int = attr.ib(
+        default=segmentation.DEFAULT_MAX_INFORMATION_LENGTH
+    )
+    window_size: int = attr.ib(default=1)
+    # Time a meter has to start answering. The time to receive the frame at the
+    # baud rate is added.
+    response_timeout: float = attr.ib(default=serial_reader.DEFAULT_RESPONSE_TIMEOUT)
+    # Times a frame is sent again when a meter doesn't answer.
+    max_retries: int = attr.ib(default=3)
+    _serial: serial.Serial = attr.ib(
+        default=attr.Factory(
+            lambda self: serial.Serial(
+                port=self.serial_port,
+                baudrate=self.serial_baud_rate,
+                timeout=self.response_timeout,
+            ),
+            takes_self=True,
+        )
+    )
+    _reader: serial_reader.SerialFrameReader = attr.ib(
+        default=attr.Factory(
+            lambda self: serial_reader.SerialFrameReader(
+                self._serial, response_timeout=self.response_timeout
+            ),
+            takes_self=True,
+        ),
+        repr=False,
+    )
+    meters: Dict[int, BusMeter] = attr.ib(factory=dict)
+    _order: Deque[BusMeter] = attr.ib(factory=collections.deque, repr=False)
+
+    @property
+    def client_hdlc_address(self):
+        return address.HdlcAddress(
+            logical_address=self.client_logical_address,
+            physical_address=None,
+            address_type="client",
+        )
+
+    def add_meter(
+        self, physical_address: int, logical_address: int = 1, priority: int = 0
+    ) -> BusMeter:
+        if physical_address in self.meters:
+            raise BusError(f"Meter with physical address {physical_address} exists")
+
+        meter = BusMeter(
+            physical_address=physical_address,
+            hdlc_connection=connection.HdlcConnection(
+                client_address=self.client_hdlc_address,
+                server_address=address.HdlcAddress(
+                    logical_address=logical_address,
+                    physical_address=physical_address,
+                    address_type="server",
+                ),
+                parameters=fields.HdlcParameters(
+                    max_information_length_transmit=self.max_information_length,
+                    max_information_length_receive=self.max_information_length,
+                    window_size_transmit=self.window_size,
+                    window_size_receive=self.window_size,
+                ),
+                max_retries=self.max_retries,
+            ),
+            priority=priority,
+        )
+        self.meters[physical_address] = meter
+        self._order.append(meter)
+        return meter
+
+    def connect(self, physical_address: int) -> Future:
+        meter = self._meter(physical_address)
+        return self._queue(meter, exchange.connect, meter.hdlc_connection)
+
+    def send(self, physical_address: int, telegram: bytes) -> Future:
+        meter = self._meter(physical_address)
+        return self._queue(meter, _send_information, meter.hdlc_connection, telegram)
+
+    def disconnect(self, physical_address: int) -> Future:
+        meter = self._meter(physical_address)
+        return self._queue(meter, exchange.disconnect, meter.hdlc_connection)
+
+    def _meter(self, physical_address: int) -> BusMeter:
+        try:
+            return self.meters[physical_address]
+        except KeyError:
+            raise BusError(f"No meter with physical address {physical_address}")
+
+    @staticmethod
+    def _queue(meter: BusMeter, exchange_function, *args) -> Future:
+        """
+        Exchanges are generators so nothing is done until the job is started. The
+        exchange sees the connection state left by the exchanges queued before it.
+        """
+        future = Future()
+        meter.jobs.append(_Job(exchange=exchange_function(*args), future=future))
+        return future
+
+    def run(self):
+        """
+        Carries out all queued work.
+        """
+        while True:
+            meter = self.next_meter()
+            if meter is None:
+                return
+            self.step(meter)
+
+    def next_meter(self) -> Optional[BusMeter]:
+        pending = [meter for meter in self._order if meter.jobs]
+        if not pending:
+            return None
+        priority = min(meter.priority for meter in pending)
+        for _ in range(len(self._order)):
+            meter = self._order[0]
+            self._order.rotate(-1)
+            if meter.jobs and meter.priority == priority:
+                return meter
+
+    def step(self, meter: BusMeter):
+        """
+        Writes what the current exchange of the meter has to send and reads until
+        the exchange has something new to send or is done. After that the line is
+        idle and another meter can be served.
+        """
+        job = meter.jobs[0]
+        try:
+            if job.to_write is None:
+                job.to_write = next(job.exchange)
+            self._write_bytes(job.to_write)
+            to_write = b""
+            while not to_write:
+                to_write = job.exchange.send(self._next_event(meter))
+            job.to_write = to_write
+        except StopIteration as done:
+            meter.jobs.popleft()
+            job.future.set_result(done.value)
+        except Exception as e:
+            LOG.warning(f"Exchange with meter {meter.physical_address} failed: {e!r}")
+            meter.jobs.popleft()
+            job.future.set_exception(e)
+
+    def _next_event(self, meter: BusMeter):
+        try:
+            event = self._reader.next_event(meter.hdlc_connection)
+        except serial_reader.ResponseTimeout:
+            LOG.info(f"No response from meter {meter.physical_address}")
+            return state.TIMEOUT
+        LOG.info(f"Received from {meter.physical_address}: {event!r}")
+        return event
+
+    def _write_bytes(self, to_write: bytes):
+        LOG.debug(f"Sending: {to_write!r}")
+        self._serial.write(to_write)
+
+    def close(self):
+        self._serial.close()
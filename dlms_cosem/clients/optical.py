@@ -0,0 +1,82 @@
+import logging
+import time
+from typing import *
+
+import serial
+
+from dlms_cosem.clients import serial_reader
+from dlms_cosem.protocol import iec62056_21
+
+LOG = logging.getLogger(__name__)
+
+# Time the meter may take to answer the sign-on request.
+DEFAULT_REACTION_TIMEOUT = 1.5
+
+# Time to wait after the acknowledgement before talking at the new baud rate, so
+# the meter has switched.
+DEFAULT_SWITCH_DELAY = 0.2
+
+
+def sign_on(
+    port: serial.Serial,
+    device_address: str = "",
+    max_baud_rate: int = 19200,
+    reaction_timeout: float = DEFAULT_REACTION_TIMEOUT,
+    switch_delay: float = DEFAULT_SWITCH_DELAY,
+) -> int:
+    """
+    Runs the IEC 62056-21 mode E opening sequence on an open serial port and leaves
+    the port configured for HDLC at the selected baud rate.
+
+    :param device_address: Address of the meter in the request message, usually its
+        serial number. Can be left empty on an optical port.
+    :param max_baud_rate: The highest baud rate to select. The meter may support
+        less.
+    :return: The selected baud rate.
+    :raises iec62056_21.SignOnError: If the meter doesn't answer or doesn't support
+        HDLC.
+    """
+    port.baudrate = iec62056_21.SIGN_ON_BAUD_RATE
+    port.bytesize = serial.SEVENBITS
+    port.parity = serial.PARITY_EVEN
+    port.stopbits = serial.STOPBITS_ONE
+    port.timeout = reaction_timeout + serial_reader.transfer_time(
+        iec62056_21.MAX_IDENTIFICATION_LENGTH, iec62056_21.SIGN_ON_BAUD_RATE
+    )
+    port.reset_input_buffer()
+
+    request = iec62056_21.request_message(device_address)
+    LOG.debug(f"Sending: {request!r}")
+    port.write(request)
+    port.flush()
+
+    # At 300 baud reading a byte at a time costs nothing.
+    answer = port.read_until(
+        iec62056_21.CR_LF, iec62056_21.MAX_IDENTIFICATION_LENGTH
+    )
+    LOG.debug(f"Received: {answer!r}")
+    if not answer:
+        raise iec62056_21.SignOnError(
+            f"No answer to sign-on request within {port.timeout:.2f}s"
+        )
+    identification = iec62056_21.IdentificationMessage.from_bytes(answer)
+    LOG.info(f"Meter identification: {identification!r}")
+    if not identification.supports_hdlc:
+        raise iec62056_21.SignOnError(
+            f"Meter {identification.identification!r} does not support mode E"
+        )
+
+    baud_rate = iec62056_21.select_baud_rate(identification, max_baud_rate)
+    acknowledgement = iec62056_21.acknowledgement_message(baud_rate)
+    LOG.debug(f"Sending: {acknowledgement!r}")
+    port.write(acknowledgement)
+    # The acknowledgement must be sent at 300 baud before the port is switched.
+    port.flush()
+    if switch_delay:
+        time.sleep(switch_delay)
+
+    port.baudrate = baud_rate
+    port.bytesize = serial.EIGHTBITS
+    port.parity = serial.PARITY_NONE
+    LOG.info(f"Switched to HDLC at {baud_rate} baud")
+    return baud_rate
@@ -1,13 +1,17 @@
-from typing import Optional
+from typing import MutableMapping, Optional
 import logging
 import attr
 import serial
 
+from dlms_cosem.clients import optical, serial_reader
+from dlms_cosem.protocol import iec62056_21
 from dlms_cosem.protocol.hdlc import (
     address,
     state,
     connection,
-    frames,
+    exchange,
+    fields,
+    segmentation,
     exceptions as hdlc_exception,
 )
 
@@ -30,10 +34,37 @@ class SerialHdlcClient:
     serial_baud_rate: int = attr.ib(default=9600)
     server_physical_address: Optional[int] = attr.ib(default=None)
     client_physical_address: Optional[int] = attr.ib(default=None)
+    # Proposed in the SNRM. The values used are negotiated with the server.
+    max_information_length: int = attr.ib(
+        default=segmentation.DEFAULT_MAX_INFORMATION_LENGTH
+    )
+    window_size: int = attr.ib(default=1)
+    # Time the meter has to start answering. The time to receive the frame at the
+    # baud rate is added.
+    response_timeout: float = attr.ib(default=serial_reader.DEFAULT_RESPONSE_TIMEOUT)
+    # Times a frame is sent again when there is no response.
+    max_retries: int = attr.ib(default=3)
+    # Sign on with IEC 62056-21 mode E before setting up HDLC, for meters on the
+    # optical port that start at 300 baud. `serial_baud_rate` is then the highest
+    # baud rate to select.
+    optical_sign_on: bool = attr.ib(default=False)
+    # Device address in the sign-on request, usually the serial number of the meter.
+    device_address: str = attr.ib(default="")
+    # Baud rate to start the selection from for each meter, by device address. Can
+    # be any mapping, like a shelve to keep the rates between runs.
+    baud_rate_cache: MutableMapping[str, int] = attr.ib(factory=dict)
     hdlc_connection: connection.HdlcConnection = attr.ib(
         default=attr.Factory(
             lambda self: connection.HdlcConnection(
-                self.server_hdlc_address, self.client_hdlc_address
+                client_address=self.client_hdlc_address,
+                server_address=self.server_hdlc_address,
+                parameters=fields.HdlcParameters(
+                    max_information_length_transmit=self.max_information_length,
+                    max_information_length_receive=self.max_information_length,
+                    window_size_transmit=self.window_size,
+                    window_size_receive=self.window_size,
+                ),
+                max_retries=self.max_retries,
             ),
             takes_self=True,
         )
@@ -41,15 +72,22 @@ class SerialHdlcClient:
     _serial: serial.Serial = attr.ib(
         default=attr.Factory(
             lambda self: serial.Serial(
-                port=self.serial_port, baudrate=self.serial_baud_rate, timeout=2
+                port=self.serial_port,
+                baudrate=self.serial_baud_rate,
+                timeout=self.response_timeout,
             ),
             takes_self=True,
         )
     )
-
-    _send_buffer: list = attr.ib(factory=list)
-
-
+    _reader: serial_reader.SerialFrameReader = attr.ib(
+        default=attr.Factory(
+            lambda self: serial_reader.SerialFrameReader(
+                self._serial, response_timeout=self.response_timeout
+            ),
+            takes_self=True,
+        ),
+        repr=False,
+    )
 
     @property
     def server_hdlc_address(self):
@@ -72,21 +110,46 @@ class SerialHdlcClient:
         Sets up the HDLC Connection by sending a SNRM request.
 
         """
-        # TODO: Implement hdlc parameter negotiation in SNRM frame
-
         if self.hdlc_connection.state.current_state != state.NOT_CONNECTED:
             raise ClientError(
                 f"Client tried to initiate a HDLC connection but connection state was "
                 f"not in NOT_CONNECTED but in "
                 f"state={self.hdlc_connection.state.current_state}"
             )
-        snrm = frames.SetNormalResponseModeFrame(
-            destination_address=self.server_hdlc_address,
-            source_address=self.client_hdlc_address,
+        if self.optical_sign_on:
+            return self._connect_optical()
+        ua_response = self._run(exchange.connect(self.hdlc_connection))
+        LOG.info(f"Received {ua_response!r}")
+        return ua_response
+
+    def _connect_optical(self):
+        """
+        Signs on and sets up the HDLC connection at the selected baud rate.
+
+        The rate that worked is cached for the meter so the next sign-on selects it
+        directly. If the meter doesn't answer at the selected rate, which happens
+        with optical heads that can't keep up, the next lower rate is cached
+        instead. The meter stays at the failed rate until its inactivity timeout,
+        so it is not retried at once.
+        """
+        max_baud_rate = self.baud_rate_cache.get(
+            self.device_address, self.serial_baud_rate
         )
-        self._send_buffer.append(snrm)
-        ua_response = self._drain_send_buffer()[0]
+        baud_rate = optical.sign_on(self._serial, self.device_address, max_baud_rate)
+        try:
+            ua_response = self._run(exchange.connect(self.hdlc_connection))
+        except hdlc_exception.TransmissionFailed:
+            lower = iec62056_21.lower_baud_rate(baud_rate)
+            if self.device_address and lower is not None:
+                LOG.warning(
+                    f"No HDLC response at {baud_rate} baud, will use {lower} baud "
+                    f"for meter {self.device_address}"
+                )
+                self.baud_rate_cache[self.device_address] = lower
+            raise
         LOG.info(f"Received {ua_response!r}")
+        if self.device_address:
+            self.baud_rate_cache[self.device_address] = baud_rate
         return ua_response
 
     def disconnect(self):
@@ -94,43 +157,23 @@ class SerialHdlcClient:
         Sends a DisconnectFrame
         :return:
         """
-        disc = frames.DisconnectFrame(
-            destination_address=self.server_hdlc_address,
-            source_address=self.client_hdlc_address,
-        )
-        self._send_buffer.append(disc)
-        response = self._drain_send_buffer()[0]
-        return response
+        return self._run(exchange.disconnect(self.hdlc_connection))
 
-    def _drain_send_buffer(self):
-        """
-        Messages to send might need to be fragmented and to handle the flow we can split all
-        data that is needed to be sent into several frames to be send and when this is
-        called it will make sure all is sent according to the protocol.
-        """
-        response_frames = list()
-        while self._send_buffer:
-            frame = self._send_buffer.pop(0)  # FIFO behavior
-            self._write_frame(frame)
-            if self.hdlc_connection.state.current_state in state.RECEIVE_STATES:
-                response = self._next_event()
-                response_frames.append(response)
-        return response_frames
+    def _run(self, hdlc_exchange: exchange.Exchange):
+        return exchange.run(hdlc_exchange, self._write_bytes, self._next_event)
 
     def _next_event(self):
         """
         Will read the serial line until a proper response event is read.
         :return:
         """
-        while True:
-            # If we already have a complete event buffered internally, just
-            # return that. Otherwise, read some data, add it to the internal
-            # buffer, and then try again.
-            event = self.hdlc_connection.next_event()
-            if event is state.NEED_DATA:
-                self.hdlc_connection.receive_data(self._read_frame())
-                continue
-            return event
+        try:
+            event = self._reader.next_event(self.hdlc_connection)
+        except serial_reader.ResponseTimeout as e:
+            LOG.info(f"Timeout: {e}")
+            return state.TIMEOUT
+        LOG.info(f"Received {event!r}")
+        return event
 
     def send(self, telegram: bytes) -> bytes:
         """
@@ -138,52 +181,21 @@ class SerialHdlcClient:
         The send is the only public function that will return the response data
         when received in full.
         Send will handle fragmentation of data if data is to large to be sent in a
-        single HDLC frame.
+        single HDLC frame. Each segment of the request is acknowledged by the server
+        and a segmented response is received by requesting each following segment
+        with a RR frame.
         :param telegram:
         :return:
         """
-        current_state = self.hdlc_connection.state.current_state
-        if not current_state == state.IDLE:
-            raise hdlc_exception.LocalProtocolError(
-                f"Connection is not in state IDLE and cannot send any data. "
-                f"Current state is {current_state}"
-            )
-
-        info = self.generate_information_request(telegram)
-        self._send_buffer.append(info)
-        response: frames.InformationFrame = self._drain_send_buffer()[0]
-
-        return response.payload
-
-    def generate_information_request(self, payload):
-        return frames.InformationFrame(
-            destination_address=self.server_hdlc_address,
-            source_address=self.client_hdlc_address,
-            payload=payload,
-            send_sequence_number=self.hdlc_connection.state.client_ssn,
-            receive_sequence_number=self.hdlc_connection.state.client_rsn,
-            response_frame=False
+        response = self._run(
+            exchange.send_information(self.hdlc_connection, telegram)
         )
-
-    def _write_frame(self, frame):
-        frame_bytes = self.hdlc_connection.send(frame)
-        LOG.info(f"Sending {frame!r}")
-        self._write_bytes(frame_bytes)
+        return bytes(response)
 
     def _write_bytes(self, to_write: bytes):
         LOG.debug(f"Sending: {to_write!r}")
         self._serial.write(to_write)
 
-    def _read_frame(self) -> bytes:
-        in_bytes = self._serial.read_until(frames.HDLC_FLAG)
-
-        if in_bytes == frames.HDLC_FLAG:
-            # We found the first HDLC Frame Flag. We should read until the last one.
-            in_bytes += self._serial.read_until(frames.HDLC_FLAG)
-
-        LOG.debug(f"Received: {in_bytes!r}")
-        return in_bytes
-
     def __enter__(self):
         self.connect()
         return self
@@ -0,0 +1,91 @@
+"""
+Reading HDLC frames from a serial port.
+
+The HdlcConnection knows from the frame format field how long the frame being
+received is, so the reader asks the serial port for exactly the missing bytes. The
+read returns as soon as the frame is complete, each read is done in as few system
+calls as the data arrives in, and there is no need to look for the closing flag.
+
+The timeout of each read is the time it takes to transfer the missing bytes at the
+baud rate of the port plus a margin: the time the meter may take to start answering
+for the first read and a short pause between characters for the reads that follow.
+A meter that does not answer is detected after the response timeout instead of a
+fixed long timeout.
+"""
+from typing import *
+
+import attr
+import serial
+
+from dlms_cosem.protocol.hdlc import connection, state
+
+# Start bit, 8 data bits and stop bit.
+BITS_PER_CHARACTER = 10
+
+DEFAULT_RESPONSE_TIMEOUT = 1.0
+DEFAULT_INTER_CHARACTER_TIMEOUT = 0.05
+
+# Largest number of bytes read from the port at once.
+READ_SIZE = 4096
+
+
+class ResponseTimeout(TimeoutError):
+    """No complete frame was received in time"""
+
+
+def transfer_time(byte_count: int, baud_rate: int) -> float:
+    """
+    Seconds it takes to transfer `byte_count` bytes at `baud_rate`.
+    """
+    return byte_count * BITS_PER_CHARACTER / baud_rate
+
+
+@attr.s(auto_attribs=True)
+class SerialFrameReader:
+    """
+    Reads from a serial port into a HdlcConnection until the connection has an event.
+    """
+
+    serial_port: serial.Serial
+    response_timeout: float = attr.ib(default=DEFAULT_RESPONSE_TIMEOUT)
+    inter_character_timeout: float = attr.ib(default=DEFAULT_INTER_CHARACTER_TIMEOUT)
+
+    def next_event(self, hdlc_connection: connection.HdlcConnection):
+        """
+        Returns the next event of the connection, reading from the port as long as
+        the connection needs data.
+
+        :raises ResponseTimeout: If the frame is not received in time.
+        """
+        margin = self.response_timeout
+        while True:
+            event = hdlc_connection.next_event()
+            if event is not state.NEED_DATA:
+                return event
+            missing = hdlc_connection.missing_bytes
+            in_bytes = self.read(missing, margin)
+            if not in_bytes:
+                raise ResponseTimeout(
+                    f"No data received within {self.serial_port.timeout:.3f}s while "
+                    f"waiting for {missing} bytes"
+                )
+            hdlc_connection.receive_data(in_bytes)
+            margin = self.inter_character_timeout
+
+    def read(self, byte_count: int, margin: float) -> bytes:
+        """
+        Reads `byte_count` bytes, or less if they are not received within the time
+        it takes to transfer them plus `margin`. Bytes that are already waiting
+        after that are read as well.
+        """
+        port = self.serial_port
+        timeout = margin + transfer_time(byte_count, port.baudrate)
+        # Changing the timeout reconfigures the port, so only do it when needed.
+        if port.timeout != timeout:
+            port.timeout = timeout
+        in_bytes = port.read(min(byte_count, READ_SIZE))
+        if in_bytes:
+            waiting = port.in_waiting
+            if waiting:
+                in_bytes += port.read(min(waiting, READ_SIZE))
+        return in_bytes
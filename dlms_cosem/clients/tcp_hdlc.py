@@ -0,0 +1,317 @@
+import collections
+import contextlib
+import logging
+import socket
+import threading
+import time
+from typing import *
+
+import attr
+
+from dlms_cosem.protocol.hdlc import connection, exceptions, exchange, state
+from dlms_cosem.protocol.hdlc.connection import make_hdlc_connection
+
+LOG = logging.getLogger(__name__)
+
+# Read as much as is available, up to this, each time more data is needed.
+READ_SIZE = 4096
+
+
+class PoolTimeout(Exception):
+    """No client became available in the pool in time"""
+
+
+class PoolClosed(Exception):
+    """The pool is closed and hands out no more clients"""
+
+
+@attr.s(auto_attribs=True)
+class TcpHdlcClient:
+    """
+    HDLC client over TCP, for meters behind a gateway or terminal server that
+    forwards the HDLC frames unchanged.
+    """
+
+    host: str
+    port: int
+    client_logical_address: int
+    server_logical_address: int
+    server_physical_address: Optional[int] = attr.ib(default=None)
+    client_physical_address: Optional[int] = attr.ib(default=None)
+    max_information_length: int = attr.ib(default=128)
+    window_size: int = attr.ib(default=1)
+    max_retries: int = attr.ib(default=3)
+    timeout: float = attr.ib(default=10.0)
+    hdlc_connection: connection.HdlcConnection = attr.ib(
+        default=attr.Factory(
+            lambda self: make_hdlc_connection(
+                client_logical_address=self.client_logical_address,
+                server_logical_address=self.server_logical_address,
+                server_physical_address=self.server_physical_address,
+                client_physical_address=self.client_physical_address,
+                max_information_length=self.max_information_length,
+                window_size=self.window_size,
+                max_retries=self.max_retries,
+            ),
+            takes_self=True,
+        )
+    )
+    _socket: Optional[socket.socket] = attr.ib(default=None, repr=False)
+
+    @property
+    def is_connected(self) -> bool:
+        """
+        True if the TCP connection is open and the HDLC connection is ready to send.
+        """
+        return (
+            self._socket is not None
+            and self.hdlc_connection.state.current_state == state.IDLE
+        )
+
+    def open(self):
+        if self._socket is None:
+            self._socket = socket.create_connection(
+                (self.host, self.port), timeout=self.timeout
+            )
+
+    def connect(self):
+        """
+        Opens the TCP connection if needed and sets up the HDLC Connection by sending
+        a SNRM request.
+        """
+        self.open()
+        ua_response = self._run(exchange.connect(self.hdlc_connection))
+        LOG.info(f"Received {ua_response!r}")
+        return ua_response
+
+    def disconnect(self):
+        """
+        Sends a DisconnectFrame
+        """
+        return self._run(exchange.disconnect(self.hdlc_connection))
+
+    def send(self, telegram: bytes) -> bytes:
+        """
+        Sends the APDU and returns the response APDU when received in full.
+        """
+        return bytes(
+            self._run(exchange.send_information(self.hdlc_connection, telegram))
+        )
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def _run(self, hdlc_exchange: exchange.Exchange):
+        return exchange.run(hdlc_exchange, self._write_bytes, self._next_event)
+
+    def _next_event(self):
+        while True:
+            event = self.hdlc_connection.next_event()
+            if event is state.NEED_DATA:
+                try:
+                    in_bytes = self._socket.recv(READ_SIZE)
+                except socket.timeout:
+                    LOG.info(f"No data received within {self.timeout}s")
+                    return state.TIMEOUT
+                if not in_bytes:
+                    raise ConnectionError("Connection closed while reading HDLC frame")
+                LOG.debug(f"Received: {in_bytes!r}")
+                self.hdlc_connection.receive_data(in_bytes)
+                continue
+            LOG.info(f"Received {event!r}")
+            return event
+
+    def _write_bytes(self, to_write: bytes):
+        LOG.debug(f"Sending: {to_write!r}")
+        self._socket.sendall(to_write)
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.disconnect()
+        finally:
+            self.close()
+
+
+@attr.s(auto_attribs=True)
+class _IdleClient:
+    client: TcpHdlcClient
+    released_at: float
+
+
+@attr.s(auto_attribs=True)
+class TcpHdlcPool:
+    """
+    Keeps connected TcpHdlcClients per endpoint so the TCP connection and the HDLC
+    connection (SNRM/UA) are set up once and reused by the following callers.
+
+    An endpoint is the host and port together with the HDLC addresses and parameters
+    of the client, so several meters behind the same gateway have separate pools.
+    At most `max_size` clients are kept per endpoint, both handed out and idle. A
+    caller that needs a client when all are handed out waits for one to be released.
+    Clients that have been idle longer than `max_idle_time` seconds are
+    disconnected and closed every time a client is acquired or released, before
+    the meter or the gateway times out the connection. A pool that is not used
+    for a while needs `expire_idle` to be called, for example from a timer.
+
+    The pool is thread safe. A client is only used by one caller at a time.
+    """
+
+    max_size: int = attr.ib(default=4)
+    max_idle_time: float = attr.ib(default=30.0)
+    client_factory: Callable[..., TcpHdlcClient] = attr.ib(default=TcpHdlcClient)
+    # Used to time idle clients.
+    clock: Callable[[], float] = attr.ib(default=time.monotonic, repr=False)
+    _idle: DefaultDict[Tuple, Deque[_IdleClient]] = attr.ib(
+        factory=lambda: collections.defaultdict(collections.deque), repr=False
+    )
+    _sizes: Counter = attr.ib(factory=collections.Counter, repr=False)
+    # Endpoint of each client of the pool, by id of the client.
+    _endpoints: Dict[int, Tuple] = attr.ib(factory=dict, repr=False)
+    _condition: threading.Condition = attr.ib(factory=threading.Condition, repr=False)
+    # Set by `close`. Clients released after that are closed.
+    _closed: bool = attr.ib(default=False, init=False, repr=False)
+
+    @staticmethod
+    def endpoint(host: str, port: int, **kwargs) -> Tuple:
+        return (host, port, tuple(sorted(kwargs.items())))
+
+    @contextlib.contextmanager
+    def client(
+        self, host: str, port: int, timeout: Optional[float] = None, **kwargs
+    ) -> Iterator[TcpHdlcClient]:
+        """
+        Hands out a connected client for the endpoint and releases it afterwards.
+
+        If the caller raises, the state of the connection is unknown so the client
+        is closed instead of being put back in the pool.
+
+        :param timeout: Seconds to wait for a client when all are handed out. Waits
+            forever if None.
+        :param kwargs: Addresses and HDLC parameters, see `TcpHdlcClient`
+        """
+        client = self.acquire(host, port, timeout=timeout, **kwargs)
+        try:
+            yield client
+        except BaseException:
+            self.discard(client)
+            raise
+        self.release(client)
+
+    def acquire(
+        self, host: str, port: int, timeout: Optional[float] = None, **kwargs
+    ) -> TcpHdlcClient:
+        endpoint = self.endpoint(host, port, **kwargs)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.expire_idle()
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise PoolClosed(f"Pool for {host}:{port} is closed")
+                idle = self._idle[endpoint]
+                if idle:
+                    # The most recently used client is the least likely to have
+                    # been timed out by the other end.
+                    return idle.pop().client
+                if self._sizes[endpoint] < self.max_size:
+                    self._sizes[endpoint] += 1
+                    client = self.client_factory(host=host, port=port, **kwargs)
+                    self._endpoints[id(client)] = endpoint
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeout(
+                        f"All {self.max_size} clients for {host}:{port} are in use"
+                    )
+                self._condition.wait(remaining)
+
+        # Connect outside the lock so other callers are not held up.
+        try:
+            client.connect()
+        except BaseException:
+            self.discard(client)
+            raise
+        if not client.is_connected:
+            self.discard(client)
+            raise exceptions.LocalProtocolError(
+                f"Could not set up a HDLC connection to {host}:{port}"
+            )
+        return client
+
+    def release(self, client: TcpHdlcClient):
+        """
+        Puts the client back in the pool. A client that is no longer connected is
+        closed instead, and so is any client released after the pool is closed.
+        """
+        if not client.is_connected:
+            self.discard(client)
+            return
+        with self._condition:
+            closed = self._closed
+            if not closed:
+                self._idle[self._endpoints[id(client)]].append(
+                    _IdleClient(client, self.clock())
+                )
+                self._condition.notify()
+        if closed:
+            self._close_idle(client)
+        else:
+            self.expire_idle()
+
+    def discard(self, client: TcpHdlcClient):
+        """
+        Closes a handed out client and frees its place in the pool.
+        """
+        client.close()
+        with self._condition:
+            self._sizes[self._endpoints.pop(id(client))] -= 1
+            self._condition.notify()
+
+    def expire_idle(self):
+        """
+        Closes the clients that have been idle longer than `max_idle_time`.
+        """
+        oldest_allowed = self.clock() - self.max_idle_time
+        expired = list()
+        with self._condition:
+            for idle in self._idle.values():
+                # The oldest clients are first.
+                while idle and idle[0].released_at < oldest_allowed:
+                    expired.append(idle.popleft().client)
+        for client in expired:
+            self._close_idle(client)
+
+    def close(self):
+        """
+        Closes all idle clients. Handed out clients are closed when released and no
+        more clients are handed out.
+        """
+        with self._condition:
+            self._closed = True
+            # Callers waiting for a client get PoolClosed.
+            self._condition.notify_all()
+            idle_clients = [
+                idle_client.client
+                for idle in self._idle.values()
+                for idle_client in idle
+            ]
+            self._idle.clear()
+        for client in idle_clients:
+            self._close_idle(client)
+
+    def _close_idle(self, client: TcpHdlcClient):
+        """
+        Disconnects a client taken out of the pool and frees its place. Called
+        without holding the lock, so disconnecting doesn't hold up other callers.
+        """
+        try:
+            client.disconnect()
+        except (OSError, exceptions.LocalProtocolError, exceptions.HdlcException) as e:
+            LOG.info(f"Could not disconnect idle client {client!r}: {e!r}")
+        finally:
+            self.discard(client)
@@ -39,8 +39,26 @@ integer data. ex 0b10000010 -> 2 bytes after this is the integer. 0x820xff0xff =
 """
 
 import attr
+import functools
 import typing
-from dlms_cosem.protocol.dlms_data import DlmsDataFactory, DlmsData
+from dlms_cosem.protocol import compact_array
+from dlms_cosem.protocol.dlms_data import (
+    BitStringData,
+    CompactArrayData,
+    DataArray,
+    DataStructure,
+    DlmsData,
+    DlmsDataFactory,
+)
+
+# Data types holding other data. They are encoded as the number of elements
+# followed by the elements.
+CONTAINER_TYPES = (DataArray, DataStructure)
+
+# Limits for nested data, so malformed or hostile data can't make the decoder use
+# unbounded memory.
+DEFAULT_MAX_DEPTH = 32
+DEFAULT_MAX_ELEMENTS = 1_000_000
 
 
 def decode_variable_integer(bytes_input: bytes):
@@ -55,17 +73,47 @@ def decode_variable_integer(bytes_input: bytes):
     the bytes
     :return: First variable integer the function finds. and the residual bytes
     """
+    value, offset = decode_variable_integer_at(memoryview(bytes_input), 0)
+    return value, bytes_input[offset:]
 
-    # is the length encoded in single byte or mutliple?
-    is_mutliple_bytes = bool(bytes_input[0] & 0b10000000)
-    if is_mutliple_bytes:
-        length_length = int(bytes_input[0] & 0b01111111)
-        length = int(bytes_input[1:(length_length + 1)])
-        return length, bytes_input[length_length + 1:]
 
-    else:
-        length = int(bytes_input[0] & 0b01111111)
-        return length, bytes_input[1:]
+def decode_variable_integer_at(view: memoryview, offset: int) -> typing.Tuple[int, int]:
+    """
+    Decodes a variable integer starting at `offset`.
+
+    :return: The integer and the offset after it.
+    """
+    _check_available(view, offset + 1)
+    first_byte = view[offset]
+    if not first_byte & 0b10000000:
+        return first_byte, offset + 1
+
+    length_length = first_byte & 0b01111111
+    end = offset + 1 + length_length
+    _check_available(view, end)
+    return int.from_bytes(view[offset + 1 : end], "big"), end
+
+
+def encode_variable_integer(value: int) -> bytes:
+    """
+    Encodes an integer the way lengths are encoded in A-XDR. Values below 128 are
+    encoded in one byte. Larger values are encoded big endian after a byte holding
+    the number of bytes of the value with the leftmost bit set.
+    Ex 4095 -> 0b10000010, 0b00001111, 0b11111111
+    """
+    if value < 0:
+        raise ValueError(f"Cannot encode negative variable integer: {value}")
+    if value < 0b10000000:
+        return bytes((value,))
+    length = (value.bit_length() + 7) // 8
+    return bytes((0b10000000 | length,)) + value.to_bytes(length, "big")
+
+
+def _check_available(view: memoryview, end: int):
+    if end > len(view):
+        raise ValueError(
+            f"A-XDR data ends at {len(view)} bytes, needed {end} bytes to decode"
+        )
 
 
 @attr.s
@@ -100,131 +148,435 @@ class EncodingConf:
 
 
 class AXdrDecoder:
+    """
+    Decodes A-XDR data as described by an EncodingConf.
+
+    The decoder walks one memoryview of the data with an offset and never slices
+    off the rest of the data, so decoding is linear in the length of the data. Only
+    the bytes of each leaf value are copied, when they are handed to the class of
+    the value.
 
-    def __init__(self, encoding_conf):
+    Arrays and structures are decoded with an explicit stack of the open
+    containers instead of recursion, so the nesting depth is only limited by
+    `max_depth`. `max_elements` limits the number of elements of all arrays and
+    structures in one data value.
+
+    Compact arrays are decoded to NumPy arrays if NumPy is installed, see
+    `compact_array`. `use_numpy` can force or disable use of NumPy.
+    """
+
+    def __init__(
+        self,
+        encoding_conf,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        max_elements: int = DEFAULT_MAX_ELEMENTS,
+        use_numpy: typing.Optional[bool] = None,
+    ):
 
         self.encoding_conf: EncodingConf = encoding_conf
+        self.max_depth = max_depth
+        self.max_elements = max_elements
+        self.use_numpy = use_numpy
 
     def decode(self, bytes_data: bytes):
         """
         return a dict to instantiate the class with
         """
-        # print(bytes_data)
-        in_data = bytes_data[:]  # copy so we don't work in the actual data.
-        # print(in_data)
+        out_dict, _ = self.decode_at(memoryview(bytes_data), 0)
+        return out_dict
+
+    def decode_at(
+        self, view: memoryview, offset: int
+    ) -> typing.Tuple[typing.Dict[str, typing.Any], int]:
+        """
+        Decodes the attributes starting at `offset`.
 
+        :return: The dict to instantiate the class with and the offset after the
+            decoded data.
+        """
         out_dict = dict()
 
         for attribute in self.encoding_conf.attributes:
 
-            key = attribute.attribute_name
-
-            # print(b'To decode' + in_data)
-
             if isinstance(attribute, AttributeEncoding):
-
-                data, rest = self._decode_attribute(in_data, attribute)
+                data, offset = self._decode_attribute(view, offset, attribute)
 
                 if attribute.return_value:
                     data = data.value
 
             elif isinstance(attribute, SequenceEncoding):
+                data, offset = self._decode_sequence(view, offset, attribute)
 
-                data, rest = self._decode_sequence(in_data, attribute)
             else:
-                raise NotImplemented(f'Attribute: {attribute} is not supported')
-
-            in_data = rest
-            out_dict.update({key: data})
-
-        return out_dict
+                raise NotImplementedError(f"Attribute: {attribute} is not supported")
 
-    def _decode_attribute(self, in_data, attribute):
+            out_dict[attribute.attribute_name] = data
 
-        #print(b'parsing data: ' + in_data)
-        #print(f'Attribute: {attribute}')
+        return out_dict, offset
 
-        first_byte = in_data[0]
+    def _decode_attribute(
+        self, view: memoryview, offset: int, attribute: AttributeEncoding
+    ):
+        if attribute.optional or attribute.default is not None:
+            _check_available(view, offset + 1)
+            first_byte = view[offset]
 
-        if first_byte == 0 and attribute.optional:
-            data = None  # Should this be a nulldata instead?
-            return data, in_data[1:]
+            if first_byte == 0 and attribute.optional:
+                return None, offset + 1  # Should this be a nulldata instead?
 
-        elif first_byte == 0 and attribute.default is not None:
-            data = attribute.default
-            return data, in_data[1:]
+            elif first_byte == 0:
+                return attribute.default, offset + 1
 
-        elif first_byte == 1 and (attribute.optional or attribute.default):
-            # a value is existing and is after the 0x01
-            in_data = in_data[1:]  # remove the first byte
+            elif first_byte == 1:
+                # a value is existing and is after the 0x01
+                offset += 1
 
         # Check if length is known.
         if attribute.length:
-            attribute_data = in_data[:attribute.length]
-            data = attribute.instance_class.from_bytes(attribute_data)
-            return data, in_data[attribute.length:]
-
-        if attribute.wrap_end:
-            attribute_data = in_data
-            data = attribute.instance_class.from_bytes(attribute_data)
-            return data, b''
-
-        # first byte indicates length.
-        attribute_data = in_data[1:(first_byte + 1)]
-        data = attribute.instance_class.from_bytes(attribute_data)
-        return data, in_data[(first_byte + 1):]
-
-    def _decode_sequence(self, bytes_data: bytes, attribute):
-        in_data = bytes_data[:]  # copy so not to mess with initial data
+            length = attribute.length
+        elif attribute.wrap_end:
+            length = len(view) - offset
+        else:
+            # The length is encoded before the data.
+            length, offset = decode_variable_integer_at(view, offset)
+
+        end = offset + length
+        _check_available(view, end)
+        data = attribute.instance_class.from_bytes(bytes(view[offset:end]))
+        return data, end
+
+    def _decode_sequence(
+        self, view: memoryview, offset: int, attribute: SequenceEncoding
+    ):
         data_list = list()
+        end = len(view)
+        while offset < end:
+            data, offset = self._decode_data(view, offset)
+            data_list.append(data)
 
-        while in_data:
-            first_obj, rest = self._get_first(in_data)
+        return data_list, offset
 
-            data_list.append(first_obj)
-            in_data = rest
+    def _decode_data(self, view: memoryview, offset: int):
+        """
+        Decodes one tagged DlmsData. If the length of the data type is not fixed it
+        is encoded as a variable integer after the tag.
 
-        return data_list, in_data
+        Arrays and structures have the number of elements as a variable integer
+        after the tag, followed by the elements. They are decoded to a list of
+        DlmsData. While decoding, the open containers are kept on a stack as
+        [container class, number of elements, decoded elements].
+        """
+        stack = list()
+        element_count = 0
+        while True:
+            _check_available(view, offset + 1)
+            data_cls = DlmsDataFactory.get_data_class(view[offset])
+            offset += 1
+
+            if data_cls in CONTAINER_TYPES:
+                length, offset = decode_variable_integer_at(view, offset)
+                # Every element is at least one byte, its tag.
+                _check_available(view, offset + length)
+                element_count += length
+                if element_count > self.max_elements:
+                    raise ValueError(
+                        f"A-XDR data has more than {self.max_elements} elements in "
+                        f"arrays and structures"
+                    )
+                if length:
+                    if len(stack) >= self.max_depth:
+                        raise ValueError(
+                            f"A-XDR data is nested deeper than {self.max_depth} "
+                            f"levels"
+                        )
+                    stack.append([data_cls, length, list()])
+                    continue
+                data = data_cls(list(), length=0)
+
+            elif data_cls is CompactArrayData:
+                data, offset = self._decode_compact_array(view, offset)
 
-    def _get_tag(self, bytes_data: bytes):
-        return bytes_data[0]
+            else:
+                if data_cls.LENGTH is None:
+                    length, offset = decode_variable_integer_at(view, offset)
+                else:
+                    length = data_cls.LENGTH
+
+                if data_cls is BitStringData:
+                    # The length of a bit-string is the number of bits.
+                    end = offset + -(-length // 8)
+                else:
+                    end = offset + length
+                _check_available(view, end)
+                data = data_cls(bytes(view[offset:end]), length=length)
+                offset = end
+
+            # Add the data to the open container and close all containers that
+            # are complete.
+            while stack:
+                container_cls, element_total, elements = stack[-1]
+                elements.append(data)
+                if len(elements) < element_total:
+                    break
+                stack.pop()
+                data = container_cls(elements, length=element_total)
+            else:
+                return data, offset
 
-    def _get_length(self, tag, bytes_data):
+    def _decode_compact_array(self, view: memoryview, offset: int):
+        """
+        A compact array is its type description followed by the array contents as
+        an octet string. Contents of types without fixed length are left encoded
+        as the value.
         """
-        If we know the length of the data it will not be encoded. But it the data is
-        of a type where the length cannot be predetermined we need to decode the
-        lenght. This is done by the same way the DLMS way to encode and decode
-        variable integers
+        type_description, description_end = compact_array.parse_type_description(
+            view, offset
+        )
+        length, contents_offset = decode_variable_integer_at(view, description_end)
+        end = contents_offset + length
+        _check_available(view, end)
+        contents = bytes(view[contents_offset:end])
+
+        try:
+            value = compact_array.decode_contents(
+                type_description, contents, use_numpy=self.use_numpy
+            )
+            number_of_elements = len(value)
+        except compact_array.UnsupportedTypeDescription:
+            value = contents
+            number_of_elements = None
+
+        data = CompactArrayData(
+            value,
+            data=contents,
+            length=number_of_elements,
+            type_description=bytes(view[offset:description_end]),
+        )
+        return data, end
+
+    def encode(self, to_encode) -> memoryview:
+        return AXdrEncoder(self.encoding_conf).encode(to_encode)
+
+
+class AXdrEncoder:
+    """
+    Encodes objects or dicts to A-XDR as described by an EncodingConf, the reverse
+    of AXdrDecoder.
+
+    Attributes are read by name from the object to encode, or from the dict with
+    the same content as the dict AXdrDecoder returns. Attributes with
+    `return_value` are plain python values and are encoded by their
+    `instance_class`. Other attributes are objects with a `to_bytes` method.
 
+    All data is written into one growable bytearray.
+    """
+
+    def __init__(self, encoding_conf: EncodingConf):
+        self.encoding_conf = encoding_conf
+
+    def encode(self, to_encode) -> memoryview:
+        """
+        :return: A memoryview of the encoded data.
         """
-        data_cls = DlmsDataFactory.get_data_class(tag)
-        if data_cls.LENGTH is None:
-            length, rest = decode_variable_integer(bytes_data[1:])
-            return length, rest
+        out = bytearray()
+        self.encode_into(out, to_encode)
+        return memoryview(out)
 
-        else:
-            return data_cls.LENGTH, bytes_data[1:]
+    def encode_into(self, out: bytearray, to_encode):
+        """
+        Appends the encoded attributes to `out`.
+        """
+        for attribute in self.encoding_conf.attributes:
+            if isinstance(to_encode, typing.Mapping):
+                value = to_encode[attribute.attribute_name]
+            else:
+                value = getattr(to_encode, attribute.attribute_name)
 
-    def _get_tag_length_value(self, bytes_data: bytes):
+            if isinstance(attribute, AttributeEncoding):
+                self._encode_attribute(out, value, attribute)
 
-        tag = self._get_tag(bytes_data)
-        length, rest = self._get_length(tag, bytes_data)
-        value = rest[:length]
-        rest = rest[length:]
-        return tag, length, value, rest
+            elif isinstance(attribute, SequenceEncoding):
+                self._encode_sequence(out, value)
 
-    def _get_first(self, bytes_data: bytes):
+            else:
+                raise NotImplementedError(f"Attribute: {attribute} is not supported")
 
-        tag, length, value, rest = self._get_tag_length_value(bytes_data)
+    def _encode_attribute(self, out: bytearray, value, attribute: AttributeEncoding):
+        if attribute.optional or attribute.default is not None:
+            if value is None or (
+                attribute.default is not None and value == attribute.default
+            ):
+                out.append(0)
+                return
+            out.append(1)
 
-        data_cls = DlmsDataFactory.get_data_class(tag)
+        if attribute.return_value:
+            value = attribute.instance_class(value)
+        data = value.to_bytes()
 
-        data = data_cls(value, length=length)
+        if attribute.length:
+            if len(data) != attribute.length:
+                raise ValueError(
+                    f"{attribute.attribute_name} should be encoded in "
+                    f"{attribute.length} bytes, got {len(data)} bytes"
+                )
+        elif not attribute.wrap_end:
+            out += encode_variable_integer(len(data))
+        out += data
+
+    def _encode_sequence(self, out: bytearray, data_list: typing.List[DlmsData]):
+        for data in data_list:
+            self.encode_data(out, data)
+
+    @staticmethod
+    def encode_data(out: bytearray, data: DlmsData):
+        """
+        Appends one tagged DlmsData to `out`. The length is only encoded if the
+        length of the data type is not fixed. Arrays and structures are encoded
+        with the number of elements followed by the elements, using a stack of the
+        open containers like the decoder.
+        """
+        stack = [iter((data,))]
+        while stack:
+            data = next(stack[-1], None)
+            if data is None:
+                stack.pop()
+                continue
+
+            out.append(data.TAG)
+            if isinstance(data, CompactArrayData):
+                # The array contents are written as received.
+                out += data.type_description
+                out += encode_variable_integer(len(data.data))
+                out += data.data
+                continue
+
+            if isinstance(data, CONTAINER_TYPES):
+                out += encode_variable_integer(len(data.value))
+                stack.append(iter(data.value))
+                continue
+
+            # Data decoded by AXdrDecoder holds its value still encoded.
+            if isinstance(data.value, (bytes, bytearray, memoryview)):
+                value_bytes = bytes(data.value)
+            else:
+                value_bytes = data.to_bytes()
+
+            if isinstance(data, BitStringData):
+                out += encode_variable_integer(
+                    len(value_bytes) * 8 if data.length is None else data.length
+                )
+            elif data.LENGTH is None:
+                out += encode_variable_integer(len(value_bytes))
+            elif len(value_bytes) != data.LENGTH:
+                raise ValueError(
+                    f"{data.__class__.__name__} should be encoded in {data.LENGTH} "
+                    f"bytes, got {len(value_bytes)} bytes"
+                )
+            out += value_bytes
+
+
+def compile_decoder(
+    encoding_conf: EncodingConf, target: typing.Callable
+) -> typing.Callable[[bytes], typing.Any]:
+    """
+    Compiles an EncodingConf into a decode function specialized for it.
+
+    The function decodes the attributes in order, like AXdrDecoder, with the checks
+    for optional values, default values and lengths generated for each attribute.
+    It then calls `target` with the decoded attributes as keyword arguments, so no
+    intermediate dict is needed.
+
+    :return: A function taking the bytes to decode and returning the object made by
+        `target`.
+    """
+    namespace = {
+        "decode_variable_integer_at": decode_variable_integer_at,
+        "check_available": _check_available,
+        "decode_sequence": AXdrDecoder(encoding_conf)._decode_sequence,
+        "target": target,
+    }
+    lines = [
+        "def decode(bytes_data):",
+        "    view = memoryview(bytes_data)",
+        "    offset = 0",
+    ]
+    arguments = list()
+
+    for index, attribute in enumerate(encoding_conf.attributes):
+        value_name = f"value_{index}"
+        arguments.append(f"{attribute.attribute_name}={value_name}")
+
+        if isinstance(attribute, SequenceEncoding):
+            lines.append(
+                f"    {value_name}, offset = decode_sequence(view, offset, None)"
+            )
+            continue
+
+        if not isinstance(attribute, AttributeEncoding):
+            raise NotImplementedError(f"Attribute: {attribute} is not supported")
+
+        namespace[f"from_bytes_{index}"] = attribute.instance_class.from_bytes
+        read = _compile_read(attribute, index, value_name)
+
+        if attribute.optional or attribute.default is not None:
+            # An omitted optional value is None even if it has a default.
+            namespace[f"default_{index}"] = (
+                None if attribute.optional else attribute.default
+            )
+            lines += [
+                "    check_available(view, offset + 1)",
+                "    first_byte = view[offset]",
+                "    if first_byte == 0:",
+                f"        {value_name} = default_{index}",
+                "        offset += 1",
+                "    else:",
+                "        if first_byte == 1:",
+                "            offset += 1",
+            ]
+            lines += [f"        {line}" for line in read]
+        else:
+            lines += [f"    {line}" for line in read]
+
+    lines.append(f"    return target({', '.join(arguments)})")
 
-        return data, rest
+    name = getattr(target, "__qualname__", repr(target))
+    exec(compile("\n".join(lines), f"<A-XDR decoder for {name}>", "exec"), namespace)
+    return namespace["decode"]
 
-    def encode(self, to_encode):
-        raise NotImplemented('Encoding objects to A-XDR is not yet supported.')
+
+def _compile_read(attribute: AttributeEncoding, index: int, value_name: str):
+    """
+    Lines of code decoding the value of an attribute at `offset`.
+    """
+    if attribute.length:
+        lines = [f"end = offset + {attribute.length}"]
+    elif attribute.wrap_end:
+        lines = ["end = len(view)"]
+    else:
+        lines = [
+            "length, offset = decode_variable_integer_at(view, offset)",
+            "end = offset + length",
+        ]
+    value = f"from_bytes_{index}(bytes(view[offset:end]))"
+    if attribute.return_value:
+        value += ".value"
+    return lines + [
+        "check_available(view, end)",
+        f"{value_name} = {value}",
+        "offset = end",
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_decoder(cls) -> typing.Callable[[bytes], typing.Any]:
+    """
+    The compiled decode function for a class with an ENCODING_CONF, compiled once
+    per class. The decoded attributes are passed to `cls.from_decoded` if the class
+    has it, to make objects that are not created from the attributes directly, or
+    else to the class itself.
+    """
+    return compile_decoder(cls.ENCODING_CONF, getattr(cls, "from_decoded", cls))
 
 
 class DlmsDataToPythonConverter:
@@ -240,5 +592,14 @@ class DlmsDataToPythonConverter:
         return out_list
 
     def to_dlms(self, data: typing.List):
-        raise NotImplemented(
-            'Not yet supported to convert python values to DLMS')
+        """
+        Converts python values to DlmsData of the same types as in the
+        encoding_conf.
+        """
+        if len(data) != len(self.encoding_conf):
+            raise ValueError(
+                f"Got {len(data)} values for {len(self.encoding_conf)} DLMS data types"
+            )
+        return [
+            item.__class__(value=value) for item, value in zip(self.encoding_conf, data)
+        ]
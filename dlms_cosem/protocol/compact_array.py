@@ -0,0 +1,228 @@
+"""
+Decoding of the contents of compact arrays (CompactArrayData, tag 19).
+
+A compact array holds many elements of the same type without encoding the tag of
+every element:
+
+    compact-array ::= SEQUENCE {
+        contents-description [0] TypeDescription,
+        array-contents [1] IMPLICIT OCTET STRING
+    }
+
+The type description is the tag of a simple type, an array (tag 1) of a fixed
+number of elements (Unsigned16) of one type, or a structure (tag 2) of a sequence
+of types. The array contents are the values of all elements after each other.
+
+If NumPy is installed the type description is compiled into a structured dtype
+with big endian fields and the contents are viewed as an array of that dtype with
+`np.frombuffer`, so no Python object is created per element. Otherwise simple
+types are unpacked into an `array.array` and structures into tuples with
+`struct`. Compiled type descriptions are cached.
+
+Only types with a fixed length can be decoded this way. Compact arrays of types
+with a variable length, like octet-string, are left encoded.
+"""
+import array
+import functools
+import struct
+import sys
+from typing import *
+
+import attr
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+ARRAY_TAG = 1
+STRUCTURE_TAG = 2
+
+# NumPy dtype and struct format of the simple types with a fixed length. Octet
+# strings of fixed length (date-time, date and time) are kept as bytes.
+SIMPLE_TYPES = {
+    3: ("?", "?"),  # boolean
+    5: (">i4", "i"),  # double-long
+    6: (">u4", "I"),  # double-long-unsigned
+    15: ("i1", "b"),  # integer
+    16: (">i2", "h"),  # long
+    17: ("u1", "B"),  # unsigned
+    18: (">u2", "H"),  # long-unsigned
+    20: (">i8", "q"),  # long64
+    21: (">u8", "Q"),  # long64-unsigned
+    22: ("u1", "B"),  # enum
+    23: (">f4", "f"),  # float32
+    24: (">f8", "d"),  # float64
+    25: (("u1", (12,)), "12s"),  # date-time
+    26: (("u1", (5,)), "5s"),  # date
+    27: (("u1", (4,)), "4s"),  # time
+}
+
+DEFAULT_MAX_DEPTH = 8
+
+
+class UnsupportedTypeDescription(ValueError):
+    """The type description contains a type without fixed length"""
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class SimpleType:
+    tag: int
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class ArrayType:
+    number_of_elements: int
+    element_type: Any
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class StructureType:
+    element_types: Tuple[Any, ...]
+
+
+def parse_type_description(
+    view: memoryview, offset: int, max_depth: int = DEFAULT_MAX_DEPTH
+):
+    """
+    Parses the type description starting at `offset`.
+
+    :return: The type description and the offset after it.
+    """
+    _check_available(view, offset + 1)
+    tag = view[offset]
+    offset += 1
+
+    if tag in (ARRAY_TAG, STRUCTURE_TAG):
+        if max_depth <= 0:
+            raise ValueError("Compact array type description is nested too deep")
+
+    if tag == ARRAY_TAG:
+        _check_available(view, offset + 2)
+        number_of_elements = int.from_bytes(view[offset : offset + 2], "big")
+        element_type, offset = parse_type_description(view, offset + 2, max_depth - 1)
+        return ArrayType(number_of_elements, element_type), offset
+
+    if tag == STRUCTURE_TAG:
+        count, offset = _decode_count(view, offset)
+        element_types = list()
+        for _ in range(count):
+            element_type, offset = parse_type_description(view, offset, max_depth - 1)
+            element_types.append(element_type)
+        return StructureType(tuple(element_types)), offset
+
+    return SimpleType(tag), offset
+
+
+def _decode_count(view: memoryview, offset: int) -> Tuple[int, int]:
+    """The number of elements of a SEQUENCE OF, an A-XDR variable integer."""
+    _check_available(view, offset + 1)
+    first_byte = view[offset]
+    if not first_byte & 0b10000000:
+        return first_byte, offset + 1
+    end = offset + 1 + (first_byte & 0b01111111)
+    _check_available(view, end)
+    return int.from_bytes(view[offset + 1 : end], "big"), end
+
+
+def _check_available(view: memoryview, end: int):
+    if end > len(view):
+        raise ValueError(
+            f"Compact array data ends at {len(view)} bytes, needed {end} bytes to "
+            f"decode"
+        )
+
+
+def _simple_type(tag: int):
+    try:
+        return SIMPLE_TYPES[tag]
+    except KeyError:
+        raise UnsupportedTypeDescription(
+            f"Data type with tag {tag} has no fixed length and can't be decoded in "
+            f"a compact array"
+        )
+
+
+@functools.lru_cache(maxsize=128)
+def compile_dtype(type_description):
+    """
+    NumPy dtype of an element of the described type. Structures get fields named
+    f0, f1, ...
+    """
+    if isinstance(type_description, ArrayType):
+        return np.dtype(
+            (
+                compile_dtype(type_description.element_type),
+                (type_description.number_of_elements,),
+            )
+        )
+    if isinstance(type_description, StructureType):
+        return np.dtype(
+            [
+                (f"f{index}", compile_dtype(element_type))
+                for index, element_type in enumerate(type_description.element_types)
+            ]
+        )
+    return np.dtype(_simple_type(type_description.tag)[0])
+
+
+@functools.lru_cache(maxsize=128)
+def compile_struct_format(type_description) -> str:
+    """
+    struct format of an element of the described type, without byte order. Arrays
+    and structures are flattened.
+    """
+    if isinstance(type_description, ArrayType):
+        return (
+            compile_struct_format(type_description.element_type)
+            * type_description.number_of_elements
+        )
+    if isinstance(type_description, StructureType):
+        return "".join(
+            compile_struct_format(element_type)
+            for element_type in type_description.element_types
+        )
+    return _simple_type(type_description.tag)[1]
+
+
+def decode_contents(
+    type_description, contents: bytes, use_numpy: Optional[bool] = None
+):
+    """
+    Decodes the array contents of a compact array.
+
+    :param use_numpy: Force or disable use of NumPy. Default is to use it if installed.
+    :return: A NumPy array, or without NumPy an `array.array` for simple types and
+        a list of tuples for arrays and structures.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    elif use_numpy and np is None:
+        raise ImportError("NumPy is needed for decode_contents(use_numpy=True)")
+
+    if use_numpy:
+        dtype = compile_dtype(type_description)
+        _check_element_size(len(contents), dtype.itemsize)
+        return np.frombuffer(contents, dtype=dtype)
+
+    struct_format = compile_struct_format(type_description)
+    element = struct.Struct(">" + struct_format)
+    _check_element_size(len(contents), element.size)
+    if isinstance(type_description, SimpleType) and struct_format in array.typecodes:
+        values = array.array(struct_format)
+        if values.itemsize == element.size:
+            values.frombytes(contents)
+            if sys.byteorder == "little":
+                values.byteswap()
+            return values
+    if isinstance(type_description, SimpleType):
+        return [value for (value,) in element.iter_unpack(contents)]
+    return list(element.iter_unpack(contents))
+
+
+def _check_element_size(contents_length: int, element_size: int):
+    if element_size == 0 or contents_length % element_size:
+        raise ValueError(
+            f"Compact array contents of {contents_length} bytes is not a whole "
+            f"number of elements of {element_size} bytes"
+        )
@@ -6,8 +6,147 @@
 # resulting crc bytes needs to be reversed to become in correct order
 # The reversed crc is then XOR:ed with 0xFFFF
 #
+# Reversing every byte, running the normal polynomial and reversing the result is
+# the same as running the reflected polynomial (0x8408) directly on the data. That is
+# the CRC-16/X.25 algorithm and is what `CRCCCITT.calculate_for` uses. The bit
+# reversing implementation is kept as a reference.
+#
+import struct
 from ctypes import c_ushort
 
+CRC16_INITIAL_VALUE = 0xFFFF
+CRC16_FINAL_XOR = 0xFFFF
+CRC16_REFLECTED_POLYNOMIAL = 0x8408
+# Register value after running the CRC over data followed by its own (transmitted) CRC.
+CRC16_GOOD_RESIDUE = 0xF0B8
+
+
+def make_reflected_table(polynomial: int = CRC16_REFLECTED_POLYNOMIAL):
+    """
+    Pre-calculates the 256 entry lookup table for a reflected (LSB first) CRC-16.
+    """
+    table = list()
+    for i in range(0, 256):
+        crc = i
+        for _ in range(0, 8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ polynomial
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC16_REFLECTED_TABLE = make_reflected_table()
+
+
+def make_slicing_tables(table, count: int):
+    """
+    Tables for slicing-by-N. Table k gives the CRC contribution of a byte followed by
+    k zero bytes, so N bytes can be processed with N independent lookups.
+    """
+    tables = [tuple(table)]
+    for _ in range(1, count):
+        previous = tables[-1]
+        tables.append(
+            tuple((value >> 8) ^ table[value & 0xFF] for value in previous)
+        )
+    return tuple(tables)
+
+
+CRC16_SLICING_BY_8_TABLES = make_slicing_tables(CRC16_REFLECTED_TABLE, 8)
+# first 2 bytes are XOR:ed with the 16 bit register, the rest are looked up directly.
+_SLICING_BY_8_STRUCT = struct.Struct("<H6B")
+
+# Below this length the setup of slicing-by-8 costs more than it saves.
+# See benchmarks/crc_benchmark.py
+CRC16_SLICING_THRESHOLD = 64
+
+
+def crc16_update_bytewise(crc: int, data) -> int:
+    """
+    Runs the reflected CRC-16 register over data one byte at a time.
+    """
+    table = CRC16_REFLECTED_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def crc16_update_slicing_by_8(crc: int, data) -> int:
+    """
+    Runs the reflected CRC-16 register over data, 8 bytes per step. The tail that
+    does not fill a whole step is processed one byte at a time.
+    """
+    t0, t1, t2, t3, t4, t5, t6, t7 = CRC16_SLICING_BY_8_TABLES
+    view = memoryview(data)
+    sliced_length = len(view) & ~0b111
+    for low, b2, b3, b4, b5, b6, b7 in _SLICING_BY_8_STRUCT.iter_unpack(
+        view[:sliced_length]
+    ):
+        low ^= crc
+        crc = (
+            t7[low & 0xFF]
+            ^ t6[low >> 8]
+            ^ t5[b2]
+            ^ t4[b3]
+            ^ t3[b4]
+            ^ t2[b5]
+            ^ t1[b6]
+            ^ t0[b7]
+        )
+    return crc16_update_bytewise(crc, view[sliced_length:])
+
+
+def crc16_update(crc: int, data) -> int:
+    """
+    Runs the reflected CRC-16 register over data and returns the new register value.
+    Data can be any object supporting the buffer protocol with single byte items
+    (bytes, bytearray, memoryview), it is not copied.
+
+    Short data is processed one byte at a time and longer data with slicing-by-8.
+
+    The returned value is the raw register, the final XOR is not applied.
+    """
+    if len(data) < CRC16_SLICING_THRESHOLD:
+        return crc16_update_bytewise(crc, data)
+    return crc16_update_slicing_by_8(crc, data)
+
+
+class IncrementalCRCCCITT:
+    """
+    Holds the CRC register between calls so the CRC can be calculated on data as it
+    arrives. `digest` returns the same bytes as `CRCCCITT.calculate_for` would for
+    all data passed to `update`.
+
+    If the data passed includes the transmitted CRC at the end, `is_valid` tells if
+    the data was received correctly without having to know where the data ends.
+    """
+
+    def __init__(self, data=None):
+        self.register = CRC16_INITIAL_VALUE
+        if data:
+            self.update(data)
+
+    def update(self, chunk) -> "IncrementalCRCCCITT":
+        self.register = crc16_update(self.register, chunk)
+        return self
+
+    def digest(self) -> bytes:
+        return (self.register ^ CRC16_FINAL_XOR).to_bytes(2, "little")
+
+    @property
+    def is_valid(self) -> bool:
+        return self.register == CRC16_GOOD_RESIDUE
+
+    def reset(self):
+        self.register = CRC16_INITIAL_VALUE
+
+    def copy(self) -> "IncrementalCRCCCITT":
+        new = self.__class__()
+        new.register = self.register
+        return new
+
 
 class CRCCCITT:
     crc_ccitt_table = []
@@ -25,6 +164,26 @@ class CRCCCITT:
 
     def calculate_for(self, input_data, lsb_first=False) -> bytes:
         """
+        Calculates the CRC using the reflected table. No bit reversing of the data
+        is needed.
+
+        :param input_data: bytes, bytearray or memoryview.
+        :param lsb_first: By default the CRC is returned in the order it is
+            transmitted in a HDLC frame. Set to return the bytes in reverse order.
+        :return:
+        """
+        crc = crc16_update(self.starting_value, input_data) ^ CRC16_FINAL_XOR
+
+        if lsb_first:
+            return crc.to_bytes(2, "big")
+        else:
+            return crc.to_bytes(2, "little")
+
+    def calculate_for_reversed_bits(self, input_data, lsb_first=False) -> bytes:
+        """
+        Reference implementation. Reverses the bits in all bytes and runs the normal
+        (non reflected) polynomial. Gives the same result as `calculate_for` but is a
+        lot slower.
 
         :param input_data:
         :param lsb_first: Indicate if the Least significant byte should be returned
@@ -93,5 +252,3 @@ def reverse_byte_message(msg):
     for char in msg:
         reversed_mgs += reverse_byte(char)
     return reversed_mgs
-
-
@@ -4,8 +4,9 @@ from dlms_cosem.protocol.a_xdr import (
     EncodingConf,
     AttributeEncoding,
     SequenceEncoding,
-    AXdrDecoder,
+    AXdrEncoder,
     DlmsDataToPythonConverter,
+    compiled_decoder,
 )
 from dlms_cosem.protocol.dlms_data import DlmsData, DateTimeData, OctetStringData
 
@@ -37,6 +38,10 @@ class SecurityHeader:
 
         return cls(security_control_field, invocation_counter)
 
+    def to_bytes(self):
+        invocation_counter = self.invocation_counter.to_bytes(4, "big")
+        return self.security_control_field.to_bytes() + invocation_counter
+
     def __repr__(self):
         return (
             f"{self.__class__.__name__}("
@@ -142,6 +147,9 @@ class CipheredContent:
         cipher_text = _bytes_data[5:]
         return cls(security_header, cipher_text)
 
+    def to_bytes(self):
+        return self.security_header.to_bytes() + self.cipher_text
+
     def __repr__(self):
         return (
             f"{self.__class__.__name__}("
@@ -218,9 +226,12 @@ class GeneralGlobalCipherApdu:
 
     @classmethod
     def from_bytes(cls, _bytes):
-        decoder = AXdrDecoder(encoding_conf=cls.ENCODING_CONF)
-        in_dict = decoder.decode(_bytes)
-        return cls(**in_dict)
+        return compiled_decoder(cls)(_bytes)
+
+    def to_bytes(self):
+        out = bytearray((self.TAG,))
+        AXdrEncoder(encoding_conf=self.ENCODING_CONF).encode_into(out, self)
+        return bytes(out)
 
     def __repr__(self):
         return (
@@ -246,9 +257,13 @@ class LongInvokeIdAndPriority:
     :param bool confirmed: Indicates if confirmed. `DEFAULT=False`
     :param bool prioritized: Indicates if prioritized. `DEFAULT=False`
     :param bool break_on_error: Indicates id should break in error. `DEFAULT=True`
+    :param int reserved: The reserved low bits of the status byte, kept so a
+        decoded value is encoded the same again. `DEFAULT=0`
 
     """
 
+    RESERVED_BITS = 0b00001111
+
     def __init__(
         self,
         long_invoke_id: int,
@@ -256,12 +271,14 @@ class LongInvokeIdAndPriority:
         confirmed: bool = False,
         self_descriptive: bool = False,
         break_on_error: bool = True,
+        reserved: int = 0,
     ):
         self.long_invoke_id = long_invoke_id
         self.prioritized = prioritized
         self.confirmed = confirmed
         self.self_descriptive = self_descriptive
         self.break_on_error = break_on_error
+        self.reserved = reserved
 
     @classmethod
     def from_bytes(cls, bytes_data):
@@ -284,8 +301,21 @@ class LongInvokeIdAndPriority:
             confirmed=confirmed,
             break_on_error=break_on_error,
             self_descriptive=self_descriptive,
+            reserved=status_byte & cls.RESERVED_BITS,
         )
 
+    def to_bytes(self):
+        status_byte = self.reserved & self.RESERVED_BITS
+        if self.prioritized:
+            status_byte += 0b10000000
+        if self.confirmed:
+            status_byte += 0b01000000
+        if self.break_on_error:
+            status_byte += 0b00100000
+        if self.self_descriptive:
+            status_byte += 0b00010000
+        return self.long_invoke_id.to_bytes(3, "big") + bytes((status_byte,))
+
     def __repr__(self):
         return (
             f"{self.__class__.__name__}("
@@ -315,17 +345,26 @@ class NotificationBody:
 
     @classmethod
     def from_bytes(cls, bytes_data):
-        decoder = AXdrDecoder(encoding_conf=cls.ENCODING_CONF)
-        in_dict = decoder.decode(bytes_data)
-        in_dict.update(
-            {
-                "data": DlmsDataToPythonConverter(
-                    encoding_conf=in_dict["encoding_conf"]
-                ).to_python()
-            }
+        return compiled_decoder(cls)(bytes_data)
+
+    @classmethod
+    def from_decoded(cls, encoding_conf):
+        return cls(
+            data=DlmsDataToPythonConverter(encoding_conf=encoding_conf).to_python(),
+            encoding_conf=encoding_conf,
         )
 
-        return cls(**in_dict)
+    def to_bytes(self):
+        encoder = AXdrEncoder(encoding_conf=self.ENCODING_CONF)
+        return bytes(
+            encoder.encode(
+                {
+                    "encoding_conf": DlmsDataToPythonConverter(
+                        encoding_conf=self.encoding_conf
+                    ).to_dlms(self.data)
+                }
+            )
+        )
 
 
 class DataNotificationApdu:
@@ -380,9 +419,12 @@ class DataNotificationApdu:
 
     @classmethod
     def from_bytes(cls, bytes_data: bytes):
-        decoder = AXdrDecoder(encoding_conf=cls.ENCODING_CONF)
-        in_dict = decoder.decode(bytes_data)
-        return cls(**in_dict)
+        return compiled_decoder(cls)(bytes_data)
+
+    def to_bytes(self):
+        out = bytearray((self.TAG,))
+        AXdrEncoder(encoding_conf=self.ENCODING_CONF).encode_into(out, self)
+        return bytes(out)
 
     def __repr__(self):
         return (
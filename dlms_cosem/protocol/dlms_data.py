@@ -1,4 +1,5 @@
 import datetime
+import struct
 
 
 class DlmsData:
@@ -15,9 +16,22 @@ class DlmsData:
         raise NotImplementedError((f'Subclass of DlmsData '
                                    f'needs to implement from_bytes'))
 
+    def to_bytes(self) -> bytes:
+        """The encoded value, without tag and length."""
+        raise NotImplementedError((f'Subclass of DlmsData '
+                                   f'needs to implement to_bytes'))
+
 
 class NullData(DlmsData):
     TAG = 0
+    LENGTH = 0
+
+    @classmethod
+    def from_bytes(cls, bytes_data: bytes):
+        return cls(value=None, data=bytes_data)
+
+    def to_bytes(self) -> bytes:
+        return b''
 
 
 class DataArray(DlmsData):
@@ -39,10 +53,24 @@ class BooleanData(DlmsData):
         value = bool(int.from_bytes(bytes_data, 'big'))
         return cls(value, data=bytes_data)  # TODO: test this.
 
+    def to_bytes(self) -> bytes:
+        return b'\x01' if self.value else b'\x00'
+
 
 class BitStringData(DlmsData):
+    """
+    The value is the bits packed in bytes, first bit in the most significant bit.
+    length is the number of bits, the last byte can have unused bits.
+    """
     TAG = 4
 
+    @classmethod
+    def from_bytes(cls, bytes_data: bytes):
+        return cls(value=bytes_data, data=bytes_data, length=len(bytes_data) * 8)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.value)
+
 
 class DoubleLongData(DlmsData):
     """32 bit integer"""
@@ -54,6 +82,9 @@ class DoubleLongData(DlmsData):
         return cls(value=int.from_bytes(bytes_data, 'big', signed=True),
                    data=bytes_data)
 
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes(self.LENGTH, 'big', signed=True)
+
 
 class DoubleLongUnsignedData(DlmsData):
     """32 bit unsigned integer"""
@@ -64,6 +95,9 @@ class DoubleLongUnsignedData(DlmsData):
     def from_bytes(cls, bytes_data: bytes):
         return cls(value=int.from_bytes(bytes_data, 'big'), data=bytes_data)
 
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes(self.LENGTH, 'big')
+
 
 class OctetStringData(DlmsData):
     TAG = 9
@@ -72,6 +106,9 @@ class OctetStringData(DlmsData):
     def from_bytes(cls, bytes_data: bytes):
         return cls(value=bytes_data, data=bytes_data, length=len(bytes_data))
 
+    def to_bytes(self) -> bytes:
+        return bytes(self.value)
+
     def __repr__(self):
         return (f'{self.__class__.__name__}('
                 f'value={self.value!r}, '
@@ -81,12 +118,29 @@ class OctetStringData(DlmsData):
 
 
 class VisibleStringData(DlmsData):
+    """ASCII string"""
     TAG = 10
 
+    @classmethod
+    def from_bytes(cls, bytes_data: bytes):
+        return cls(value=bytes(bytes_data).decode('ascii'), data=bytes_data,
+                   length=len(bytes_data))
+
+    def to_bytes(self) -> bytes:
+        return self.value.encode('ascii')
+
 
 class UTF8StringData(DlmsData):
     TAG = 12
 
+    @classmethod
+    def from_bytes(cls, bytes_data: bytes):
+        return cls(value=bytes(bytes_data).decode('utf-8'), data=bytes_data,
+                   length=len(bytes_data))
+
+    def to_bytes(self) -> bytes:
+        return self.value.encode('utf-8')
+
 
 class BCDData(DlmsData):
     TAG = 13
@@ -102,6 +156,9 @@ class IntegerData(DlmsData):
         return cls(value=int.from_bytes(bytes_data, 'big', signed=True),
                    data=bytes_data)
 
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes(self.LENGTH, 'big', signed=True)
+
 
 class LongData(DlmsData):
     """16  bit integer"""
@@ -113,6 +170,9 @@ class LongData(DlmsData):
         return cls(value=int.from_bytes(bytes_data, 'big', signed=True),
                    data=bytes_data)
 
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes(self.LENGTH, 'big', signed=True)
+
 
 class UnsignedIntegerData(DlmsData):
     """8 bit unsigned integer"""
@@ -123,6 +183,9 @@ class UnsignedIntegerData(DlmsData):
     def from_bytes(cls, bytes_data: bytes):
         return cls(value=int.from_bytes(bytes_data, 'big'), data=bytes_data)
 
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes(self.LENGTH, 'big')
+
 
 class UnsignedLongData(DlmsData):
     """16 bit unsigned integer"""
@@ -133,15 +196,25 @@ class UnsignedLongData(DlmsData):
     def from_bytes(cls, bytes_data: bytes):
         return cls(value=int.from_bytes(bytes_data, 'big'), data=bytes_data)
 
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes(self.LENGTH, 'big')
+
 
 class CompactArrayData(DlmsData):
     """
     Contains a Type description and arrray content in form of octet string
     content_description -> Type Description tag = 0
     array_content -> Octet string  tag = 1
+
+    The value is the decoded array content, see `compact_array`. data holds the
+    encoded array content and type_description the encoded type description.
     """
     TAG = 19
 
+    def __init__(self, value, data=None, length=None, type_description=None):
+        super().__init__(value, data=data, length=length)
+        self.type_description = type_description
+
 
 class Long64Data(DlmsData):
     """
@@ -155,6 +228,9 @@ class Long64Data(DlmsData):
         return cls(value=int.from_bytes(bytes_data, 'big', signed=True),
                    data=bytes_data)
 
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes(self.LENGTH, 'big', signed=True)
+
 
 class UnsignedLong64Data(DlmsData):
     """
@@ -167,6 +243,9 @@ class UnsignedLong64Data(DlmsData):
     def from_bytes(cls, bytes_data: bytes):
         return cls(value=int.from_bytes(bytes_data, 'big'), data=bytes_data)
 
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes(self.LENGTH, 'big')
+
 
 class EnumData(DlmsData):
     """
@@ -179,6 +258,9 @@ class EnumData(DlmsData):
     def from_bytes(cls, bytes_data: bytes):
         return cls(value=int.from_bytes(bytes_data, 'big'), data=bytes_data)
 
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes(self.LENGTH, 'big')
+
 
 class Float32Data(DlmsData):
     """
@@ -187,6 +269,13 @@ class Float32Data(DlmsData):
     TAG = 23
     LENGTH = 4
 
+    @classmethod
+    def from_bytes(cls, bytes_data: bytes):
+        return cls(value=struct.unpack('>f', bytes_data)[0], data=bytes_data)
+
+    def to_bytes(self) -> bytes:
+        return struct.pack('>f', self.value)
+
 
 class Float64Data(DlmsData):
     """
@@ -195,31 +284,58 @@ class Float64Data(DlmsData):
     TAG = 24
     LENGTH = 8
 
+    @classmethod
+    def from_bytes(cls, bytes_data: bytes):
+        return cls(value=struct.unpack('>d', bytes_data)[0], data=bytes_data)
+
+    def to_bytes(self) -> bytes:
+        return struct.pack('>d', self.value)
+
 
 class DateTimeData(DlmsData):
-    """Octet string of 12 bytes"""
+    """
+    Octet string of 12 bytes. The date-time is not parsed, the value is the
+    encoded octet string.
+    """
 
     TAG = 25
     LENGTH = 12
 
     @classmethod
     def from_bytes(cls, bytes_data):
-        raise NotImplementedError('Need to implement Datetime parsing')
+        return cls(value=bytes(bytes_data), data=bytes_data)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.value)
 
 
 class DateData(DlmsData):
-    """Octet string of 5 bytes"""
+    """Octet string of 5 bytes, kept encoded like DateTimeData"""
 
     TAG = 26
     LENGTH = 5
 
+    @classmethod
+    def from_bytes(cls, bytes_data):
+        return cls(value=bytes(bytes_data), data=bytes_data)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.value)
+
 
 class TimeData(DlmsData):
-    """Octet string of 4 bytes"""
+    """Octet string of 4 bytes, kept encoded like DateTimeData"""
 
     TAG = 27
     LENGTH = 4
 
+    @classmethod
+    def from_bytes(cls, bytes_data):
+        return cls(value=bytes(bytes_data), data=bytes_data)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.value)
+
 
 class DontCareData(DlmsData):
     """Nulldata"""
@@ -239,6 +355,9 @@ class UnixTimestamp(DoubleLongUnsignedData):
                                               cls.DEFAULT_TIMEZONE)
         return cls(value=val, data=bytes_data)
 
+    def to_bytes(self) -> bytes:
+        return int(self.value.timestamp()).to_bytes(self.LENGTH, 'big')
+
 
 class DlmsDataFactory:
     MAP = {0: NullData, 1: DataArray, 2: DataStructure, 3: BooleanData,
@@ -1,11 +1,19 @@
+import functools
 from typing import *
 
 import attr
 
-from dlms_cosem.protocol.hdlc import validators
+from dlms_cosem.protocol.hdlc import exceptions as hdlc_exceptions, validators
 
+# Parsed addresses are interned. A client normally only talks to a limited set of
+# devices so the same addresses are parsed over and over again.
+ADDRESS_CACHE_SIZE = 1024
 
-@attr.s(auto_attribs=True)
+# Addresses start after the flag and the frame format field.
+ADDRESS_START_POSITION = 3
+
+
+@attr.s(auto_attribs=True, frozen=True, cache_hash=True)
 class HdlcAddress:
     """
     A client address shall always be expressed on one byte.
@@ -18,6 +26,9 @@ class HdlcAddress:
     The physical address is used to address a physical device ( a physical device on
     a multi-drop)
     The physical address can be omitted it not used.
+
+    HdlcAddress is immutable and the encoded form is calculated once on creation.
+    Addresses parsed from frames are shared between frames, see `from_bytes`.
     """
 
     logical_address: int = attr.ib(validator=[validators.validate_hdlc_address])
@@ -27,6 +38,10 @@ class HdlcAddress:
     address_type: str = attr.ib(
         default="client", validator=[validators.validate_hdlc_address_type]
     )
+    _encoded: bytes = attr.ib(init=False, repr=False, eq=False)
+
+    def __attrs_post_init__(self):
+        object.__setattr__(self, "_encoded", self._encode())
 
     @property
     def length(self):
@@ -34,50 +49,52 @@ class HdlcAddress:
         The number of bytes the address makes up.
         :return:
         """
-        return len(self.to_bytes())
+        return len(self._encoded)
 
     def to_bytes(self):
-        out: List[Optional[int]] = list()
+        return self._encoded
+
+    def _encode(self) -> bytes:
+        """
+        A client address is 1 byte. A server address is 1 byte with only the logical
+        address, 2 bytes with a logical and a physical address of at most 7 bits
+        each, or 4 bytes where both are split into a higher and a lower byte.
+        The LSB of the last byte marks the end of the address.
+        """
         if self.address_type == "client":
             # shift left 1 bit and set the lsb to mark end of address.
-            out.append(((self.logical_address << 1) | 0b00000001))
-        else:
-            # server address type
-
-            logical_higher, logical_lower = self._split_address(self.logical_address)
+            return bytes(((self.logical_address << 1) | 0b00000001,))
 
-            if self.physical_address:
-                physical_higher, physical_lower = self._split_address(
-                    self.physical_address
+        if self.physical_address is None:
+            if self.logical_address > 0b01111111:
+                raise ValueError(
+                    f"Server logical address {self.logical_address} is more than 7 "
+                    f"bits and can only be encoded together with a physical address"
                 )
-                # mark physical lower as end
-                physical_lower = physical_lower | 0b00000001
-                out.extend(
-                    [logical_higher, logical_lower, physical_higher, physical_lower]
-                )
-            else:
-                # no physical address so mark the logial as end.
-                logical_lower = logical_lower | 0b00000001
-                out.extend([logical_higher, logical_lower])
-
-        out_bytes = list()
-        for address in out:
-            if address:
-                out_bytes.append(address.to_bytes(1, "big"))
+            return bytes(((self.logical_address << 1) | 0b00000001,))
+
+        if self.logical_address > 0b01111111 or self.physical_address > 0b01111111:
+            # Both bytes of each split address are always sent, even if the higher
+            # byte is 0, so the address is 4 bytes.
+            out = [
+                *self._split_address(self.logical_address),
+                *self._split_address(self.physical_address),
+            ]
+        else:
+            out = [self.logical_address << 1, self.physical_address << 1]
 
-        return b"".join(out_bytes)
+        # mark the last byte as end
+        out[-1] |= 0b00000001
+        return bytes(out)
 
     @staticmethod
     def _split_address(address: int) -> Tuple[int, int]:
-
-        if address > 0b01111111:
-            lower = (address & 0b0000000001111111) << 1
-            higher = (address & 0b0011111110000000) >> 6
-
-        else:
-            lower = address << 1
-            higher = None
-
+        """
+        Splits an address of up to 14 bits in a higher and a lower byte of 7 bits
+        each, shifted left to leave room for the end marker.
+        """
+        lower = (address & 0b0000000001111111) << 1
+        higher = (address & 0b0011111110000000) >> 6
         return higher, lower
 
     @staticmethod
@@ -85,22 +102,47 @@ class HdlcAddress:
         return address.to_bytes(1, "big")
 
     @classmethod
-    def destination_from_bytes(cls, frame_bytes: bytes, address_type: str):
-        destination_address_data, _ = HdlcAddress.find_address_in_frame_bytes(
-            frame_bytes)
-        destination_logical, destination_physical, destination_length = (
-            destination_address_data)
+    def from_bytes(cls, address_bytes: bytes, address_type: str) -> "HdlcAddress":
+        """
+        Returns the address encoded in 1, 2 or 4 bytes. Instances are cached on the
+        raw bytes and address type.
+        """
+        return _address_from_bytes(bytes(address_bytes), address_type)
 
-        return cls(destination_logical,
-            destination_physical, address_type)
+    @classmethod
+    def destination_from_bytes(cls, frame_bytes: bytes, address_type: str):
+        destination_length = cls.address_length_at(
+            frame_bytes, ADDRESS_START_POSITION
+        )
+        return cls.from_bytes(
+            frame_bytes[
+                ADDRESS_START_POSITION : ADDRESS_START_POSITION + destination_length
+            ],
+            address_type,
+        )
 
     @classmethod
     def source_from_bytes(cls, frame_bytes: bytes, address_type: str):
-        _, source_address_data = HdlcAddress.find_address_in_frame_bytes(
-            frame_bytes)
+        source_start = ADDRESS_START_POSITION + cls.address_length_at(
+            frame_bytes, ADDRESS_START_POSITION
+        )
+        source_length = cls.address_length_at(frame_bytes, source_start)
+        return cls.from_bytes(
+            frame_bytes[source_start : source_start + source_length], address_type
+        )
 
-        source_logical, source_physical, source_length = source_address_data
-        return cls(source_logical, source_physical, address_type)
+    @staticmethod
+    def address_length_at(hdlc_frame_bytes: bytes, position: int) -> int:
+        """
+        address can be 1, 2 or 4 bytes long. the end byte is indicated by the of
+        the last byte LSB being 1
+        """
+        for offset, length in ((0, 1), (1, 2), (3, 4)):
+            if hdlc_frame_bytes[position + offset] & 0b00000001:
+                return length
+        raise hdlc_exceptions.HdlcParsingError(
+            f"Could not find the end of the HDLC address starting at {position}"
+        )
 
     @staticmethod
     def find_address_in_frame_bytes(
@@ -114,74 +156,53 @@ class HdlcAddress:
         :param frame_bytes:
         :return:
         """
+        destination_length = HdlcAddress.address_length_at(
+            hdlc_frame_bytes, ADDRESS_START_POSITION
+        )
+        source_start = ADDRESS_START_POSITION + destination_length
+        source_length = HdlcAddress.address_length_at(hdlc_frame_bytes, source_start)
 
-        # Find destination address.
-        destination_length = 1
-        destination_logical = 0
-        destination_physical = 0
-        destination_positions_list = [(3, 1), (4, 2), (6, 4)]
-        for pos, _length in destination_positions_list:
-            end_byte = hdlc_frame_bytes[pos]
-            if bool(end_byte & 0b00000001):
-                # Found end byte:
-                destination_length = _length
-                break
-            continue
-        if destination_length == 1:
-            address_bytes = hdlc_frame_bytes[3]
-            destination_logical = address_bytes >> 1
-            destination_physical = None
-
-        elif destination_length == 2:
-            address_bytes = hdlc_frame_bytes[3:5]
-            destination_logical = address_bytes[0] >> 1
-            destination_physical = address_bytes[1] >> 1
-
-        elif destination_length == 4:
-            address_bytes = hdlc_frame_bytes[3:7]
-            destination_logical = HdlcAddress.parse_two_byte_address(address_bytes[:2])
-            destination_physical = HdlcAddress.parse_two_byte_address(address_bytes[3:])
-
-        # Find source address
-        source_length = 1
-        source_logical = 0
-        source_physical = 0
-        source_position_list = [
-            (item[0] + destination_length, item[1])
-            for item in destination_positions_list
-        ]
-        for pos, _length in source_position_list:
-            end_byte = hdlc_frame_bytes[pos]
-            if bool(end_byte & 0b00000001):
-                # Found end byte:
-                source_length = _length
-                break
-            continue
-        if source_length == 1:
-            address_bytes = hdlc_frame_bytes[3 + destination_length]
-            source_logical = address_bytes >> 1
-            source_physical = None
-
-        elif source_length == 2:
-            address_bytes = hdlc_frame_bytes[3 + destination_length : 5 + source_length]
-            source_logical = address_bytes[0] >> 1
-            source_physical = address_bytes[1] >> 1
-
-        elif destination_length == 4:
-            address_bytes = hdlc_frame_bytes[3 + destination_length : 7 + source_length]
-            source_logical = HdlcAddress.parse_two_byte_address(address_bytes[:2])
-            source_physical = HdlcAddress.parse_two_byte_address(address_bytes[3:])
+        destination_logical, destination_physical = HdlcAddress.parse_address_bytes(
+            hdlc_frame_bytes[ADDRESS_START_POSITION:source_start]
+        )
+        source_logical, source_physical = HdlcAddress.parse_address_bytes(
+            hdlc_frame_bytes[source_start : source_start + source_length]
+        )
 
         return (
             (destination_logical, destination_physical, destination_length),
             (source_logical, source_physical, source_length),
         )
 
+    @staticmethod
+    def parse_address_bytes(address_bytes: bytes) -> Tuple[int, Optional[int]]:
+        """
+        Returns logical and physical address from the 1, 2 or 4 bytes of an address.
+        """
+        if len(address_bytes) == 1:
+            return address_bytes[0] >> 1, None
+        elif len(address_bytes) == 2:
+            return address_bytes[0] >> 1, address_bytes[1] >> 1
+        elif len(address_bytes) == 4:
+            return (
+                HdlcAddress.parse_two_byte_address(address_bytes[:2]),
+                HdlcAddress.parse_two_byte_address(address_bytes[2:]),
+            )
+        raise hdlc_exceptions.HdlcParsingError(
+            f"HDLC address can only be 1, 2 or 4 bytes. Got {len(address_bytes)}"
+        )
+
     @staticmethod
     def parse_two_byte_address(address_bytes: bytes):
-        if address_bytes != 2:
+        if len(address_bytes) != 2:
             raise ValueError(f"Can only parse 2 bytes for address")
         upper = address_bytes[0] >> 1
         lower = address_bytes[1] >> 1
 
         return lower + (upper << 7)
+
+
+@functools.lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def _address_from_bytes(address_bytes: bytes, address_type: str) -> HdlcAddress:
+    logical, physical = HdlcAddress.parse_address_bytes(address_bytes)
+    return HdlcAddress(logical, physical, address_type)
@@ -0,0 +1,207 @@
+"""
+Verification of HCS and FCS for many HDLC frames at once. Used when reprocessing
+archived frames where there is no need to parse the frames, only to know if they
+where received correctly.
+
+If NumPy is installed the CRC is calculated for all frames of the same length at
+the same time, one byte position per step. Otherwise each frame is verified using
+`frames.HCS` and `frames.FCS`, which is also the reference implementation.
+"""
+from typing import *
+
+from dlms_cosem.protocol import crc
+from dlms_cosem.protocol.hdlc import fields, frames
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# Flag, format (2), destination address (1), source address (1), control, FCS (2), Flag
+MIN_FRAME_LENGTH = 9
+
+FRAME_OK = -1
+
+
+def split_frames(buffer) -> List[memoryview]:
+    """
+    Splits a buffer of consecutive HDLC frames into the separate frames using the
+    length in the frame format field. Frames can either have their own flags or share
+    the flag between them (7e{frame}7e{frame}7e).
+
+    Splitting stops at the first position that is not the start of a frame. The
+    returned frames are views into the buffer, no data is copied.
+    """
+    view = memoryview(buffer)
+    flag = frames.HDLC_FLAG[0]
+    out = list()
+    position = 0
+    end = len(view)
+    while position + 3 <= end:
+        if view[position] != flag:
+            break
+        length = ((view[position + 1] & 0b00000111) << 8) | view[position + 2]
+        frame_end = position + length + 2
+        if length == 0 or frame_end > end:
+            break
+        out.append(view[position:frame_end])
+        position = frame_end - 1
+        if position + 1 < end and view[position + 1] == flag:
+            # Frames don't share flags.
+            position += 1
+    return out
+
+
+def _address_length(frame, start: int) -> int:
+    """Addresses are 1, 2 or 4 bytes. The last byte has its LSB set."""
+    for offset, length in ((0, 1), (1, 2)):
+        if start + offset < len(frame) and frame[start + offset] & 0b00000001:
+            return length
+    return 4
+
+
+def verify_frame(frame) -> int:
+    """
+    Verifies a single frame. Returns FRAME_OK (-1) if the frame is correct, otherwise
+    the position in the frame of the first field that is not correct:
+
+    * 0: Missing opening flag.
+    * 1: Frame format field is not correct or does not match the length of the frame.
+    * Position of the HCS if the HCS is not correct.
+    * Position of the FCS if the FCS is not correct.
+    * Last position if the closing flag is missing.
+    """
+    frame = memoryview(frame)
+    length = len(frame)
+    flag = frames.HDLC_FLAG[0]
+    if length == 0 or frame[0] != flag:
+        return 0
+    if length < MIN_FRAME_LENGTH:
+        return 1
+    if not (
+        fields.DlmsHdlcFrameFormatField.correct_frame_format(frame[1:3])
+        and ((frame[1] & 0b00000111) << 8) | frame[2] == length - 2
+    ):
+        return 1
+
+    destination_length = _address_length(frame, 3)
+    source_length = _address_length(frame, 3 + destination_length)
+    hcs_position = 3 + destination_length + source_length + 1
+    fcs_position = length - 3
+
+    if fcs_position > hcs_position:
+        hcs = frames.HCS.calculate_for(frame[1:hcs_position])
+        if hcs != frame[hcs_position : hcs_position + 2]:
+            return hcs_position
+
+    if frames.FCS.calculate_for(frame[1:fcs_position]) != frame[fcs_position:-1]:
+        return fcs_position
+
+    if frame[-1] != flag:
+        return length - 1
+
+    return FRAME_OK
+
+
+def verify_many(frames_or_buffer, use_numpy: Optional[bool] = None):
+    """
+    Verifies HCS and FCS for many frames.
+
+    :param frames_or_buffer: A list of frames or a buffer of consecutive frames.
+    :param use_numpy: Force or disable use of NumPy. Default is to use it if installed.
+    :return: Tuple of (valid, error_positions). `valid` is a boolean per frame and
+        `error_positions` the result of `verify_frame` for each frame. NumPy arrays
+        are returned when NumPy is used, else lists.
+    """
+    if isinstance(frames_or_buffer, (bytes, bytearray, memoryview)):
+        frame_list = split_frames(frames_or_buffer)
+    else:
+        frame_list = list(frames_or_buffer)
+
+    if use_numpy is None:
+        use_numpy = np is not None
+    elif use_numpy and np is None:
+        raise ImportError("NumPy is needed for verify_many(use_numpy=True)")
+
+    if use_numpy:
+        errors = _verify_many_numpy(frame_list)
+        return errors == FRAME_OK, errors
+
+    errors = [verify_frame(frame) for frame in frame_list]
+    return [error == FRAME_OK for error in errors], errors
+
+
+def _verify_many_numpy(frame_list):
+    count = len(frame_list)
+    errors = np.full(count, FRAME_OK, dtype=np.int64)
+    lengths = np.fromiter((len(frame) for frame in frame_list), np.int64, count)
+
+    # Frames of the same length can be stacked in a 2D array without padding.
+    for length in np.unique(lengths):
+        indexes = np.flatnonzero(lengths == length)
+        if length < MIN_FRAME_LENGTH:
+            errors[indexes] = [verify_frame(frame_list[i]) for i in indexes]
+            continue
+        data = np.frombuffer(
+            b"".join(frame_list[i] for i in indexes), dtype=np.uint8
+        ).reshape(len(indexes), int(length))
+        errors[indexes] = _verify_equal_length_frames(data)
+
+    return errors
+
+
+_NP_TABLE = None
+
+
+def _numpy_table():
+    global _NP_TABLE
+    if _NP_TABLE is None:
+        _NP_TABLE = np.array(crc.CRC16_REFLECTED_TABLE, dtype=np.uint16)
+    return _NP_TABLE
+
+
+def _address_lengths(data, start):
+    rows = np.arange(data.shape[0])
+    last = data.shape[1] - 1
+    first = data[rows, np.minimum(start, last)] & 1
+    second = data[rows, np.minimum(start + 1, last)] & 1
+    return np.where(first, 1, np.where(second, 2, 4))
+
+
+def _verify_equal_length_frames(data):
+    table = _numpy_table()
+    rows, length = data.shape
+    flag = frames.HDLC_FLAG[0]
+
+    declared_length = ((data[:, 1].astype(np.int64) & 0b00000111) << 8) | data[:, 2]
+    format_ok = ((data[:, 1] & 0b11110000) == 0b10100000) & (
+        declared_length == length - 2
+    )
+
+    destination_length = _address_lengths(data, 3)
+    source_length = _address_lengths(data, 3 + destination_length)
+    hcs_position = 3 + destination_length + source_length + 1
+    fcs_position = length - 3
+    has_hcs = fcs_position > hcs_position
+
+    # The register is checked against the residue after the last byte of the HCS.
+    hcs_check_column = np.where(has_hcs, hcs_position + 1, -1)
+    check_columns = set(np.unique(hcs_check_column[has_hcs]).tolist())
+    hcs_register = np.zeros(rows, dtype=np.uint16)
+
+    register = np.full(rows, crc.CRC16_INITIAL_VALUE, dtype=np.uint16)
+    for column in range(1, length - 1):
+        register = (register >> 8) ^ table[(register ^ data[:, column]) & 0xFF]
+        if column in check_columns:
+            at_column = hcs_check_column == column
+            hcs_register[at_column] = register[at_column]
+
+    hcs_ok = ~has_hcs | (hcs_register == crc.CRC16_GOOD_RESIDUE)
+    fcs_ok = register == crc.CRC16_GOOD_RESIDUE
+
+    errors = np.where(data[:, -1] != flag, length - 1, FRAME_OK)
+    errors = np.where(fcs_ok, errors, fcs_position)
+    errors = np.where(hcs_ok, errors, hcs_position)
+    errors = np.where(format_ok, errors, 1)
+    errors = np.where(data[:, 0] != flag, 0, errors)
+    return errors
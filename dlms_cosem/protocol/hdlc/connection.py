@@ -1,42 +1,31 @@
+import collections
 import logging
+from typing import *
 
 import attr
 
-from dlms_cosem.protocol.hdlc import address, exceptions, frames
+from dlms_cosem.protocol.crc import IncrementalCRCCCITT
+from dlms_cosem.protocol.hdlc import (
+    address,
+    exceptions,
+    fields,
+    frames,
+    segmentation,
+)
 from dlms_cosem.protocol.hdlc.state import (
     AWAITING_CONNECTION,
-    AWAITING_DISCONNECT,
     AWAITING_RESPONSE,
+    HDLC_STATE_TRANSITIONS,
     NEED_DATA,
     HdlcConnectionState,
 )
 
 LOG = logging.getLogger(__name__)
 
-
-class HdlcFrameFactory:
-    @staticmethod
-    def read_ua_frame(frame_data: bytes):
-        try:
-            return frames.UnNumberedAcknowledgmentFrame.from_bytes(frame_data)
-        except exceptions.HdlcParsingError as e:
-            LOG.exception(e)
-            return None
-
-    @staticmethod
-    def read_information_frame(frame_data: bytes):
-        try:
-            return frames.InformationFrame.from_bytes(frame_data)
-        except exceptions.HdlcParsingError as e:
-            LOG.exception(e)
-            return None
-
-
-PARSE_METHODS = {
-    AWAITING_CONNECTION: HdlcFrameFactory.read_ua_frame,
-    AWAITING_RESPONSE: HdlcFrameFactory.read_information_frame,
-    AWAITING_DISCONNECT: HdlcFrameFactory.read_ua_frame,
-}
+# Format (2), destination address (1), source address (1), control and FCS (2).
+MIN_FRAME_FORMAT_LENGTH = 7
+# Opening flag (1), format (2), addresses (at most 4 + 4), control (1) and HCS (2).
+MAX_HEADER_LENGTH = 14
 
 
 @attr.s(auto_attribs=True)
@@ -55,8 +44,43 @@ class HdlcConnection:
     client_address: address.HdlcAddress
     server_address: address.HdlcAddress
     state: HdlcConnectionState = attr.ib(factory=HdlcConnectionState)
+    parser: frames.HdlcFrameParser = attr.ib(factory=frames.HdlcFrameParser)
     buffer: bytearray = attr.ib(factory=bytearray)
-    buffer_search_position: int = 1
+    # HDLC parameters proposed in the SNRM. Replaced by the negotiated parameters when
+    # the UA is received.
+    parameters: fields.HdlcParameters = attr.ib(factory=fields.HdlcParameters)
+    # Number of times frames are sent again when the server doesn't answer or asks
+    # for them again, before giving up.
+    max_retries: int = attr.ib(default=3)
+
+    # Received bytes before this position have been consumed. They are removed from
+    # the buffer in bulk by `_compact_buffer` and not for every frame.
+    _read_position: int = attr.ib(default=0, init=False, repr=False)
+    # End of the frame currently being received, known once its frame format field
+    # has been received.
+    _frame_end: Optional[int] = attr.ib(default=None, init=False, repr=False)
+    # Set when the HCS of the frame currently being received has been verified, so
+    # the length in its frame format field can be trusted.
+    _header_checked: bool = attr.ib(default=False, init=False, repr=False)
+    # Incremental FCS of the frame currently being received. Bytes are fed to it as
+    # they arrive so the frame is verified as soon as its last byte is received.
+    _fcs: IncrementalCRCCCITT = attr.ib(
+        factory=IncrementalCRCCCITT, init=False, repr=False
+    )
+    _fcs_position: int = attr.ib(default=0, init=False, repr=False)
+    # Complete frames with correct FCS waiting to be parsed.
+    _frames: Deque[bytes] = attr.ib(factory=collections.deque, init=False, repr=False)
+
+    # Last received segment while receiving a segmented APDU.
+    _previous_segment: Optional[frames.InformationFrame] = attr.ib(
+        default=None, init=False, repr=False
+    )
+    _reassembler: segmentation.SegmentReassembler = attr.ib(
+        factory=segmentation.SegmentReassembler, init=False, repr=False
+    )
+    _received_information: Optional[bytes] = attr.ib(
+        default=None, init=False, repr=False
+    )
 
     def send(self, frame) -> bytes:
         """
@@ -68,6 +92,38 @@ class HdlcConnection:
         self.state.process_frame(frame)
         return frame.to_bytes()
 
+    def poll(self) -> bytes:
+        """
+        Returns the bytes of a RR asking the server to send the I-frames of the
+        response again, starting at the current receive sequence number. Used when a
+        frame of the response was lost and the frames after it were discarded.
+        """
+        frame = frames.ReceiveReadyFrame(
+            destination_address=self.server_address,
+            source_address=self.client_address,
+            receive_sequence_number=self.state.receive_sequence_number,
+        )
+        self.state.process_sent_poll(frame)
+        return frame.to_bytes()
+
+    def reset(self):
+        """
+        Forgets the HDLC connection and all received data, so a new connection can
+        be set up with a SNRM. Used when the server stops answering, since it
+        can't be known which of the sent frames it got.
+        """
+        self.state.reset()
+        self.buffer.clear()
+        self._read_position = 0
+        self._frame_end = None
+        self._header_checked = False
+        self._fcs.reset()
+        self._fcs_position = 0
+        self._frames.clear()
+        self._previous_segment = None
+        self._reassembler = segmentation.SegmentReassembler()
+        self._received_information = None
+
     def receive_data(self, data: bytes):
         """
         Add data into the receive buffer.
@@ -75,68 +131,318 @@ class HdlcConnection:
         """
         if data:
             self.buffer += data
+            self._scan_for_frames()
+            self._compact_buffer()
 
-    def next_event(self):
+    @property
+    def missing_bytes(self) -> int:
         """
-        Will try to parse a frame from the buffer. If a frame is found the buffer is
-        cleared of the bytes making up the frame and the frame is returned.
-        If the frame is not parsable we assume it is not compleate and we return a
-        NEED_DATA event to signal we need to receive more data.
-        :return:
+        Number of bytes still missing to complete the frame being received. Until the
+        frame format field is received the length of the frame is not known and the
+        bytes up to the end of the frame format field are counted, and until the
+        header is verified the bytes up to the end of the longest possible header.
         """
+        if self._frame_end is not None:
+            if not self._header_checked:
+                header_end = min(
+                    self._frame_end, self._read_position + MAX_HEADER_LENGTH
+                )
+                return max(header_end - len(self.buffer), 1)
+            return self._frame_end - len(self.buffer)
+        return max(self._read_position + 3 - len(self.buffer), 1)
 
-        frame_bytes = self._find_frame()
-        if frame_bytes is None:
-            return NEED_DATA
+    def _scan_for_frames(self):
+        """
+        Extracts all complete frames from the received data.
 
-        # get the state variable parser method.
-        parse_method = PARSE_METHODS[self.state.current_state]
+        The frame format field after the opening flag holds the length of the frame,
+        so there is no need to search for the closing flag. A 0x7e in the data can
+        never be taken for a frame end. Once the format field is received we know
+        where the frame ends and only check that there is a flag at that position and
+        that the FCS is correct.
 
-        frame = parse_method(frame_bytes)
+        A flag followed by what looks like a frame format field can also be line
+        noise. So before waiting for the rest of the frame the HCS is checked as soon
+        as the header is received, and a wrong length is rejected after a few bytes.
 
-        if frame is None:
-            return NEED_DATA
+        With windowing frames can share flags: 7e{frame}7e{frame}7e. So the closing
+        flag of a frame is left in the buffer as a possible opening flag of the next.
 
-        self.state.process_frame(frame)
-        self._tidy_buffer()
-        return frame
+        If the frame is not correct we resynchronize on the next flag after the start
+        of the frame.
+        """
+        buffer = self.buffer
+        flag = frames.HDLC_FLAG[0]
+        with memoryview(buffer) as view:
+            while True:
+                available = len(buffer)
+                start = self._read_position
+
+                if self._frame_end is None:
+                    if start >= available:
+                        break
+                    if buffer[start] != flag:
+                        next_flag = buffer.find(flag, start)
+                        if next_flag == -1:
+                            next_flag = available
+                        LOG.debug(
+                            f"Discarding data outside of HDLC frame: "
+                            f"{bytes(view[start:next_flag])!r}"
+                        )
+                        self._read_position = next_flag
+                        continue
+                    if start + 3 > available:
+                        break
+                    if buffer[start + 1] == flag:
+                        # Repeated flags between frames.
+                        self._read_position += 1
+                        continue
+
+                    format_bytes = view[start + 1 : start + 3]
+                    length = fields.DlmsHdlcFrameFormatField.get_length_from_bytes(
+                        format_bytes
+                    )
+                    if (
+                        not fields.DlmsHdlcFrameFormatField.correct_frame_format(
+                            format_bytes
+                        )
+                        or length < MIN_FRAME_FORMAT_LENGTH
+                    ):
+                        self._read_position += 1
+                        continue
+
+                    self._frame_end = start + length + 2
+                    self._header_checked = False
+                    self._fcs.reset()
+                    self._fcs_position = start + 1
+
+                frame_end = self._frame_end
+                if not self._header_checked:
+                    header_end = self._header_end(buffer, start, available)
+                    if header_end is None:
+                        break
+                    hcs_end = header_end + 2
+                    if header_end == frame_end - 3:
+                        # A frame without information field has no HCS. The FCS
+                        # directly follows the control field.
+                        valid = True
+                    elif header_end == -1 or hcs_end > frame_end - 3:
+                        valid = False
+                    elif hcs_end > available:
+                        break
+                    else:
+                        valid = IncrementalCRCCCITT(view[start + 1 : hcs_end]).is_valid
+                    if not valid:
+                        LOG.warning(
+                            f"Discarding HDLC frame with incorrect header: "
+                            f"{bytes(view[start:min(available, frame_end)])!r}"
+                        )
+                        self._frame_end = None
+                        self._read_position = start + 1
+                        continue
+                    self._header_checked = True
 
-    def _find_frame(self):
+                fcs_end = min(available, frame_end - 1)
+                if fcs_end > self._fcs_position:
+                    self._fcs.update(view[self._fcs_position : fcs_end])
+                    self._fcs_position = fcs_end
+
+                if available < frame_end:
+                    break
+
+                self._frame_end = None
+                if buffer[frame_end - 1] == flag and self._fcs.is_valid:
+                    self._frames.append(bytes(view[start:frame_end]))
+                    self._read_position = frame_end - 1
+                else:
+                    LOG.warning(
+                        f"Discarding HDLC frame with incorrect FCS or missing end "
+                        f"flag: {bytes(view[start:frame_end])!r}"
+                    )
+                    self._read_position = start + 1
+
+    @staticmethod
+    def _header_end(buffer: bytearray, start: int, available: int) -> Optional[int]:
         """
-        To find a frame in the buffer we need to assume somethings.
-        1. The first character in the buffer should be the HDLC_FLAG.
-            During normal operations we will have frames with flags on both ends.
-            But with windowing one might be omitted in long information frame exchanges
-            Ex: 7e{frame}7e{frame}7e. The second one would not have an initial 7e after we take out the first frame.
-            So if the intial byte is not 7e we should manually add it.
+        Returns the position after the control field of the frame starting at
+        `start`. None if the addresses are not received yet and -1 if an address
+        doesn't end within 4 bytes.
+        """
+        position = start + address.ADDRESS_START_POSITION
+        for _ in range(2):
+            for offset, length in ((0, 1), (1, 2), (3, 4)):
+                if position + offset >= available:
+                    return None
+                if buffer[position + offset] & 0b00000001:
+                    position += length
+                    break
+            else:
+                return -1
+        return position + 1
 
-        2. We might find an incomplete frame if the second 7e was found as data and not
-            actually an end flag. So we need to keep the current end memory so we can extend the search if we cant parse the frame.
+    def _compact_buffer(self):
+        """
+        Removes consumed bytes from the buffer. This is only done when at least as
+        many bytes have been consumed as there are left in the buffer, so each
+        received byte is moved a constant number of times on average.
+        """
+        consumed = self._read_position
+        if consumed == 0 or consumed < len(self.buffer) - consumed:
+            return
+        del self.buffer[:consumed]
+        self._read_position = 0
+        self._fcs_position -= consumed
+        if self._frame_end is not None:
+            self._frame_end -= consumed
 
-        3. Once we have parsed a proper frame we shoudl call clear buffer that will remove the data for the frame from the buffer.
+    def next_event(self):
+        """
+        Will try to parse a frame from the received data. If there is no complete
+        frame received we return a NEED_DATA event to signal we need to receive more
+        data.
+
+        Any type of frame is parsed and it is up to the state machine to validate if
+        the frame is acceptable in the current state. If not a LocalProtocolError is
+        raised. Frames that can't be parsed are discarded.
+
+        Frames that are not sent from the server to the client of this connection are
+        discarded. On a multi-drop bus they can be late answers from another meter.
+
+        I-frames with another send sequence number than expected are discarded. They
+        are repeated frames, sent again by the server when a request was sent again,
+        or frames after a lost frame. The client asks the server for the missing
+        frames with `poll` when no more frames are received.
+
+        UA and DM frames that are not expected in the current state are discarded.
+        They are late answers to a SNRM or DISC that was sent again after a timeout,
+        when the answer to the first one was received as well.
         :return:
         """
-        try:
-            frame_end = (
-                self.buffer.index(frames.HDLC_FLAG, self.buffer_search_position) + 1
-            )
-        except ValueError:
-            # .index raises ValueError on not finding subsection
-            return None
+        while self._frames:
+            frame_bytes = self._frames.popleft()
+            try:
+                frame = self.parser.parse(
+                    frame_bytes,
+                    fcs_verified=True,
+                    previous_segment=self._previous_segment,
+                )
+            except exceptions.HdlcParsingError as e:
+                LOG.warning(f"Discarding HDLC frame {frame_bytes!r}: {e}")
+                continue
+
+            if (
+                frame.source_address != self.server_address
+                or frame.destination_address != self.client_address
+            ):
+                LOG.warning(f"Discarding HDLC frame for another connection {frame!r}")
+                continue
 
-        frame_bytes = self.buffer[:frame_end]
-        self.buffer_search_position = frame_end
+            if self._out_of_sequence(frame):
+                LOG.warning(f"Discarding out of sequence I-frame {frame!r}")
+                continue
 
-        if not frame_bytes.startswith(frames.HDLC_FLAG):
-            frame_bytes.insert(0, ord(frames.HDLC_FLAG))
+            if self._stale(frame):
+                LOG.warning(f"Discarding late answer to a repeated command {frame!r}")
+                continue
 
-        return frame_bytes
+            previous_state = self.state.current_state
+            self.state.process_frame(frame)
+            if isinstance(frame, frames.InformationFrame):
+                self._collect_information(frame)
+            elif previous_state is AWAITING_CONNECTION and isinstance(
+                frame, frames.UnNumberedAcknowledgmentFrame
+            ):
+                self._negotiate_parameters(frame)
+            return frame
 
-    def _tidy_buffer(self):
+        return NEED_DATA
+
+    def _out_of_sequence(self, frame) -> bool:
+        return (
+            isinstance(frame, frames.InformationFrame)
+            and self.state.current_state is AWAITING_RESPONSE
+            and frame.send_sequence_number != self.state.receive_sequence_number
+        )
+
+    def _stale(self, frame) -> bool:
+        return isinstance(
+            frame,
+            (frames.UnNumberedAcknowledgmentFrame, frames.DisconnectModeFrame),
+        ) and type(frame) not in HDLC_STATE_TRANSITIONS.get(
+            self.state.current_state, {}
+        )
+
+    def _negotiate_parameters(self, frame: frames.UnNumberedAcknowledgmentFrame):
+        """
+        The UA holds the parameters the server accepted. If it has no information
+        field the default values are used.
+        """
+        try:
+            response = fields.HdlcParameters.from_bytes(frame.payload)
+        except exceptions.HdlcParsingError as e:
+            LOG.warning(f"Could not parse HDLC parameters in UA, using defaults: {e}")
+            response = fields.HdlcParameters()
+
+        self.parameters = self.parameters.negotiate(response)
+        self.state.window_size_transmit = self.parameters.window_size_transmit
+        self.state.window_size_receive = self.parameters.window_size_receive
+        LOG.debug(f"Negotiated HDLC parameters: {self.parameters}")
+
+    def _collect_information(self, frame: frames.InformationFrame):
         """
-        Remove the bytes we have extracted.
+        The information of segments is copied into the reassembly buffer as they are
+        received. A frame that isn't segmented completes the APDU.
         """
-        del self.buffer[: self.buffer_search_position]
-        self.buffer_search_position = 1
+        if frame.segmented:
+            self._reassembler.add(frame.payload)
+            self._previous_segment = frame
+        elif self._previous_segment is not None:
+            self._reassembler.add(frame.payload)
+            self._previous_segment = None
+            self._received_information = self._reassembler.take()
+        else:
+            self._received_information = frame.payload
 
+    def take_information(self):
+        """
+        Returns the information of the last completely received APDU, reassembled if
+        it was sent in several segments, or None if no APDU has been completed since
+        the last call.
+        """
+        information = self._received_information
+        self._received_information = None
+        return information
 
+
+def make_hdlc_connection(
+    client_logical_address: int,
+    server_logical_address: int,
+    server_physical_address: Optional[int] = None,
+    client_physical_address: Optional[int] = None,
+    max_information_length: int = segmentation.DEFAULT_MAX_INFORMATION_LENGTH,
+    window_size: int = 1,
+    max_retries: int = 3,
+) -> HdlcConnection:
+    """
+    Creates a client connection from the logical and physical addresses and the HDLC
+    parameters to propose.
+    """
+    return HdlcConnection(
+        client_address=address.HdlcAddress(
+            logical_address=client_logical_address,
+            physical_address=client_physical_address,
+            address_type="client",
+        ),
+        server_address=address.HdlcAddress(
+            logical_address=server_logical_address,
+            physical_address=server_physical_address,
+            address_type="server",
+        ),
+        parameters=fields.HdlcParameters(
+            max_information_length_transmit=max_information_length,
+            max_information_length_receive=max_information_length,
+            window_size_transmit=window_size,
+            window_size_receive=window_size,
+        ),
+        max_retries=max_retries,
+    )
@@ -12,4 +12,12 @@ class HdlcParsingError(HdlcException):
 
 
 class MissingHdlcFlags(HdlcParsingError):
-    """Frame is not enclosed byt HDLC flags"""
\ No newline at end of file
+    """Frame is not enclosed byt HDLC flags"""
+
+
+class TransmissionFailed(HdlcException):
+    """The server did not receive the frames within the allowed number of retries"""
+
+
+class ServerDisconnected(HdlcException):
+    """The server answered with DM or FRMR, the HDLC connection must be set up again"""
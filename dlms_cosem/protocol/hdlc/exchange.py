@@ -0,0 +1,235 @@
+"""
+Sans-IO exchanges on a HdlcConnection.
+
+Each exchange is a generator that drives a HdlcConnection through one operation:
+setting up the connection, sending an APDU and receiving the response, or
+disconnecting. It yields the bytes that should be written to the line and is sent
+the next event (frame) received from the connection. It yields b"" when there is
+nothing to write but more frames are expected. The result of the exchange is the
+return value of the generator.
+
+This keeps the protocol flow out of the clients, a client only needs to move bytes:
+
+    exchange = send_information(connection, apdu)
+    to_write = next(exchange)
+    while True:
+        write(to_write)
+        try:
+            to_write = exchange.send(read_next_event())
+        except StopIteration as done:
+            return done.value
+
+Since the line is idle every time an exchange yields bytes to write, several
+exchanges on different connections can be interleaved at those points.
+
+If no response is received in time the client sends `state.TIMEOUT` instead of a
+frame. The exchange then yields the last written bytes again, up to
+`max_retries` times of the connection, so a frame lost on a noisy line doesn't
+need a new connection to be set up. Once a frame of a response is received the
+request is acknowledged, and the server is instead asked with a RR to send the
+frames of the response again from the first one that is missing. When the retries
+run out the connection is reset to NOT_CONNECTED and TransmissionFailed is raised,
+so the client can connect again.
+"""
+import collections
+import logging
+from typing import *
+
+from dlms_cosem.protocol.hdlc import exceptions, fields, frames, segmentation, state
+from dlms_cosem.protocol.hdlc.connection import HdlcConnection
+
+LOG = logging.getLogger(__name__)
+
+Exchange = Generator[bytes, frames.BaseHdlcFrame, Any]
+
+
+def run(exchange: Exchange, write: Callable[[bytes], Any], next_event: Callable):
+    """
+    Runs an exchange to completion with blocking I/O.
+    """
+    to_write = next(exchange)
+    while True:
+        if to_write:
+            write(to_write)
+        try:
+            to_write = exchange.send(next_event())
+        except StopIteration as done:
+            return done.value
+
+
+def _await_response(
+    connection: HdlcConnection,
+    to_write: bytes,
+    resend: Optional[Callable[[], bytes]] = None,
+) -> Exchange:
+    """
+    Yields `to_write` and returns the response. On timeout the bytes returned by
+    `resend` are yielded, or `to_write` again if it is not given.
+    """
+    for retry in range(connection.max_retries):
+        response = yield to_write
+        if response is not state.TIMEOUT:
+            return response
+        LOG.info(f"No response, sending again. Retry {retry + 1}")
+        if resend is not None:
+            to_write = resend()
+    response = yield to_write
+    if response is state.TIMEOUT:
+        connection.reset()
+        raise exceptions.TransmissionFailed(
+            f"No response after {connection.max_retries} retries"
+        )
+    return response
+
+
+def _await_ready_response(
+    connection: HdlcConnection,
+    to_write: bytes,
+    resend: Optional[Callable[[], bytes]] = None,
+) -> Exchange:
+    """
+    Like `_await_response`, but while the server answers RNR it is busy. It is then
+    given the response timeout before it is polled with a RR, up to `max_retries`
+    times.
+    """
+    response = yield from _await_response(connection, to_write, resend)
+    polls = 0
+    while isinstance(response, frames.ReceiveNotReadyFrame):
+        if polls == connection.max_retries:
+            connection.reset()
+            raise exceptions.TransmissionFailed(
+                f"Server still busy after {polls} polls"
+            )
+        polls += 1
+        LOG.info("Server is busy, polling it after the response timeout")
+        response = yield from _await_response(connection, b"", resend=connection.poll)
+    return response
+
+
+def _check_connected(response):
+    if isinstance(response, (frames.DisconnectModeFrame, frames.FrameRejectFrame)):
+        raise exceptions.ServerDisconnected(
+            f"Server answered with {response!r} instead of a response"
+        )
+
+
+def connect(connection: HdlcConnection) -> Exchange:
+    """
+    Sends a SNRM and returns the response, UA or DM. Default parameters are not sent
+    so meters that don't support negotiation still accept the SNRM.
+    """
+    current_state = connection.state.current_state
+    if current_state != state.NOT_CONNECTED:
+        raise exceptions.LocalProtocolError(
+            f"Can't initiate a HDLC connection when the connection state is "
+            f"{current_state}"
+        )
+    parameters = connection.parameters
+    snrm = frames.SetNormalResponseModeFrame(
+        destination_address=connection.server_address,
+        source_address=connection.client_address,
+        payload=(
+            parameters.to_bytes() if parameters != fields.HdlcParameters() else None
+        ),
+    )
+    response = yield from _await_response(connection, connection.send(snrm))
+    return response
+
+
+def disconnect(connection: HdlcConnection) -> Exchange:
+    """
+    Sends a DISC and returns the response, UA or DM.
+    """
+    disc = frames.DisconnectFrame(
+        destination_address=connection.server_address,
+        source_address=connection.client_address,
+    )
+    response = yield from _await_response(connection, connection.send(disc))
+    return response
+
+
+def send_information(connection: HdlcConnection, telegram: bytes) -> Exchange:
+    """
+    Sends an APDU and returns the response APDU.
+
+    The APDU is segmented into frames of the negotiated max information length. All
+    frames of a window are written at once and the server answers the last frame of
+    each window. A segmented response is acknowledged with one RR per window.
+
+    If the server acknowledges only some of the frames in a window, or rejects them
+    with REJ, the frames it didn't acknowledge are sent again.
+
+    If the server answers RNR it is busy and is polled with RR until it answers
+    something else.
+    """
+    hdlc_state = connection.state
+    current_state = hdlc_state.current_state
+    if current_state != state.IDLE:
+        raise exceptions.LocalProtocolError(
+            f"Connection is not in state IDLE and cannot send any data. "
+            f"Current state is {current_state}"
+        )
+
+    segmented = segmentation.segment_information(
+        destination_address=connection.server_address,
+        source_address=connection.client_address,
+        payload=telegram,
+        send_sequence_number=hdlc_state.send_sequence_number,
+        receive_sequence_number=hdlc_state.receive_sequence_number,
+        max_information_length=connection.parameters.max_information_length_transmit,
+        window_size=hdlc_state.window_size_transmit,
+    )
+    # Indexes of the frames in `segmented` left to send.
+    requests = collections.deque(range(len(segmented)))
+    rejected = 0
+    window_start = None
+    while requests:
+        index = requests.popleft()
+        final = segmented.final[index]
+        hdlc_state.process_sent_information(
+            segmented.send_sequence_numbers[index], final, index
+        )
+        if window_start is None:
+            window_start = index
+        if not final:
+            continue
+        written = bytes(segmented.frames_bytes(window_start, index))
+        window_start = None
+        response = yield from _await_ready_response(connection, written)
+        _check_connected(response)
+        if (
+            isinstance(response, frames.ReceiveReadyFrame)
+            and hdlc_state.unacknowledged_count
+        ):
+            rejected += 1
+            if rejected > connection.max_retries:
+                connection.reset()
+                raise exceptions.TransmissionFailed(
+                    f"Frames rejected by the server {rejected} times"
+                )
+            # No I-frames are received while sending, so the frames still carry the
+            # current receive sequence number and are sent again as they are.
+            resend = hdlc_state.take_unacknowledged()
+            LOG.info(f"Sending {len(resend)} I-frames again")
+            requests.extendleft(reversed(resend))
+
+    while isinstance(response, frames.SegmentedInformationResponseFrame):
+        if response.final:
+            written = connection.send(
+                frames.ReceiveReadyFrame(
+                    destination_address=connection.server_address,
+                    source_address=connection.client_address,
+                    receive_sequence_number=hdlc_state.receive_sequence_number,
+                )
+            )
+            response = yield from _await_ready_response(connection, written)
+        else:
+            # A lost frame makes the server's next frames out of sequence, so on
+            # timeout the frames from the missing one are asked for again.
+            response = yield from _await_ready_response(
+                connection, b"", resend=connection.poll
+            )
+        _check_connected(response)
+
+    return connection.take_information()
+
@@ -1,4 +1,5 @@
 import abc
+from typing import *
 
 import attr
 
@@ -90,6 +91,149 @@ class DisconnectControlField(_AbstractHdlcControlField):
         return out.to_bytes(1, "big")
 
 
+@attr.s(auto_attribs=True)
+class DisconnectModeControlField(_AbstractHdlcControlField):
+    """
+    U-frame for Disconnected Mode. Sent by the server as a response when it is
+    not connected.
+    """
+
+    def is_final(self):
+        """
+        Always final
+        """
+        return True
+
+    def to_bytes(self) -> bytes:
+        """
+        Returns byte representation of the field.
+        """
+        out = 0b00001111
+        if self.is_final:
+            out |= 0b00010000
+        return out.to_bytes(1, "big")
+
+
+@attr.s(auto_attribs=True)
+class FrameRejectControlField(_AbstractHdlcControlField):
+    """
+    U-frame for Frame Reject. Sent by the server when it received a frame that
+    could not be handled.
+    """
+
+    def is_final(self):
+        """
+        Always final
+        """
+        return True
+
+    def to_bytes(self) -> bytes:
+        """
+        Returns byte representation of the field.
+        """
+        out = 0b10000111
+        if self.is_final:
+            out |= 0b00010000
+        return out.to_bytes(1, "big")
+
+
+@attr.s(auto_attribs=True)
+class UnnumberedInformationControlField(_AbstractHdlcControlField):
+    """
+    U-frame for Unnumbered Information. Carries information outside of the
+    sequence numbered information transfer. The poll/final bit can be both set and
+    not set.
+    """
+
+    final: bool = attr.ib(default=True)
+
+    @property
+    def is_final(self):
+        return self.final
+
+    def to_bytes(self) -> bytes:
+        """
+        Returns byte representation of the field.
+        """
+        out = 0b00000011
+        if self.is_final:
+            out |= 0b00010000
+        return out.to_bytes(1, "big")
+
+
+@attr.s(auto_attribs=True)
+class _SupervisoryControlField(_AbstractHdlcControlField):
+    """
+    S-frames are used to acknowledge information frames and to control the flow of
+    information frames. They contain the `receive_sequence_number`, encoded in bit
+    5-7, but no send sequence number.
+
+    The bits 0-3 identify the type of S-frame.
+    """
+
+    receive_sequence_number: int = attr.ib(
+        validator=[validators.validate_information_sequence_number]
+    )
+    final: bool = attr.ib(default=True)
+
+    TYPE_BITS: ClassVar[int]
+
+    @property
+    def is_final(self):
+        return self.final
+
+    def to_bytes(self) -> bytes:
+        out = self.TYPE_BITS
+        out += self.receive_sequence_number << 5
+        if self.is_final:
+            out |= 0b00010000
+        return out.to_bytes(1, "big")
+
+    @classmethod
+    def from_bytes(cls, in_byte: bytes):
+        if len(in_byte) != 1:
+            raise ValueError(
+                f"{cls.__name__} can only be 1 bytes. Got {len(in_byte)}"
+            )
+        value = in_byte[0]
+        if value & 0b00001111 != cls.TYPE_BITS:
+            raise ValueError(f"Byte is not representing a {cls.__name__}")
+        rsn = (value & 0b11100000) >> 5
+        final = bool(value & 0b00010000)
+        return cls(rsn, final)
+
+
+@attr.s(auto_attribs=True)
+class ReceiveReadyControlField(_SupervisoryControlField):
+    """
+    S-frame for Receive Ready. Acknowledges all information frames up to
+    `receive_sequence_number` and tells the other party it is ready to receive more.
+    """
+
+    TYPE_BITS = 0b00000001
+
+
+@attr.s(auto_attribs=True)
+class ReceiveNotReadyControlField(_SupervisoryControlField):
+    """
+    S-frame for Receive Not Ready. Acknowledges all information frames up to
+    `receive_sequence_number` but tells the other party it is busy.
+    """
+
+    TYPE_BITS = 0b00000101
+
+
+@attr.s(auto_attribs=True)
+class RejectControlField(_SupervisoryControlField):
+    """
+    S-frame for Reject. Acknowledges all information frames up to
+    `receive_sequence_number` and asks for the information frames from
+    `receive_sequence_number` to be sent again.
+    """
+
+    TYPE_BITS = 0b00001001
+
+
 @attr.s(auto_attribs=True)
 class InformationControlField(_AbstractHdlcControlField):
     """
@@ -217,3 +361,130 @@ class DlmsHdlcFrameFormatField:
         if self.segmented:
             total = total | 0b0000100000000000
         return total.to_bytes(2, "big")
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class HdlcParameters:
+    """
+    HDLC parameter negotiation field. Sent as the information field in SNRM and UA.
+
+    The values are seen from the sender of the frame, so the transmit values in the
+    UA from the server are the receive values of the client.
+
+    Format: 0x81 (format identifier), 0x80 (group identifier), group length and then
+    the parameters as parameter id, length and value. If a parameter is not present
+    the default value is used.
+    """
+
+    FORMAT_IDENTIFIER: ClassVar[int] = 0x81
+    GROUP_IDENTIFIER: ClassVar[int] = 0x80
+    MAX_INFORMATION_LENGTH_TRANSMIT: ClassVar[int] = 0x05
+    MAX_INFORMATION_LENGTH_RECEIVE: ClassVar[int] = 0x06
+    WINDOW_SIZE_TRANSMIT: ClassVar[int] = 0x07
+    WINDOW_SIZE_RECEIVE: ClassVar[int] = 0x08
+
+    max_information_length_transmit: int = 128
+    max_information_length_receive: int = 128
+    window_size_transmit: int = attr.ib(
+        default=1, validator=[validators.validate_window_size]
+    )
+    window_size_receive: int = attr.ib(
+        default=1, validator=[validators.validate_window_size]
+    )
+
+    def to_bytes(self) -> bytes:
+        parameters = bytearray()
+        for parameter_id, value, length in (
+            (
+                self.MAX_INFORMATION_LENGTH_TRANSMIT,
+                self.max_information_length_transmit,
+                1 if self.max_information_length_transmit <= 0xFF else 2,
+            ),
+            (
+                self.MAX_INFORMATION_LENGTH_RECEIVE,
+                self.max_information_length_receive,
+                1 if self.max_information_length_receive <= 0xFF else 2,
+            ),
+            (self.WINDOW_SIZE_TRANSMIT, self.window_size_transmit, 4),
+            (self.WINDOW_SIZE_RECEIVE, self.window_size_receive, 4),
+        ):
+            parameters.append(parameter_id)
+            parameters.append(length)
+            parameters += value.to_bytes(length, "big")
+
+        return (
+            bytes((self.FORMAT_IDENTIFIER, self.GROUP_IDENTIFIER, len(parameters)))
+            + parameters
+        )
+
+    @classmethod
+    def from_bytes(cls, in_bytes: bytes):
+        """
+        An empty field means all parameters have default values. Unknown parameters
+        are ignored.
+        """
+        if not in_bytes:
+            return cls()
+
+        if len(in_bytes) < 3 or tuple(in_bytes[:2]) != (
+            cls.FORMAT_IDENTIFIER,
+            cls.GROUP_IDENTIFIER,
+        ):
+            raise hdlc_exceptions.HdlcParsingError(
+                f"Not a HDLC parameter negotiation field: {bytes(in_bytes)!r}"
+            )
+        group_end = 3 + in_bytes[2]
+        if group_end > len(in_bytes):
+            raise hdlc_exceptions.HdlcParsingError(
+                f"HDLC parameter group length {in_bytes[2]} is longer than the data"
+            )
+
+        names = {
+            cls.MAX_INFORMATION_LENGTH_TRANSMIT: "max_information_length_transmit",
+            cls.MAX_INFORMATION_LENGTH_RECEIVE: "max_information_length_receive",
+            cls.WINDOW_SIZE_TRANSMIT: "window_size_transmit",
+            cls.WINDOW_SIZE_RECEIVE: "window_size_receive",
+        }
+        values = dict()
+        position = 3
+        while position + 2 <= group_end:
+            parameter_id = in_bytes[position]
+            length = in_bytes[position + 1]
+            value_bytes = in_bytes[position + 2 : position + 2 + length]
+            if len(value_bytes) != length:
+                raise hdlc_exceptions.HdlcParsingError(
+                    f"HDLC parameter {parameter_id:#04x} is not complete"
+                )
+            name = names.get(parameter_id)
+            if name is not None:
+                values[name] = int.from_bytes(value_bytes, "big")
+            position += 2 + length
+
+        try:
+            return cls(**values)
+        except ValueError as e:
+            raise hdlc_exceptions.HdlcParsingError(
+                f"Invalid HDLC parameter value: {e}"
+            ) from e
+
+    def negotiate(self, response: "HdlcParameters") -> "HdlcParameters":
+        """
+        Combines the parameters proposed in the SNRM with the parameters in the UA
+        response. The result is seen from the sender of the SNRM.
+        """
+        return HdlcParameters(
+            max_information_length_transmit=min(
+                self.max_information_length_transmit,
+                response.max_information_length_receive,
+            ),
+            max_information_length_receive=min(
+                self.max_information_length_receive,
+                response.max_information_length_transmit,
+            ),
+            window_size_transmit=min(
+                self.window_size_transmit, response.window_size_receive
+            ),
+            window_size_receive=min(
+                self.window_size_receive, response.window_size_transmit
+            ),
+        )
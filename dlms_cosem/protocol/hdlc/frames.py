@@ -3,7 +3,7 @@ from typing import *
 
 import attr
 
-from dlms_cosem.protocol.crc import CRCCCITT
+from dlms_cosem.protocol.crc import CRCCCITT, IncrementalCRCCCITT
 from dlms_cosem.protocol.hdlc import exceptions as hdlc_exceptions, address, validators
 from dlms_cosem.protocol.hdlc.address import HdlcAddress
 from dlms_cosem.protocol.hdlc import fields
@@ -34,6 +34,119 @@ def frame_has_correct_length(control_field_length: int, frame_bytes: bytes):
     return True
 
 
+@attr.s(auto_attribs=True)
+class ReceivedFrame:
+    """
+    The parts of a received frame that has been validated by `unpack_frame`.
+    `view` is a memoryview of the received bytes and `information` is a view into it.
+    """
+
+    view: memoryview
+    frame_format: fields.DlmsHdlcFrameFormatField
+    destination_length: int
+    source_length: int
+    information: memoryview
+
+    @property
+    def control_position(self) -> int:
+        return (
+            address.ADDRESS_START_POSITION
+            + self.destination_length
+            + self.source_length
+        )
+
+    @property
+    def control_byte(self) -> int:
+        return self.view[self.control_position]
+
+    def addresses(
+        self, destination_address_type: str, source_address_type: str
+    ) -> Tuple[HdlcAddress, HdlcAddress]:
+        source_start = address.ADDRESS_START_POSITION + self.destination_length
+        return (
+            address.HdlcAddress.from_bytes(
+                self.view[address.ADDRESS_START_POSITION : source_start],
+                destination_address_type,
+            ),
+            address.HdlcAddress.from_bytes(
+                self.view[source_start : source_start + self.source_length],
+                source_address_type,
+            ),
+        )
+
+
+def _check_sequences(view, header_end, information_start, fcs_position):
+    check = IncrementalCRCCCITT(view[1:header_end])
+    if information_start > header_end:
+        calculated_hcs = check.digest()
+        check.update(view[header_end:information_start])
+        if not check.is_valid:
+            raise hdlc_exceptions.HdlcParsingError(
+                f"HCS is not correct Calculated: {calculated_hcs!r}, "
+                f"in data: {bytes(view[header_end:information_start])!r}"
+            )
+        check.update(view[information_start:fcs_position])
+
+    calculated_fcs = check.digest()
+    check.update(view[fcs_position:-1])
+    if not check.is_valid:
+        raise hdlc_exceptions.HdlcParsingError(
+            f"FCS is not correct, Calculated: {calculated_fcs!r}, "
+            f"in data: {bytes(view[fcs_position:-1])!r}"
+        )
+
+
+def unpack_frame(frame_bytes, fcs_verified: bool = False) -> ReceivedFrame:
+    """
+    Validates flags, length, HCS and FCS directly on the received bytes without
+    copying them or re-encoding the frame. The CRC is run once over the frame: the
+    register after the header and HCS is continued over the information and FCS.
+
+    If the frame has any data after the header the first 2 bytes are the HCS.
+
+    If the FCS already has been verified while the frame was received, as done by
+    `HdlcConnection`, the CRC is not run again. The FCS covers the HCS.
+    """
+    view = memoryview(frame_bytes)
+    if not frame_is_enclosed_by_hdlc_flags(view):
+        raise hdlc_exceptions.MissingHdlcFlags()
+
+    frame_format = fields.DlmsHdlcFrameFormatField.from_bytes(view[1:3])
+
+    if not frame_has_correct_length(frame_format.length, view):
+        raise hdlc_exceptions.HdlcParsingError(
+            f"Frame data is not of length specified in frame format field. "
+            f"Should be {frame_format.length} but is {len(view)}"
+        )
+
+    destination_length = address.HdlcAddress.address_length_at(
+        view, address.ADDRESS_START_POSITION
+    )
+    source_length = address.HdlcAddress.address_length_at(
+        view, address.ADDRESS_START_POSITION + destination_length
+    )
+
+    header_end = (
+        address.ADDRESS_START_POSITION + destination_length + source_length + 1
+    )
+    fcs_position = len(view) - 3
+    information_start = header_end
+
+    if fcs_position > header_end:
+        information_start += 2
+
+    if not fcs_verified:
+        _check_sequences(view, header_end, information_start, fcs_position)
+
+    return ReceivedFrame(
+        view=view,
+        frame_format=frame_format,
+        destination_length=destination_length,
+        source_length=source_length,
+        information=view[information_start:fcs_position],
+    )
+
+
 class _AbstractHdlcFrame(abc.ABC):
     """
     HDLC frames start and end with the HDLC Frame flag 0x7E
@@ -80,36 +193,130 @@ class _AbstractHdlcFrame(abc.ABC):
         raise NotImplementedError()
 
 
+def frame_size(
+    header_prefix_length: int, information_length: int, has_header_check_sequence: bool
+) -> int:
+    """
+    Total number of bytes of a frame, including both flags.
+    """
+    size = 1 + 2 + header_prefix_length + information_length + 2 + 1
+    if has_header_check_sequence:
+        size += 2
+    return size
+
+
+def write_frame(
+    out: bytearray,
+    position: int,
+    header_prefix: bytes,
+    information_parts: Sequence[bytes],
+    segmented: bool,
+    has_header_check_sequence: bool,
+) -> int:
+    """
+    Writes a complete frame into `out` starting at `position`. The buffer must already
+    be large enough, see `frame_size`. The information field is written from
+    `information_parts` so it can be assembled from several buffers without joining
+    them first. HCS and FCS are calculated on views of the buffer.
+
+    Returns the position after the closing flag.
+    """
+    information_length = sum(len(part) for part in information_parts)
+    header_end = position + 3 + len(header_prefix)
+    information_start = header_end
+    if has_header_check_sequence:
+        information_start += 2
+    fcs_position = information_start + information_length
+    frame_end = fcs_position + 3
+
+    out[position] = out[frame_end - 1] = HDLC_FLAG[0]
+    out[position + 1 : position + 3] = fields.DlmsHdlcFrameFormatField(
+        length=frame_end - position - 2, segmented=segmented
+    ).to_bytes()
+    out[position + 3 : header_end] = header_prefix
+    part_start = information_start
+    for part in information_parts:
+        out[part_start : part_start + len(part)] = part
+        part_start += len(part)
+
+    with memoryview(out) as view:
+        check = IncrementalCRCCCITT(view[position + 1 : header_end])
+        if has_header_check_sequence:
+            out[header_end:information_start] = check.digest()
+            check.update(view[header_end:fcs_position])
+        else:
+            check.update(view[information_start:fcs_position])
+        out[fcs_position : fcs_position + 2] = check.digest()
+
+    return frame_end
+
+
+# Address and control field bytes for a frame type are only dependent on the addresses
+# and the control field values. We only talk to a limited set of devices so they are
+# compiled once and reused.
+HEADER_PREFIX_CACHE_SIZE = 1024
+_header_prefix_cache: Dict[Tuple, bytes] = dict()
+
+
+def _payload_repr(payload) -> str:
+    """Shows the bytes of a memoryview payload, not the memoryview object."""
+    if isinstance(payload, (memoryview, bytearray)):
+        payload = bytes(payload)
+    return repr(payload)
+
+
 @attr.s(auto_attribs=True)
 class BaseHdlcFrame(_AbstractHdlcFrame):
     """
     Base class for HDLC frames and holds general behavior
+
+    The frame is serialized in one pass the first time it is needed and the bytes are
+    kept on the instance. `hcs`, `fcs`, `header_content` and `frame_content` are all
+    read from the serialized frame. Setting an attribute on the frame clears the
+    cached bytes.
+
+    Parsed frames keep the received bytes instead, and the payload is a memoryview
+    into them.
     """
 
     destination_address: HdlcAddress
     source_address: HdlcAddress
-    payload: Optional[bytes] = attr.ib(default=None)
+    payload: Optional[bytes] = attr.ib(default=None, repr=_payload_repr)
     segmented: bool = attr.ib(default=False)
     final: bool = attr.ib(default=True)
 
+    _frame_bytes: Optional[bytes] = attr.ib(
+        default=None, init=False, repr=False, eq=False
+    )
+
     fixed_length_bytes: ClassVar = 7
+    # Frames without an information field has no HCS.
+    has_header_check_sequence: ClassVar = True
+
+    def __setattr__(self, name, value):
+        if name != "_frame_bytes":
+            object.__setattr__(self, "_frame_bytes", None)
+        object.__setattr__(self, name, value)
 
     @property
     def frame_length(self) -> int:
-        return (
-            self.fixed_length_bytes
-            + self.destination_address.length
-            + self.source_address.length
-            + len(self.information)
-        )
+        return len(self.to_bytes()) - 2
+
+    @property
+    def header_length(self) -> int:
+        """Length of format, address and control field"""
+        return 2 + len(self.header_prefix())
 
     @property
     def hcs(self) -> bytes:
-        return HCS.calculate_for(self.header_content)
+        if not self.has_header_check_sequence:
+            return b""
+        hcs_position = 1 + self.header_length
+        return self.to_bytes()[hcs_position : hcs_position + 2]
 
     @property
     def fcs(self) -> bytes:
-        return FCS.calculate_for(self.frame_content)
+        return self.to_bytes()[-3:-1]
 
     @property
     def information(self) -> bytes:
@@ -117,24 +324,69 @@ class BaseHdlcFrame(_AbstractHdlcFrame):
 
     @property
     def header_content(self) -> bytes:
-
-        return b"".join(
-            [
-                fields.DlmsHdlcFrameFormatField(
-                    length=self.frame_length, segmented=self.segmented
-                ).to_bytes(),
-                self.destination_address.to_bytes(),
-                self.source_address.to_bytes(),
-                self.get_control_field().to_bytes(),
-            ]
-        )
+        return self.to_bytes()[1 : 1 + self.header_length]
 
     @property
     def frame_content(self) -> bytes:
-        return b"".join([self.header_content, self.hcs, self.information])
+        return self.to_bytes()[1:-3]
+
+    def to_bytes(self) -> bytes:
+        if self._frame_bytes is None:
+            self._frame_bytes = self._serialize()
+        elif not isinstance(self._frame_bytes, bytes):
+            # Received frames keep the buffer they were parsed from.
+            self._frame_bytes = bytes(self._frame_bytes)
+        return self._frame_bytes
+
+    def _serialize(self) -> bytes:
+        """
+        Writes the whole frame into a preallocated buffer.
+        """
+        prefix = self.header_prefix()
+        information = self.information
+        out = bytearray(
+            frame_size(len(prefix), len(information), self.has_header_check_sequence)
+        )
+        write_frame(
+            out,
+            0,
+            prefix,
+            (information,),
+            self.segmented,
+            self.has_header_check_sequence,
+        )
+        return bytes(out)
+
+    def control_field_key(self) -> Tuple:
+        """
+        The values that decides the content of the control field. Used to cache the
+        compiled header. Frames with variable control fields should override this.
+        """
+        return ()
 
-    def to_bytes(self):
-        return b"".join([HDLC_FLAG, self.frame_content, self.fcs, HDLC_FLAG])
+    def header_prefix(self) -> bytes:
+        """
+        Destination address, source address and control field.
+        """
+        key = (
+            type(self),
+            self.destination_address,
+            self.source_address,
+            self.control_field_key(),
+        )
+        prefix = _header_prefix_cache.get(key)
+        if prefix is None:
+            prefix = b"".join(
+                [
+                    self.destination_address.to_bytes(),
+                    self.source_address.to_bytes(),
+                    self.get_control_field().to_bytes(),
+                ]
+            )
+            if len(_header_prefix_cache) >= HEADER_PREFIX_CACHE_SIZE:
+                _header_prefix_cache.clear()
+            _header_prefix_cache[key] = prefix
+        return prefix
 
     def get_control_field(self):
         """
@@ -142,6 +394,24 @@ class BaseHdlcFrame(_AbstractHdlcFrame):
         """
         raise NotImplementedError()
 
+    @classmethod
+    def from_bytes(cls, frame_bytes: bytes):
+        return cls.from_received(unpack_frame(frame_bytes))
+
+    @classmethod
+    def from_received(cls, received: ReceivedFrame):
+        """
+        Creates the frame from a frame that has been validated by `unpack_frame`
+        """
+        raise NotImplementedError()
+
+    @classmethod
+    def _from_received(cls, received: ReceivedFrame, *args, **kwargs):
+        frame = cls(*args, **kwargs)
+        # The received bytes is the serialized frame.
+        frame._frame_bytes = received.view
+        return frame
+
     @staticmethod
     def extract_format_field_from_bytes(
         frame_bytes: bytes
@@ -162,29 +432,35 @@ class SetNormalResponseModeFrame(BaseHdlcFrame):
     fixed_length_bytes = 5
 
     @property
-    def hcs(self) -> bytes:
+    def has_header_check_sequence(self) -> bool:
         """
-        SetNormalResponseModeFrame is an HDLC S-frame and does not contain an
-        information field. That means that there is no HCS field present, only FCS
-        # TODO: is it present when using the information field as parameter field for
-            negotiating HDLC parameters?
+        Without parameters to negotiate there is no information field and no HCS,
+        only FCS.
         """
-        return b""
+        return bool(self.information)
 
     @property
     def information(self) -> bytes:
         """
         The information field on an SNRM request can be used to negotiate HDLC
-        connection parameters, (window size, max_frame_length etc.) It is not supported.
+        connection parameters, (window size, max_frame_length etc.), see
+        `fields.HdlcParameters`.
 
         By not sending any information default values will be assumed.
         Window size = 1, max transmit size = 128 bytes.
         """
-        return b""
+        return self.payload or b""
 
     def get_control_field(self):
         return fields.SnrmControlField()
 
+    @classmethod
+    def from_received(cls, received: ReceivedFrame):
+        destination_address, source_address = received.addresses("server", "client")
+        return cls._from_received(
+            received, destination_address, source_address, received.information or None
+        )
+
 
 @attr.s(auto_attribs=True)
 class UnNumberedAcknowledgmentFrame(BaseHdlcFrame):
@@ -198,50 +474,34 @@ class UnNumberedAcknowledgmentFrame(BaseHdlcFrame):
         information field.
         """
 
-        return b"".join([self.payload])
+        return self.payload or b""
+
+    @property
+    def has_header_check_sequence(self) -> bool:
+        return bool(self.information)
 
     def get_control_field(self):
         return fields.UaControlField()
 
     @classmethod
-    def from_bytes(cls, frame_bytes: bytes):
-        if not frame_is_enclosed_by_hdlc_flags(frame_bytes):
-            raise hdlc_exceptions.MissingHdlcFlags()
-
-        frame_format = BaseHdlcFrame.extract_format_field_from_bytes(frame_bytes)
-
-        if not frame_has_correct_length(frame_format.length, frame_bytes):
-            raise hdlc_exceptions.HdlcParsingError(
-                f"Frame data is not of length specified in frame format field. "
-                f"Should be {frame_format.length} but is {len(frame_bytes)}"
-            )
-
-        destination_address = address.HdlcAddress.destination_from_bytes(
-            frame_bytes, "client"
+    def from_received(cls, received: ReceivedFrame):
+        destination_address, source_address = received.addresses("client", "server")
+        return cls._from_received(
+            received, destination_address, source_address, received.information
         )
-        source_address = address.HdlcAddress.source_from_bytes(frame_bytes, "server")
-
-        hcs_position = 1 + 2 + destination_address.length + source_address.length + 1
-        hcs = frame_bytes[hcs_position : hcs_position + 2]
-        fcs = frame_bytes[-3:-1]
-
-        information = frame_bytes[hcs_position + 2 : -3]
-
-        frame = cls(destination_address, source_address, information)
-
-        if hcs != frame.hcs:
-            raise hdlc_exceptions.HdlcParsingError(
-                f"HCS is not correct. " f"Calculated: {frame.hcs}, in data: {hcs}"
-            )
-
-        if fcs != frame.fcs:
-            raise hdlc_exceptions.HdlcParsingError("FCS is not correct")
-
-        return frame
 
 
 @attr.s(auto_attribs=True)
 class InformationFrame(BaseHdlcFrame):
+    """
+    Information frame (I-frame) carrying an APDU.
+
+    An APDU that does not fit in one frame is sent in several frames. All frames
+    except the last have the segmentation bit set in the frame format field, see
+    `SegmentedInformationRequestFrame` and `SegmentedInformationResponseFrame`. Only
+    the first segment starts with the LLC header, `first_segment` is False for the
+    following frames.
+    """
 
     fixed_length_bytes = 7
 
@@ -252,12 +512,15 @@ class InformationFrame(BaseHdlcFrame):
         validator=[validators.validate_information_sequence_number], default=0
     )
     response_frame: bool = attr.ib(default=False)
+    first_segment: bool = attr.ib(default=True)
 
     @property
     def information(self) -> bytes:
         """
         Information request uses the LLC_COMMAND_HEADER
         """
+        if not self.first_segment:
+            return self.payload
         out_data: List[bytes] = list()
         if self.response_frame:
             out_data.append(LLC_RESPONSE_HEADER)
@@ -272,93 +535,101 @@ class InformationFrame(BaseHdlcFrame):
             self.send_sequence_number, self.receive_sequence_number, self.final
         )
 
-    @classmethod
-    def from_bytes(cls, frame_bytes: bytes):
-
-        if not frame_is_enclosed_by_hdlc_flags(frame_bytes):
-            raise hdlc_exceptions.MissingHdlcFlags()
+    def control_field_key(self) -> Tuple:
+        return self.send_sequence_number, self.receive_sequence_number, self.final
 
-        frame_format = BaseHdlcFrame.extract_format_field_from_bytes(frame_bytes)
-
-        if not frame_has_correct_length(frame_format.length, frame_bytes):
-            raise hdlc_exceptions.HdlcParsingError(
-                f"Frame data is not of length specified in frame format field. "
-                f"Should be {frame_format.length} but is {len(frame_bytes)}"
-            )
+    @staticmethod
+    def frame_class(segmented: bool, response_frame: bool):
+        if not segmented:
+            return InformationFrame
+        if response_frame:
+            return SegmentedInformationResponseFrame
+        return SegmentedInformationRequestFrame
 
-        destination_address = address.HdlcAddress.destination_from_bytes(
-            frame_bytes, "client"
-        )
-        source_address = address.HdlcAddress.source_from_bytes(frame_bytes, "server")
+    @classmethod
+    def from_received(
+        cls,
+        received: ReceivedFrame,
+        previous_segment: Optional["InformationFrame"] = None,
+    ):
+        """
+        If the frame continues a segmented APDU the previous segment must be passed.
+        Continuing segments have no LLC header so it is not possible to know if they
+        are requests or responses from the frame itself.
+        """
+        control_position = received.control_position
 
-        information_control_byte_position = (
-            1 + 2 + destination_address.length + source_address.length
-        )
-        information_control_byte = frame_bytes[
-            information_control_byte_position : information_control_byte_position + 1
-        ]
         information_control = fields.InformationControlField.from_bytes(
-            information_control_byte
+            received.view[control_position : control_position + 1]
         )
 
-        # is it a request or response?
-        llc_position = (
-            1 + 2 + destination_address.length + source_address.length + 1 + 2
-        )
-        llc_part = frame_bytes[llc_position : (llc_position + 3)]
+        if previous_segment is not None:
+            is_response = previous_segment.response_frame
+            information = received.information
+        else:
+            # is it a request or response?
+            llc_part = received.information[:3]
 
-        is_response = llc_part == LLC_RESPONSE_HEADER
-        is_request = llc_part == LLC_COMMAND_HEADER
+            is_response = llc_part == LLC_RESPONSE_HEADER
+            is_request = llc_part == LLC_COMMAND_HEADER
 
-        if not (is_request or is_response):
-            raise hdlc_exceptions.HdlcParsingError("Could not find LLC bytes")
+            if not (is_request or is_response):
+                raise hdlc_exceptions.HdlcParsingError("Could not find LLC bytes")
 
-        if is_response and not is_request:
+            information = received.information[3:]
+
+        if is_response:
             # destination address is the client and source is the server
-            destination_address.address_type = "client"
-            source_address.address_type = "server"
+            destination_address, source_address = received.addresses(
+                "client", "server"
+            )
         else:
-            destination_address.address_type = "server"
-            source_address.address_type = "client"
-
-        hcs_position = 1 + 2 + destination_address.length + source_address.length + 1
-        hcs = frame_bytes[hcs_position : hcs_position + 2]
-        fcs = frame_bytes[-3:-1]
-        information = frame_bytes[hcs_position + 2 + 3 : -3]
+            destination_address, source_address = received.addresses(
+                "server", "client"
+            )
 
-        frame = cls(
+        segmented = received.frame_format.segmented
+        return cls.frame_class(segmented, is_response)._from_received(
+            received,
             destination_address,
             source_address,
             information,
             send_sequence_number=information_control.send_sequence_number,
             receive_sequence_number=information_control.receive_sequence_number,
             response_frame=is_response,
-            segmented=frame_format.segmented,
+            segmented=segmented,
             final=information_control.final,
+            first_segment=previous_segment is None,
         )
 
-        if hcs != frame.hcs:
-            raise hdlc_exceptions.HdlcParsingError(
-                f"HCS is not correct Calculated: {frame.hcs}, in data: {hcs}"
-            )
 
-        if fcs != frame.fcs:
-            raise hdlc_exceptions.HdlcParsingError(
-                f"FCS is not correct, Calculated: {frame.fcs}, in data: {fcs}"
-            )
+@attr.s(auto_attribs=True)
+class SegmentedInformationRequestFrame(InformationFrame):
+    """
+    A segment of a request APDU that continues in the next frame. The server
+    acknowledges it with a ReceiveReadyFrame before the next segment is sent.
+    """
 
-        return frame
+    segmented: bool = attr.ib(default=True)
+
+
+@attr.s(auto_attribs=True)
+class SegmentedInformationResponseFrame(InformationFrame):
+    """
+    A segment of a response APDU that continues in the next frame. The client
+    requests the next segment by sending a ReceiveReadyFrame.
+    """
+
+    segmented: bool = attr.ib(default=True)
+    response_frame: bool = attr.ib(default=True)
 
 
 @attr.s(auto_attribs=True)
 class DisconnectFrame(BaseHdlcFrame):
 
     fixed_length_bytes = 5
-
-    @property
-    def hcs(self) -> bytes:
-        """No information field in the frame so no hcs. Only FCS"""
-        return b""
+    # No information field in the frame so no hcs. Only FCS
+    has_header_check_sequence = False
 
     @property
     def information(self) -> bytes:
@@ -371,41 +642,223 @@ class DisconnectFrame(BaseHdlcFrame):
         return fields.DisconnectControlField()
 
     @classmethod
-    def from_bytes(cls, frame_bytes: bytes):
-        if not frame_is_enclosed_by_hdlc_flags(frame_bytes):
-            raise hdlc_exceptions.MissingHdlcFlags()
+    def from_received(cls, received: ReceivedFrame):
+        destination_address, source_address = received.addresses("server", "client")
+        return cls._from_received(received, destination_address, source_address)
 
-        frame_format = BaseHdlcFrame.extract_format_field_from_bytes(frame_bytes)
 
-        if not frame_has_correct_length(frame_format.length, frame_bytes):
-            raise hdlc_exceptions.HdlcParsingError(
-                f"Frame data is not of length specified in frame format field. "
-                f"Should be {frame_format.length} but is {len(frame_bytes)}"
-            )
+@attr.s(auto_attribs=True)
+class DisconnectModeFrame(BaseHdlcFrame):
+    """
+    Disconnected Mode (DM) is sent by the server as a response to a frame when it is
+    not in a connected state. For example as a response to a DISC when already
+    disconnected or if a SNRM is refused.
+    """
+
+    fixed_length_bytes = 5
+    has_header_check_sequence = False
+
+    @property
+    def information(self) -> bytes:
+        return b""
+
+    def get_control_field(self):
+        return fields.DisconnectModeControlField()
+
+    @classmethod
+    def from_received(cls, received: ReceivedFrame):
+        destination_address, source_address = received.addresses("client", "server")
+        return cls._from_received(received, destination_address, source_address)
+
+
+@attr.s(auto_attribs=True)
+class FrameRejectFrame(BaseHdlcFrame):
+    """
+    Frame Reject (FRMR) is sent by the server when it received a frame it could not
+    handle. The information field contains the rejected control field and the reason
+    of the rejection.
+    """
+
+    fixed_length_bytes = 7
+
+    @property
+    def information(self) -> bytes:
+        return bytes(self.payload or b"")
+
+    def get_control_field(self):
+        return fields.FrameRejectControlField()
 
-        destination_address = address.HdlcAddress.destination_from_bytes(
-            frame_bytes, "server"
+    @classmethod
+    def from_received(cls, received: ReceivedFrame):
+        destination_address, source_address = received.addresses("client", "server")
+        return cls._from_received(
+            received, destination_address, source_address, received.information
         )
 
-        source_address = address.HdlcAddress.source_from_bytes(frame_bytes, "client")
 
-        fcs = frame_bytes[-3:-1]
+@attr.s(auto_attribs=True)
+class UnnumberedInformationFrame(BaseHdlcFrame):
+    """
+    Unnumbered Information (UI) carries information outside of the numbered
+    information transfer, for example event notifications. The information field is
+    returned as is, including any LLC header.
+    """
 
-        frame = cls(destination_address, source_address)
+    fixed_length_bytes = 7
 
-        if fcs != frame.fcs:
-            raise hdlc_exceptions.HdlcParsingError("FCS is not correct")
+    @property
+    def information(self) -> bytes:
+        return bytes(self.payload or b"")
 
-        return frame
+    def get_control_field(self):
+        return fields.UnnumberedInformationControlField(self.final)
+
+    def control_field_key(self) -> Tuple:
+        return (self.final,)
+
+    @classmethod
+    def from_received(cls, received: ReceivedFrame):
+        destination_address, source_address = received.addresses("client", "server")
+        return cls._from_received(
+            received,
+            destination_address,
+            source_address,
+            received.information,
+            final=bool(received.control_byte & 0b00010000),
+        )
+
+
+@attr.s(auto_attribs=True)
+class ReceiveReadyFrame(BaseHdlcFrame):
+    """
+    Receive Ready (RR) acknowledges all information frames with a send sequence
+    number lower than `receive_sequence_number` and signals that the sender is ready
+    to receive the next information frame.
+    """
+
+    fixed_length_bytes = 5
+    has_header_check_sequence = False
+
+    receive_sequence_number: int = attr.ib(
+        validator=[validators.validate_information_sequence_number], default=0
+    )
+
+    CONTROL_FIELD_CLASS: ClassVar = fields.ReceiveReadyControlField
+
+    @property
+    def information(self) -> bytes:
+        return b""
+
+    def get_control_field(self):
+        return self.CONTROL_FIELD_CLASS(self.receive_sequence_number, self.final)
+
+    def control_field_key(self) -> Tuple:
+        return self.receive_sequence_number, self.final
+
+    @classmethod
+    def from_received(cls, received: ReceivedFrame):
+        control_position = received.control_position
+        control = cls.CONTROL_FIELD_CLASS.from_bytes(
+            received.view[control_position : control_position + 1]
+        )
+        destination_address, source_address = received.addresses("client", "server")
+        return cls._from_received(
+            received,
+            destination_address,
+            source_address,
+            final=control.final,
+            receive_sequence_number=control.receive_sequence_number,
+        )
+
+
+@attr.s(auto_attribs=True)
+class ReceiveNotReadyFrame(ReceiveReadyFrame):
+    """
+    Receive Not Ready (RNR) acknowledges information frames like RR but signals that
+    the sender is busy and can't receive more information frames right now.
+    """
+
+    CONTROL_FIELD_CLASS: ClassVar = fields.ReceiveNotReadyControlField
+
+
+@attr.s(auto_attribs=True)
+class RejectFrame(ReceiveReadyFrame):
+    """
+    Reject (REJ) acknowledges information frames like RR but signals that the frame
+    with send sequence number `receive_sequence_number` was not received, or not
+    received correctly, and that it and all frames after it must be sent again.
+    """
+
+    CONTROL_FIELD_CLASS: ClassVar = fields.RejectControlField
 
 
-class SegmentedInformationRequestFrame:
-    pass
+# Control field values with the poll/final bit masked out.
+UNNUMBERED_FRAME_TYPES = {
+    0b10000011: SetNormalResponseModeFrame,
+    0b01000011: DisconnectFrame,
+    0b01100011: UnNumberedAcknowledgmentFrame,
+    0b00001111: DisconnectModeFrame,
+    0b10000111: FrameRejectFrame,
+    0b00000011: UnnumberedInformationFrame,
+}
 
+# Supervisory frames are identified by the 4 rightmost bits.
+SUPERVISORY_FRAME_TYPES = {
+    0b00000001: ReceiveReadyFrame,
+    0b00000101: ReceiveNotReadyFrame,
+    0b00001001: RejectFrame,
+}
 
-class SegmentedInformationResponseFrame:
-    pass
 
+def make_control_field_table() -> Tuple[Optional[Type[BaseHdlcFrame]], ...]:
+    """
+    Maps every possible value of the control field to a frame class. None for values
+    that doesn't represent a supported frame.
+    """
+    table: List[Optional[Type[BaseHdlcFrame]]] = list()
+    for value in range(0, 256):
+        if not value & 0b00000001:
+            table.append(InformationFrame)
+        elif value & 0b00000011 == 0b00000001:
+            table.append(SUPERVISORY_FRAME_TYPES.get(value & 0b00001111))
+        else:
+            table.append(UNNUMBERED_FRAME_TYPES.get(value & 0b11101111))
+    return tuple(table)
+
+
+CONTROL_FIELD_TABLE = make_control_field_table()
+
+
+class HdlcFrameParser:
+    """
+    Parses any received frame into the correct frame class.
 
-class ReceiveReadyFrame:
-    pass
+    The frame is validated once by `unpack_frame` and the control field is looked up
+    in a table with all 256 possible values, so there is no need to know what frame
+    to expect and to try parsers until one succeeds. It is up to the state machine to
+    decide if the frame is acceptable.
+    """
+
+    def __init__(self, control_field_table=CONTROL_FIELD_TABLE):
+        self.control_field_table = control_field_table
+
+    def parse(
+        self,
+        frame_bytes: bytes,
+        fcs_verified: bool = False,
+        previous_segment: Optional[InformationFrame] = None,
+    ) -> BaseHdlcFrame:
+        """
+        :param previous_segment: The last received segment if a segmented APDU is
+            being received. Needed to parse the continuing I-frames.
+        """
+        received = unpack_frame(frame_bytes, fcs_verified)
+        control_byte = received.control_byte
+        frame_class = self.control_field_table[control_byte]
+        if frame_class is None:
+            raise hdlc_exceptions.HdlcParsingError(
+                f"Control field {control_byte:#04x} is not a supported frame type"
+            )
+        if previous_segment is not None and frame_class is InformationFrame:
+            return frame_class.from_received(received, previous_segment)
+        return frame_class.from_received(received)
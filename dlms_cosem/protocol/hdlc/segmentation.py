@@ -0,0 +1,165 @@
+import functools
+from typing import *
+
+import attr
+
+from dlms_cosem.protocol.hdlc import fields, frames
+from dlms_cosem.protocol.hdlc.address import HdlcAddress
+
+# If nothing else is negotiated the maximum length of the information field is 128
+# bytes.
+DEFAULT_MAX_INFORMATION_LENGTH = 128
+
+
+@functools.lru_cache(maxsize=None)
+def information_control_byte(
+    send_sequence_number: int, receive_sequence_number: int, final: bool
+) -> bytes:
+    return fields.InformationControlField(
+        send_sequence_number, receive_sequence_number, final
+    ).to_bytes()
+
+
+@attr.s(auto_attribs=True)
+class SegmentedInformation:
+    """
+    All I-frames of a segmented APDU written after each other in one buffer.
+
+    `frame_ends` holds the position after the closing flag of each frame and
+    `send_sequence_numbers` and `final` the values used in the control field of each
+    frame.
+    """
+
+    buffer: bytearray
+    frame_ends: List[int]
+    send_sequence_numbers: List[int]
+    final: List[bool]
+
+    def __len__(self):
+        return len(self.frame_ends)
+
+    def frame_bytes(self, index: int) -> memoryview:
+        """
+        View of the bytes of a single frame in the buffer.
+        """
+        start = self.frame_ends[index - 1] if index else 0
+        return memoryview(self.buffer)[start : self.frame_ends[index]]
+
+    def frames_bytes(self, first: int, last: int) -> memoryview:
+        """
+        View of the bytes of the frames from index `first` to `last`, inclusive.
+        """
+        start = self.frame_ends[first - 1] if first else 0
+        return memoryview(self.buffer)[start : self.frame_ends[last]]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        for index in range(len(self)):
+            yield self.frame_bytes(index)
+
+
+def segment_information(
+    destination_address: HdlcAddress,
+    source_address: HdlcAddress,
+    payload: bytes,
+    send_sequence_number: int,
+    receive_sequence_number: int,
+    max_information_length: int = DEFAULT_MAX_INFORMATION_LENGTH,
+    response_frame: bool = False,
+    window_size: int = 1,
+) -> SegmentedInformation:
+    """
+    Splits an APDU into I-frames with an information field no longer than
+    `max_information_length` and writes all frames into one preallocated buffer.
+
+    The LLC header is only present in the first frame. All frames except the last
+    have the segmentation bit set in the frame format field. The send sequence number
+    is increased for each frame. The poll/final bit is set on the last frame of each
+    window, so with window size 1 each frame needs to be acknowledged by the receiver
+    before the next is sent.
+    """
+    llc = frames.LLC_RESPONSE_HEADER if response_frame else frames.LLC_COMMAND_HEADER
+    if max_information_length <= len(llc):
+        raise ValueError(
+            f"max_information_length must be larger than the LLC header, got "
+            f"{max_information_length}"
+        )
+    payload_view = memoryview(payload)
+    information_length = len(llc) + len(payload_view)
+    frame_count = max(-(-information_length // max_information_length), 1)
+    address_bytes = destination_address.to_bytes() + source_address.to_bytes()
+    header_prefix_length = len(address_bytes) + 1
+
+    buffer = bytearray(
+        frame_count * frames.frame_size(header_prefix_length, 0, True)
+        + information_length
+    )
+    frame_ends = list()
+    send_sequence_numbers = list()
+    final_bits = list()
+    position = 0
+
+    for index in range(frame_count):
+        start = index * max_information_length
+        end = min(start + max_information_length, information_length)
+        if start < len(llc):
+            information_parts = (llc[start:], payload_view[: end - len(llc)])
+        else:
+            information_parts = (payload_view[start - len(llc) : end - len(llc)],)
+
+        is_last = index == frame_count - 1
+        final = is_last or (index + 1) % window_size == 0
+        ssn = (send_sequence_number + index) % 8
+
+        position = frames.write_frame(
+            buffer,
+            position,
+            address_bytes
+            + information_control_byte(ssn, receive_sequence_number, final),
+            information_parts,
+            segmented=not is_last,
+            has_header_check_sequence=True,
+        )
+        frame_ends.append(position)
+        send_sequence_numbers.append(ssn)
+        final_bits.append(final)
+
+    return SegmentedInformation(buffer, frame_ends, send_sequence_numbers, final_bits)
+
+
+@attr.s(auto_attribs=True)
+class SegmentReassembler:
+    """
+    Collects the information of segmented I-frames into one buffer.
+
+    The buffer is allocated up front and doubled when it is full, so a response of
+    many segments is copied once into place instead of keeping a list of payloads
+    that is joined at the end.
+    """
+
+    initial_size: int = 1024
+    _buffer: bytearray = attr.ib(init=False, repr=False)
+    _length: int = attr.ib(default=0, init=False)
+
+    def __attrs_post_init__(self):
+        self._buffer = bytearray(self.initial_size)
+
+    def __len__(self):
+        return self._length
+
+    def add(self, information: bytes):
+        end = self._length + len(information)
+        if end > len(self._buffer):
+            size = max(end, 2 * len(self._buffer))
+            self._buffer.extend(bytes(size - len(self._buffer)))
+        self._buffer[self._length : end] = information
+        self._length = end
+
+    def take(self) -> bytearray:
+        """
+        Returns the reassembled information and starts over with a new buffer.
+        """
+        information = self._buffer
+        del information[self._length :]
+        self._buffer = bytearray(self.initial_size)
+        self._length = 0
+        return information
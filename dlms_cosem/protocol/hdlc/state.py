@@ -1,8 +1,9 @@
 import logging
+from typing import *
 
 import attr
 
-from dlms_cosem.protocol.hdlc import frames
+from dlms_cosem.protocol.hdlc import frames, validators
 from dlms_cosem.protocol.hdlc.exceptions import LocalProtocolError
 
 
@@ -52,11 +53,30 @@ CLOSED = make_sentinel("CLOSED")
 
 NEED_DATA = make_sentinel("NEED_DATA")
 
-# TODO: segmentation handling is not working with this state layout.
-
+# Sent to an exchange by the client instead of a frame when no response was received
+# in time.
+TIMEOUT = make_sentinel("TIMEOUT")
+
+# An APDU that doesn't fit in one frame is sent in several I-frames. Each segment of a
+# request is acknowledged by the server with a RR frame and the client requests the
+# next segment of a response by sending a RR frame.
+#
+# With a window size larger than 1 several I-frames are sent before they are
+# acknowledged. Only the last frame in a window has the poll/final bit set and the
+# state does not change for the frames before it.
+#
+# A RR that doesn't acknowledge all frames of a window, or a REJ, means the server
+# missed some frames. The connection goes back to IDLE so the missing frames can be
+# sent again. A RNR means the server is busy, it acknowledges frames like a RR but
+# the client keeps waiting for the response and polls the server with RR. DM or FRMR
+# instead of a response means the server has dropped the connection.
 HDLC_STATE_TRANSITIONS = {
     NOT_CONNECTED: {frames.SetNormalResponseModeFrame: AWAITING_CONNECTION},
-    AWAITING_CONNECTION: {frames.UnNumberedAcknowledgmentFrame: IDLE},
+    AWAITING_CONNECTION: {
+        frames.UnNumberedAcknowledgmentFrame: IDLE,
+        frames.DisconnectModeFrame: NOT_CONNECTED,
+        frames.FrameRejectFrame: NOT_CONNECTED,
+    },
     IDLE: {
         frames.InformationFrame: AWAITING_RESPONSE,
         frames.SegmentedInformationRequestFrame: AWAITING_RESPONSE,
@@ -65,18 +85,25 @@ HDLC_STATE_TRANSITIONS = {
     AWAITING_RESPONSE: {
         frames.InformationFrame: IDLE,
         frames.SegmentedInformationResponseFrame: SHOULD_SEND_READY_TO_RECEIVE,
+        frames.ReceiveReadyFrame: IDLE,
+        frames.ReceiveNotReadyFrame: AWAITING_RESPONSE,
+        frames.RejectFrame: IDLE,
+        frames.DisconnectModeFrame: NOT_CONNECTED,
+        frames.FrameRejectFrame: NOT_CONNECTED,
     },
     SHOULD_SEND_READY_TO_RECEIVE: {frames.ReceiveReadyFrame: AWAITING_RESPONSE},
-    AWAITING_DISCONNECT: {frames.UnNumberedAcknowledgmentFrame: NOT_CONNECTED},
+    AWAITING_DISCONNECT: {
+        frames.UnNumberedAcknowledgmentFrame: NOT_CONNECTED,
+        frames.DisconnectModeFrame: NOT_CONNECTED,
+    },
 }
 
 
 SEND_STATES = [NOT_CONNECTED, IDLE, SHOULD_SEND_READY_TO_RECEIVE]
 RECEIVE_STATES = [AWAITING_CONNECTION, AWAITING_RESPONSE, AWAITING_DISCONNECT]
 
-# TODO: does the ssn and rsn belong in the state? Comparing to H11 that is only
-#   using types in the state not full objects. Maybe it should be stored on the
-#   connection?
+# Sequence numbers are counted modulo 8.
+SEQUENCE_NUMBER_MODULUS = 8
 
 
 @attr.s(auto_attribs=True)
@@ -87,90 +114,256 @@ class HdlcConnectionState:
     A HDLC frame is passed to `process_frame` and it moves the state machine to the
     correct state. If a frame is processed that is not set to be able to transition
     the state in the current state a LocalProtocolError is raised.
+
+    The sequence numbers are the state variables of HDLC as seen from the client:
+
+    * `send_sequence_number`, V(S), is the number of the next I-frame to send.
+    * `receive_sequence_number`, V(R), is the number of the next I-frame we expect to
+      receive. It is sent in all I-frames and RR frames to acknowledge the received
+      I-frames.
+    * `acknowledged_sequence_number`, V(A), is the number of the oldest sent I-frame
+      that is not acknowledged by the server.
+
+    Sent I-frames are kept in an 8 slot array, indexed by their send sequence number,
+    until the server acknowledges them. The server can acknowledge any number of
+    them at once, as long as it only acknowledges frames that have been sent.
+
+    I-frames that are already encoded, like the frames of a `SegmentedInformation`,
+    are passed to `process_sent_information` with what the sender needs to send
+    them again instead of the frame.
     """
 
     current_state: _SentinelBase = attr.ib(default=NOT_CONNECTED)
-    client_ssn: int = attr.ib(default=0)
-    client_rsn: int = attr.ib(default=0)
-    server_ssn: int = attr.ib(default=0)
-    server_rsn: int = attr.ib(default=0)
+    send_sequence_number: int = attr.ib(default=0)
+    receive_sequence_number: int = attr.ib(default=0)
+    acknowledged_sequence_number: int = attr.ib(default=0)
+    # Number of I-frames that can be sent or received before they are acknowledged.
+    window_size_transmit: int = attr.ib(
+        default=1, validator=[validators.validate_window_size]
+    )
+    window_size_receive: int = attr.ib(
+        default=1, validator=[validators.validate_window_size]
+    )
+    received_in_window: int = attr.ib(default=0)
+    _unacknowledged: List[Any] = attr.ib(
+        factory=lambda: [None] * SEQUENCE_NUMBER_MODULUS, init=False, repr=False
+    )
+
+    @property
+    def unacknowledged_count(self) -> int:
+        return (
+            self.send_sequence_number - self.acknowledged_sequence_number
+        ) % SEQUENCE_NUMBER_MODULUS
+
+    @property
+    def can_send(self) -> int:
+        """
+        Number of I-frames that can be sent before an acknowledgement is needed.
+        """
+        return self.window_size_transmit - self.unacknowledged_count
+
+    def unacknowledged_frames(self) -> List[Any]:
+        """
+        The sent I-frames that are not acknowledged, oldest first.
+        """
+        return [
+            self._unacknowledged[
+                (self.acknowledged_sequence_number + offset) % SEQUENCE_NUMBER_MODULUS
+            ]
+            for offset in range(self.unacknowledged_count)
+        ]
+
+    def take_unacknowledged(self) -> List[Any]:
+        """
+        Returns the sent I-frames that are not acknowledged, oldest first, and moves
+        V(S) back to the oldest of them so they can be sent again.
+        """
+        unacknowledged = self.unacknowledged_frames()
+        for offset in range(len(unacknowledged)):
+            self._unacknowledged[
+                (self.acknowledged_sequence_number + offset) % SEQUENCE_NUMBER_MODULUS
+            ] = None
+        self.send_sequence_number = self.acknowledged_sequence_number
+        return unacknowledged
+
+    def reset(self):
+        """
+        Goes back to NOT_CONNECTED, for when the connection is given up without a
+        DISC/UA or DM from the server.
+        """
+        self._reset_sequence_numbers()
+        self._set_state(NOT_CONNECTED)
+
+    def process_sent_information(
+        self, send_sequence_number: int, final: bool, sent: Any
+    ):
+        """
+        Changes the state for an I-frame that is sent already encoded. The receive
+        sequence number of the frame must be the current V(R). `sent` is kept until
+        the frame is acknowledged and is what `take_unacknowledged` returns for it.
+        """
+        if self.current_state not in SEND_STATES:
+            raise LocalProtocolError(
+                f"can't send I-frame when state={self.current_state}"
+            )
+        new_state = self._check_transition(frames.InformationFrame)
+        self._send_information(send_sequence_number, final, sent)
+        if final:
+            self._set_state(new_state)
+
+    def process_sent_poll(self, frame: frames.ReceiveReadyFrame):
+        """
+        Changes the state for a RR sent while awaiting a response, to ask the server
+        to send the I-frames from V(R) again when a frame of the response was lost.
+        The server answers with a new window.
+        """
+        if self.current_state is not AWAITING_RESPONSE:
+            raise LocalProtocolError(
+                f"can't poll for I-frames when state={self.current_state}"
+            )
+        self._send_receive_ready(frame)
 
     def process_frame(self, frame):
 
         frame_type = type(frame)
+        new_state = self._check_transition(frame_type)
+        sending = self.current_state in SEND_STATES
+
+        if isinstance(frame, frames.SetNormalResponseModeFrame):
+            self._reset_sequence_numbers()
+
+        elif isinstance(frame, frames.InformationFrame):
+            if sending:
+                self._send_information_frame(frame)
+            else:
+                self._receive_information_frame(frame)
+            if not frame.final:
+                # More frames follows in the same window.
+                return
+
+        elif isinstance(frame, frames.ReceiveReadyFrame):
+            if sending:
+                self._send_receive_ready(frame)
+            else:
+                self._acknowledge(frame.receive_sequence_number)
+
+        self._set_state(new_state)
+
+    def _reset_sequence_numbers(self):
+        """A new connection starts with all sequence numbers at 0"""
+        self.send_sequence_number = 0
+        self.receive_sequence_number = 0
+        self.acknowledged_sequence_number = 0
+        self.received_in_window = 0
+        self._unacknowledged = [None] * SEQUENCE_NUMBER_MODULUS
+
+    def _send_information_frame(self, frame: frames.InformationFrame):
+        self._check_sequence_numbers(
+            frame, self.send_sequence_number, self.receive_sequence_number
+        )
+        self._send_information(frame.send_sequence_number, frame.final, frame)
+
+    def _send_information(self, send_sequence_number: int, final: bool, sent: Any):
+        if send_sequence_number != self.send_sequence_number:
+            raise LocalProtocolError(
+                f"Send Sequence Number {send_sequence_number} does not correspond"
+                f" with the current state of the HDLC connection "
+                f"{self.send_sequence_number}"
+            )
+        can_send = self.can_send
+        if can_send < 1 or (can_send == 1 and not final):
+            raise LocalProtocolError(
+                f"Can't send I-frame with poll/final bit {final}. "
+                f"{self.unacknowledged_count} frames are not acknowledged and the "
+                f"window size is {self.window_size_transmit}"
+            )
 
-        if frame_type == frames.InformationFrame:
-            self._process_information_frame(frame)
+        self._unacknowledged[send_sequence_number] = sent
+        self.send_sequence_number = self._next(self.send_sequence_number)
+        # The I-frame acknowledges all received frames.
+        self.received_in_window = 0
 
-        self._transition_state(type(frame))
+    def _receive_information_frame(self, frame: frames.InformationFrame):
+        if frame.send_sequence_number != self.receive_sequence_number:
+            raise LocalProtocolError(
+                f"Send Sequence Number {frame.send_sequence_number} does not correspond"
+                f" with the current state of the HDLC connection "
+                f"{self.receive_sequence_number}"
+            )
+        self._acknowledge(frame.receive_sequence_number)
+
+        self.received_in_window += 1
+        if self.received_in_window > self.window_size_receive or (
+            self.received_in_window == self.window_size_receive and not frame.final
+        ):
+            raise LocalProtocolError(
+                f"I-frame number {self.received_in_window} in window of size "
+                f"{self.window_size_receive} with poll/final bit {frame.final} is not "
+                f"allowed"
+            )
+        self.receive_sequence_number = self._next(self.receive_sequence_number)
+
+    def _send_receive_ready(self, frame: frames.ReceiveReadyFrame):
+        if frame.receive_sequence_number != self.receive_sequence_number:
+            raise LocalProtocolError(
+                f"Receive Sequence number {frame.receive_sequence_number} does not "
+                f"correspond with the current state of the HDLC "
+                f"connection {self.receive_sequence_number}"
+            )
+        self.received_in_window = 0
 
-    def _process_information_frame(self, frame: frames.InformationFrame):
+    def _acknowledge(self, receive_sequence_number: int):
         """
-        When sending an information request the client ssn and client rsn should
-        correspond to the current state. We also know that the server rrs should be one
-        higher than the current
+        The receive sequence number from the server acknowledges all sent frames
+        before it.
         """
-        if frame.response_frame:
-
-            if not frame.send_sequence_number == self.client_ssn:
-                raise LocalProtocolError(
-                    f"Send Sequence Number {frame.send_sequence_number} does not correspond"
-                    f" with the current state of the HDLC connection {self.client_ssn}"
-                )
-
-            if not frame.receive_sequence_number == self.client_rsn:
-                raise LocalProtocolError(
-                    f"Receive Sequence number {frame.receive_sequence_number} does not "
-                    f"correspond with the current state of the HDLC "
-                    f"connection {self.client_rsn}"
-                )
-
-            self._increment_server_rsn()
-            self._increment_client_ssn()
-
-        else:
-            if not frame.send_sequence_number == self.server_ssn:
-                raise LocalProtocolError(
-                    f"Send Sequence Number {frame.send_sequence_number} does not correspond"
-                    f" with the current state of the HDLC connection {self.server_ssn}"
-                )
-
-            if not frame.receive_sequence_number == self.server_rsn:
-                raise LocalProtocolError(
-                    f"Receive Sequence number {frame.receive_sequence_number} does not "
-                    f"correspond with the current state of the HDLC "
-                    f"connection {self.server_rsn}"
-                )
-            self._increment_server_ssn()
-            self._increment_client_rsn()
-
-    def _increment_server_rsn(self):
-        self.server_rsn += 1
-        if self.server_rsn > 7:
-            self.server_rsn = 0
-
-    def _increment_server_ssn(self):
-        self.server_ssn += 1
-        if self.server_ssn > 7:
-            self.server_ssn = 0
-
-    def _increment_client_rsn(self):
-        self.client_rsn += 1
-        if self.client_rsn > 7:
-            self.client_rsn = 0
-
-    def _increment_client_ssn(self):
-        self.client_ssn += 1
-        if self.client_ssn > 7:
-            self.client_ssn = 0
-
-    def _transition_state(self, frame_type):
+        acknowledged = (
+            receive_sequence_number - self.acknowledged_sequence_number
+        ) % SEQUENCE_NUMBER_MODULUS
+        if acknowledged > self.unacknowledged_count:
+            raise LocalProtocolError(
+                f"Receive Sequence number {receive_sequence_number} acknowledges frames "
+                f"that has not been sent. Unacknowledged frames are "
+                f"{self.acknowledged_sequence_number} to {self.send_sequence_number}"
+            )
+        for _ in range(acknowledged):
+            self._unacknowledged[self.acknowledged_sequence_number] = None
+            self.acknowledged_sequence_number = self._next(
+                self.acknowledged_sequence_number
+            )
+
+    @staticmethod
+    def _check_sequence_numbers(
+        frame: frames.InformationFrame,
+        send_sequence_number: int,
+        receive_sequence_number: int,
+    ):
+        if not frame.send_sequence_number == send_sequence_number:
+            raise LocalProtocolError(
+                f"Send Sequence Number {frame.send_sequence_number} does not correspond"
+                f" with the current state of the HDLC connection {send_sequence_number}"
+            )
+
+        if not frame.receive_sequence_number == receive_sequence_number:
+            raise LocalProtocolError(
+                f"Receive Sequence number {frame.receive_sequence_number} does not "
+                f"correspond with the current state of the HDLC "
+                f"connection {receive_sequence_number}"
+            )
+
+    @staticmethod
+    def _next(sequence_number: int) -> int:
+        return (sequence_number + 1) % SEQUENCE_NUMBER_MODULUS
+
+    def _check_transition(self, frame_type):
         try:
-            new_state = HDLC_STATE_TRANSITIONS[self.current_state][frame_type]
+            return HDLC_STATE_TRANSITIONS[self.current_state][frame_type]
         except KeyError:
             raise LocalProtocolError(
                 f"can't handle frame type {frame_type} when state={self.current_state}"
             )
+
+    def _set_state(self, new_state):
         old_state = self.current_state
         self.current_state = new_state
         LOG.debug(f"HDLC state transitioned from {old_state} to {new_state}")
@@ -3,10 +3,19 @@
 
 
 def validate_information_sequence_number(instance, attribute, value):
-    if 0 <= value >= 7:
+    if not 0 <= value <= 7:
         raise ValueError(f"Sequence number can only be between 0-7. Got {value}")
 
 
+def validate_window_size(instance, attribute, value):
+    """
+    The sequence numbers are counted modulo 8 so at most 7 frames can be
+    unacknowledged.
+    """
+    if not 1 <= value <= 7:
+        raise ValueError(f"Window size can only be between 1-7. Got {value}")
+
+
 
 
 def validate_hdlc_address_type(instance, attribute, value):
@@ -0,0 +1,143 @@
+"""
+IEC 62056-21 mode E opening sequence.
+
+Meters with an optical port often start at 300 baud and expect the IEC 62056-21
+sign-on before they switch to HDLC:
+
+1. The client sends a request message, `/?{device address}!CR LF`, at 300 baud,
+   7 data bits, even parity and 1 stop bit.
+2. The meter answers with its identification message,
+   `/XXXZ\\2{identification}CR LF`. XXX is the manufacturer, Z the highest baud
+   rate the meter supports and the escape sequence `\\2` tells that the meter
+   supports HDLC (mode E).
+3. The client acknowledges with `ACK 2 Z 2 CR LF`, where Z is the baud rate to use.
+4. Both sides switch to the selected baud rate with 8 data bits, no parity and 1
+   stop bit, and the HDLC connection is set up with a SNRM.
+"""
+import re
+from typing import *
+
+import attr
+
+SIGN_ON_BAUD_RATE = 300
+
+# Baud rate characters of mode C and E.
+BAUD_RATES = {
+    "0": 300,
+    "1": 600,
+    "2": 1200,
+    "3": 2400,
+    "4": 4800,
+    "5": 9600,
+    "6": 19200,
+}
+BAUD_RATE_CHARACTERS = {rate: character for character, rate in BAUD_RATES.items()}
+
+ACK = b"\x06"
+CR_LF = b"\r\n"
+
+# Protocol and mode control characters of the acknowledgement for HDLC.
+HDLC_PROTOCOL_CONTROL = b"2"
+HDLC_MODE_CONTROL = b"2"
+HDLC_ESCAPE = "2"
+
+# "/", manufacturer, baud rate character, a few escape sequences, identification of
+# at most 16 characters and CR LF.
+MAX_IDENTIFICATION_LENGTH = 32
+
+_IDENTIFICATION_PATTERN = re.compile(
+    r"/(?P<manufacturer>[A-Za-z]{3})(?P<baud_rate_character>[0-9A-Z])"
+    r"(?P<escapes>(?:\\.)*)(?P<identification>[^\r\n]{0,16})\r\n"
+)
+
+
+class SignOnError(Exception):
+    """The meter did not answer the sign-on as expected"""
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class IdentificationMessage:
+    """
+    The answer of the meter to the sign-on request.
+    """
+
+    manufacturer: str
+    baud_rate_character: str
+    identification: str
+    # Characters of the escape sequences, `\\2` gives "2".
+    escapes: Tuple[str, ...] = attr.ib(default=(), converter=tuple)
+
+    @property
+    def supports_hdlc(self) -> bool:
+        return HDLC_ESCAPE in self.escapes
+
+    @property
+    def max_baud_rate(self) -> int:
+        try:
+            return BAUD_RATES[self.baud_rate_character]
+        except KeyError:
+            raise SignOnError(
+                f"Baud rate character {self.baud_rate_character!r} is not a mode E "
+                f"baud rate"
+            )
+
+    @classmethod
+    def from_bytes(cls, in_bytes: bytes):
+        match = _IDENTIFICATION_PATTERN.fullmatch(
+            bytes(in_bytes).decode("ascii", errors="replace")
+        )
+        if match is None:
+            raise SignOnError(f"Not an identification message: {in_bytes!r}")
+        return cls(
+            manufacturer=match.group("manufacturer"),
+            baud_rate_character=match.group("baud_rate_character"),
+            identification=match.group("identification"),
+            escapes=match.group("escapes")[1::2],
+        )
+
+    def to_bytes(self) -> bytes:
+        escapes = "".join(f"\\{escape}" for escape in self.escapes)
+        return (
+            f"/{self.manufacturer}{self.baud_rate_character}{escapes}"
+            f"{self.identification}\r\n"
+        ).encode("ascii")
+
+
+def request_message(device_address: str = "") -> bytes:
+    """
+    The sign-on request. Without device address any meter on the optical port
+    answers.
+    """
+    return b"/?" + device_address.encode("ascii") + b"!" + CR_LF
+
+
+def acknowledgement_message(baud_rate: int) -> bytes:
+    """
+    Selects HDLC at `baud_rate`.
+    """
+    return (
+        ACK
+        + HDLC_PROTOCOL_CONTROL
+        + BAUD_RATE_CHARACTERS[baud_rate].encode("ascii")
+        + HDLC_MODE_CONTROL
+        + CR_LF
+    )
+
+
+def select_baud_rate(identification: IdentificationMessage, max_baud_rate: int) -> int:
+    """
+    The highest baud rate supported by both the meter and the client.
+    """
+    limit = min(identification.max_baud_rate, max_baud_rate)
+    supported = [rate for rate in BAUD_RATES.values() if rate <= limit]
+    if not supported:
+        raise SignOnError(f"No mode E baud rate at or below {limit}")
+    return max(supported)
+
+
+def lower_baud_rate(baud_rate: int) -> Optional[int]:
+    """
+    The next lower mode E baud rate, or None if `baud_rate` is the lowest.
+    """
+    lower = [rate for rate in BAUD_RATES.values() if rate < baud_rate]
+    return max(lower) if lower else None
@@ -20,7 +20,7 @@ REQUIRED = [
 
 # What packages are optional?
 EXTRAS = {
-    # 'fancy feature': ['django'],
+    'numpy': ['numpy'],
 }
 
 here = os.path.abspath(os.path.dirname(__file__))
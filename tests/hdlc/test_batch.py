@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from dlms_cosem.protocol.hdlc import address, batch, frames
+
+SERVER_ADDRESS = address.HdlcAddress(
+    logical_address=1, physical_address=17, address_type="server"
+)
+CLIENT_ADDRESS = address.HdlcAddress(
+    logical_address=16, physical_address=None, address_type="client"
+)
+
+
+def make_frames(count, seed=1):
+    rand = random.Random(seed)
+    out = list()
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            frame = frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        elif kind == 1:
+            frame = frames.DisconnectFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        else:
+            payload = bytes(rand.getrandbits(8) for _ in range(rand.randint(0, 40)))
+            frame = frames.InformationFrame(
+                CLIENT_ADDRESS, SERVER_ADDRESS, payload, response_frame=kind == 3
+            )
+        out.append(frame.to_bytes())
+    return out
+
+
+def corrupt(frame_list, seed=2):
+    rand = random.Random(seed)
+    out = list()
+    for frame in frame_list:
+        frame = bytearray(frame)
+        if rand.random() < 0.5:
+            position = rand.randrange(len(frame))
+            frame[position] ^= 1 << rand.randrange(8)
+        out.append(bytes(frame))
+    return out
+
+
+def test_verify_frame_ok():
+    for frame in make_frames(8):
+        assert batch.verify_frame(frame) == batch.FRAME_OK
+
+
+def test_verify_frame_reports_hcs_position():
+    frame = bytearray(make_frames(3)[2])
+    frame[-5] ^= 0xFF  # information is only covered by FCS
+    assert batch.verify_frame(frame) == len(frame) - 3
+    frame = bytearray(make_frames(3)[2])
+    frame[4] ^= 0x10  # source address
+    assert batch.verify_frame(frame) == 7
+
+
+def test_split_frames():
+    frame_list = make_frames(10)
+    # shared flags between some of the frames.
+    packed = frame_list[0] + frame_list[1][1:] + b"".join(frame_list[2:])
+    split = batch.split_frames(packed)
+    assert [bytes(frame) for frame in split] == [frame_list[0]] + frame_list[1:]
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_verify_many_matches_scalar_verification(use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    frame_list = corrupt(make_frames(400))
+    valid, errors = batch.verify_many(frame_list, use_numpy=use_numpy)
+
+    expected = [batch.verify_frame(frame) for frame in frame_list]
+    assert list(errors) == expected
+    assert list(valid) == [error == batch.FRAME_OK for error in expected]
+    assert not all(valid)
+    assert any(valid)
+
+
+def test_verify_many_packed_buffer():
+    frame_list = make_frames(20)
+    valid, errors = batch.verify_many(b"".join(frame_list))
+    assert len(valid) == 20
+    assert all(valid)
@@ -0,0 +1,406 @@
+import itertools
+
+import pytest
+
+from dlms_cosem.protocol.hdlc import (
+    address,
+    connection,
+    exceptions,
+    fields,
+    frames,
+    segmentation,
+    state,
+)
+
+SERVER_ADDRESS = address.HdlcAddress(
+    logical_address=1, physical_address=17, address_type="server"
+)
+CLIENT_ADDRESS = address.HdlcAddress(
+    logical_address=16, physical_address=None, address_type="client"
+)
+
+UA_BYTES = b"~\xa0\x1f!\x02#s\xe6\xc7\x81\x80\x12\x05\x01\x9a\x06\x01\x9a\x07\x04\x00\x00\x00\x01\x08\x04\x00\x00\x00\x01\xcc\xa2~"
+
+
+@pytest.fixture
+def hdlc_connection():
+    return connection.HdlcConnection(
+        client_address=CLIENT_ADDRESS, server_address=SERVER_ADDRESS
+    )
+
+
+def segment_frames(*args, **kwargs):
+    """The frames of `segmentation.segment_information` as frame objects."""
+    parser = frames.HdlcFrameParser()
+    out = list()
+    previous_segment = None
+    for frame_bytes in segmentation.segment_information(*args, **kwargs):
+        frame = parser.parse(bytes(frame_bytes), previous_segment=previous_segment)
+        previous_segment = frame if frame.segmented else None
+        out.append(frame)
+    return out
+
+
+def connect(hdlc_connection, ua_bytes=UA_BYTES):
+    hdlc_connection.send(
+        frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+    )
+    hdlc_connection.receive_data(ua_bytes)
+    hdlc_connection.next_event()
+
+
+def connect_with_window_size(hdlc_connection, window_size):
+    parameters = fields.HdlcParameters(
+        window_size_transmit=window_size, window_size_receive=window_size
+    )
+    hdlc_connection.parameters = parameters
+    connect(
+        hdlc_connection,
+        frames.UnNumberedAcknowledgmentFrame(
+            CLIENT_ADDRESS, SERVER_ADDRESS, parameters.to_bytes()
+        ).to_bytes(),
+    )
+
+
+class TestParameterNegotiation:
+    def test_parameters_from_ua(self):
+        hdlc_connection = connection.HdlcConnection(
+            client_address=CLIENT_ADDRESS,
+            server_address=SERVER_ADDRESS,
+            parameters=fields.HdlcParameters(512, 512, 7, 7),
+        )
+        connect(hdlc_connection)
+
+        assert hdlc_connection.parameters == fields.HdlcParameters(154, 154, 1, 1)
+        assert hdlc_connection.state.window_size_transmit == 1
+
+    def test_ua_without_parameters_gives_defaults(self, hdlc_connection):
+        hdlc_connection.parameters = fields.HdlcParameters(512, 512, 7, 7)
+        hdlc_connection.send(
+            frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        )
+        ua = frames.UnNumberedAcknowledgmentFrame(CLIENT_ADDRESS, SERVER_ADDRESS)
+        hdlc_connection.receive_data(ua.to_bytes())
+        hdlc_connection.next_event()
+        assert hdlc_connection.parameters == fields.HdlcParameters()
+
+    def test_ua_with_invalid_window_size_gives_defaults(self, hdlc_connection):
+        hdlc_connection.parameters = fields.HdlcParameters(512, 512, 7, 7)
+        ua = frames.UnNumberedAcknowledgmentFrame(
+            CLIENT_ADDRESS, SERVER_ADDRESS, bytes.fromhex("818006070400000000")
+        )
+        connect(hdlc_connection, ua.to_bytes())
+        assert hdlc_connection.parameters == fields.HdlcParameters()
+        assert hdlc_connection.state.current_state == state.IDLE
+
+
+class TestReceiveData:
+    def test_frame_received_byte_by_byte(self, hdlc_connection):
+        hdlc_connection.send(
+            frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        )
+        for i in range(len(UA_BYTES) - 1):
+            hdlc_connection.receive_data(UA_BYTES[i : i + 1])
+            assert hdlc_connection.next_event() is state.NEED_DATA
+
+        hdlc_connection.receive_data(UA_BYTES[-1:])
+        frame = hdlc_connection.next_event()
+
+        assert isinstance(frame, frames.UnNumberedAcknowledgmentFrame)
+        assert hdlc_connection.state.current_state == state.IDLE
+        assert hdlc_connection.next_event() is state.NEED_DATA
+
+    def test_flag_in_data_is_not_taken_as_frame_end(self, hdlc_connection):
+        connect(hdlc_connection)
+        hdlc_connection.send(
+            frames.InformationFrame(SERVER_ADDRESS, CLIENT_ADDRESS, b"\x01\x02")
+        )
+        payload = b"\x7e\x01\x7e\x7e\x02"
+        response = frames.InformationFrame(
+            CLIENT_ADDRESS,
+            SERVER_ADDRESS,
+            payload,
+            send_sequence_number=0,
+            receive_sequence_number=1,
+            response_frame=True,
+        ).to_bytes()
+
+        hdlc_connection.receive_data(response[:12])
+        assert hdlc_connection.next_event() is state.NEED_DATA
+        hdlc_connection.receive_data(response[12:])
+        frame = hdlc_connection.next_event()
+
+        assert frame.payload == payload
+        assert hdlc_connection.state.current_state == state.IDLE
+
+
+    def test_frames_sharing_flags(self, hdlc_connection):
+        segmented = segmentation.segment_information(
+            CLIENT_ADDRESS,
+            SERVER_ADDRESS,
+            bytes(range(256)) * 4,
+            send_sequence_number=0,
+            receive_sequence_number=0,
+            response_frame=True,
+        )
+        # remove the opening flag of all frames but the first.
+        data = b"".join(
+            bytes(frame if index == 0 else frame[1:])
+            for index, frame in enumerate(segmented)
+        )
+
+        position = 0
+        for chunk_size in itertools.cycle((1, 7, 64, 300)):
+            hdlc_connection.receive_data(data[position : position + chunk_size])
+            position += chunk_size
+            if position >= len(data):
+                break
+
+        assert list(hdlc_connection._frames) == [bytes(frame) for frame in segmented]
+        assert len(hdlc_connection.buffer) <= 1
+
+    def test_garbage_before_frame_is_discarded(self, hdlc_connection):
+        hdlc_connection.send(
+            frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        )
+        hdlc_connection.receive_data(b"\x00\x01\x7e\x7e\x7e" + UA_BYTES)
+        assert isinstance(
+            hdlc_connection.next_event(), frames.UnNumberedAcknowledgmentFrame
+        )
+
+    def test_resynchronizes_after_frame_with_incorrect_fcs(self, hdlc_connection):
+        hdlc_connection.send(
+            frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        )
+        corrupted = bytearray(UA_BYTES)
+        corrupted[10] ^= 0xFF
+        hdlc_connection.receive_data(bytes(corrupted) + UA_BYTES)
+        assert isinstance(
+            hdlc_connection.next_event(), frames.UnNumberedAcknowledgmentFrame
+        )
+        assert hdlc_connection.next_event() is state.NEED_DATA
+
+    def test_false_start_in_noise_does_not_hold_back_frames(self, hdlc_connection):
+        hdlc_connection.send(
+            frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        )
+        # A flag followed by a valid frame format field for a frame of 2 KB.
+        noise = b"\x7e\xa7\xff\x21\x03\x93\x00\x00"
+        hdlc_connection.receive_data(noise + UA_BYTES)
+        assert isinstance(
+            hdlc_connection.next_event(), frames.UnNumberedAcknowledgmentFrame
+        )
+
+    def test_false_start_is_rejected_at_the_hcs(self, hdlc_connection):
+        hdlc_connection.send(
+            frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        )
+        hdlc_connection.receive_data(b"\x7e\xa7\xff\x21\x03\x93\x00\x00")
+        # Only waits for the next frame format field, not for the 2 KB frame.
+        assert hdlc_connection.missing_bytes == 3
+        hdlc_connection.receive_data(UA_BYTES)
+        assert isinstance(
+            hdlc_connection.next_event(), frames.UnNumberedAcknowledgmentFrame
+        )
+
+    def test_consumed_data_is_removed_from_buffer(self, hdlc_connection):
+        hdlc_connection.send(
+            frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        )
+        hdlc_connection.receive_data(UA_BYTES + UA_BYTES[:10])
+        assert bytes(hdlc_connection.buffer) == UA_BYTES[:10]
+
+    def test_missing_bytes(self, hdlc_connection):
+        hdlc_connection.send(
+            frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        )
+        assert hdlc_connection.missing_bytes == 3
+        hdlc_connection.receive_data(UA_BYTES[:1])
+        assert hdlc_connection.missing_bytes == 2
+        hdlc_connection.receive_data(UA_BYTES[1:3])
+        assert hdlc_connection.missing_bytes == connection.MAX_HEADER_LENGTH - 3
+        # Addresses, control field and HCS received.
+        hdlc_connection.receive_data(UA_BYTES[3:9])
+        assert hdlc_connection.missing_bytes == len(UA_BYTES) - 9
+        hdlc_connection.receive_data(UA_BYTES[9:-1])
+        assert hdlc_connection.missing_bytes == 1
+
+
+class TestSegmentation:
+    def test_receive_segmented_response(self, hdlc_connection):
+        connect(hdlc_connection)
+        hdlc_connection.send(
+            frames.InformationFrame(SERVER_ADDRESS, CLIENT_ADDRESS, b"\x01\x02")
+        )
+        payload = bytes(i % 251 for i in range(1000))
+        response_frames = segment_frames(
+            CLIENT_ADDRESS,
+            SERVER_ADDRESS,
+            payload,
+            send_sequence_number=0,
+            receive_sequence_number=1,
+            response_frame=True,
+        )
+        assert len(response_frames) > 2
+
+        for response_frame in response_frames[:-1]:
+            hdlc_connection.receive_data(response_frame.to_bytes())
+            frame = hdlc_connection.next_event()
+            assert isinstance(frame, frames.SegmentedInformationResponseFrame)
+            assert hdlc_connection.take_information() is None
+            assert (
+                hdlc_connection.state.current_state
+                == state.SHOULD_SEND_READY_TO_RECEIVE
+            )
+            hdlc_connection.send(
+                frames.ReceiveReadyFrame(
+                    SERVER_ADDRESS,
+                    CLIENT_ADDRESS,
+                    receive_sequence_number=(
+                        hdlc_connection.state.receive_sequence_number
+                    ),
+                )
+            )
+
+        hdlc_connection.receive_data(response_frames[-1].to_bytes())
+        frame = hdlc_connection.next_event()
+        assert type(frame) is frames.InformationFrame
+        assert hdlc_connection.state.current_state == state.IDLE
+        assert hdlc_connection.take_information() == payload
+
+    def test_send_segmented_request(self, hdlc_connection):
+        connect(hdlc_connection)
+        request_frames = segment_frames(
+            SERVER_ADDRESS, CLIENT_ADDRESS, bytes(300), 0, 0
+        )
+        for request_frame in request_frames[:-1]:
+            hdlc_connection.send(request_frame)
+            hdlc_connection.receive_data(
+                frames.ReceiveReadyFrame(
+                    CLIENT_ADDRESS,
+                    SERVER_ADDRESS,
+                    receive_sequence_number=hdlc_connection.state.send_sequence_number,
+                ).to_bytes()
+            )
+            assert isinstance(hdlc_connection.next_event(), frames.ReceiveReadyFrame)
+            assert hdlc_connection.state.current_state == state.IDLE
+
+        hdlc_connection.send(request_frames[-1])
+        assert hdlc_connection.state.current_state == state.AWAITING_RESPONSE
+        assert hdlc_connection.state.send_sequence_number == len(request_frames)
+
+
+class TestWindowing:
+    def test_one_receive_ready_for_window_of_segments(self, hdlc_connection):
+        connect_with_window_size(hdlc_connection, 3)
+        hdlc_connection.send(
+            frames.InformationFrame(SERVER_ADDRESS, CLIENT_ADDRESS, b"\x01\x02")
+        )
+        payload = bytes(1000)
+        response_frames = segment_frames(
+            CLIENT_ADDRESS,
+            SERVER_ADDRESS,
+            payload,
+            send_sequence_number=0,
+            receive_sequence_number=1,
+            response_frame=True,
+            window_size=3,
+        )
+        hdlc_connection.receive_data(
+            b"".join(frame.to_bytes() for frame in response_frames[:3])
+        )
+
+        for _ in range(2):
+            assert not hdlc_connection.next_event().final
+            assert hdlc_connection.state.current_state == state.AWAITING_RESPONSE
+        assert hdlc_connection.next_event().final
+        assert (
+            hdlc_connection.state.current_state == state.SHOULD_SEND_READY_TO_RECEIVE
+        )
+
+        hdlc_connection.send(
+            frames.ReceiveReadyFrame(
+                SERVER_ADDRESS, CLIENT_ADDRESS, receive_sequence_number=3
+            )
+        )
+        assert hdlc_connection.state.current_state == state.AWAITING_RESPONSE
+        assert hdlc_connection.state.received_in_window == 0
+
+    def test_frames_outside_window_are_rejected(self, hdlc_connection):
+        connect(hdlc_connection)
+        request_frames = segment_frames(
+            SERVER_ADDRESS, CLIENT_ADDRESS, bytes(300), 0, 0, window_size=3
+        )
+        with pytest.raises(exceptions.LocalProtocolError):
+            hdlc_connection.send(request_frames[0])
+
+    def test_send_window_of_segments(self, hdlc_connection):
+        connect_with_window_size(hdlc_connection, 3)
+        request_frames = segment_frames(
+            SERVER_ADDRESS, CLIENT_ADDRESS, bytes(500), 0, 0, window_size=3
+        )
+        for request_frame in request_frames[:2]:
+            hdlc_connection.send(request_frame)
+            assert hdlc_connection.state.current_state == state.IDLE
+        hdlc_connection.send(request_frames[2])
+        assert hdlc_connection.state.current_state == state.AWAITING_RESPONSE
+
+        hdlc_connection.receive_data(
+            frames.ReceiveReadyFrame(
+                CLIENT_ADDRESS, SERVER_ADDRESS, receive_sequence_number=3
+            ).to_bytes()
+        )
+        hdlc_connection.next_event()
+        assert hdlc_connection.state.current_state == state.IDLE
+        hdlc_connection.send(request_frames[3])
+        assert hdlc_connection.state.unacknowledged_count == 1
+        assert hdlc_connection.state.can_send == 2
+
+
+class TestNextEvent:
+    def test_unexpected_frame_raises_local_protocol_error(self, hdlc_connection):
+        hdlc_connection.send(
+            frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        )
+        hdlc_connection.receive_data(
+            frames.ReceiveReadyFrame(CLIENT_ADDRESS, SERVER_ADDRESS).to_bytes()
+        )
+        with pytest.raises(exceptions.LocalProtocolError):
+            hdlc_connection.next_event()
+        assert hdlc_connection.next_event() is state.NEED_DATA
+
+    def test_disconnected_mode_on_snrm(self, hdlc_connection):
+        hdlc_connection.send(
+            frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        )
+        hdlc_connection.receive_data(
+            frames.DisconnectModeFrame(CLIENT_ADDRESS, SERVER_ADDRESS).to_bytes()
+        )
+        assert isinstance(hdlc_connection.next_event(), frames.DisconnectModeFrame)
+        assert hdlc_connection.state.current_state == state.NOT_CONNECTED
+
+    def test_unparsable_frame_is_discarded(self, hdlc_connection):
+        hdlc_connection.send(
+            frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+        )
+        # valid FCS but not a HDLC frame format.
+        garbage = bytearray(b"\x7e\x00\x07\x21\x03\x73")
+        garbage += frames.FCS.calculate_for(garbage[1:]) + b"\x7e"
+        hdlc_connection.receive_data(bytes(garbage) + UA_BYTES)
+        assert isinstance(
+            hdlc_connection.next_event(), frames.UnNumberedAcknowledgmentFrame
+        )
+
+    @pytest.mark.parametrize(
+        "frame_class",
+        [frames.UnNumberedAcknowledgmentFrame, frames.DisconnectModeFrame],
+    )
+    def test_late_answer_to_repeated_snrm_is_discarded(
+        self, hdlc_connection, frame_class
+    ):
+        connect(hdlc_connection)
+        hdlc_connection.receive_data(
+            frame_class(CLIENT_ADDRESS, SERVER_ADDRESS).to_bytes()
+        )
+        assert hdlc_connection.next_event() is state.NEED_DATA
+        assert hdlc_connection.state.current_state == state.IDLE
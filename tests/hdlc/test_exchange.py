@@ -0,0 +1,324 @@
+import pytest
+
+from dlms_cosem.protocol.hdlc import (
+    address,
+    connection,
+    exceptions,
+    exchange,
+    fields,
+    frames,
+    segmentation,
+    state,
+)
+
+SERVER_ADDRESS = address.HdlcAddress(
+    logical_address=1, physical_address=17, address_type="server"
+)
+CLIENT_ADDRESS = address.HdlcAddress(
+    logical_address=16, physical_address=None, address_type="client"
+)
+
+
+def run_scripted(hdlc_connection, hdlc_exchange, responses):
+    """
+    Feeds the next scripted response every time the exchange wants to read. None is
+    a response that is not received in time.
+    """
+    written = list()
+    responses = iter(responses)
+
+    def next_event():
+        while True:
+            event = hdlc_connection.next_event()
+            if event is not state.NEED_DATA:
+                return event
+            response = next(responses)
+            if response is None:
+                return state.TIMEOUT
+            hdlc_connection.receive_data(response)
+
+    result = exchange.run(hdlc_exchange, written.append, next_event)
+    return result, written
+
+
+@pytest.fixture
+def hdlc_connection():
+    hdlc_connection = connection.HdlcConnection(
+        client_address=CLIENT_ADDRESS,
+        server_address=SERVER_ADDRESS,
+        parameters=fields.HdlcParameters(window_size_receive=2),
+    )
+    parameters = fields.HdlcParameters(window_size_transmit=2)
+    run_scripted(
+        hdlc_connection,
+        exchange.connect(hdlc_connection),
+        [
+            frames.UnNumberedAcknowledgmentFrame(
+                CLIENT_ADDRESS, SERVER_ADDRESS, parameters.to_bytes()
+            ).to_bytes()
+        ],
+    )
+    return hdlc_connection
+
+
+def test_connect_sends_proposed_parameters(hdlc_connection):
+    assert hdlc_connection.state.current_state == state.IDLE
+    assert hdlc_connection.parameters.window_size_receive == 2
+
+
+def test_send_information_with_segmented_response(hdlc_connection):
+    payload = bytes(range(256)) * 2
+    response_frames = segmentation.segment_information(
+        CLIENT_ADDRESS,
+        SERVER_ADDRESS,
+        payload,
+        send_sequence_number=0,
+        receive_sequence_number=1,
+        response_frame=True,
+        window_size=2,
+    )
+    result, written = run_scripted(
+        hdlc_connection,
+        exchange.send_information(hdlc_connection, b"\xc0\x01"),
+        [bytes(frame) for frame in response_frames],
+    )
+
+    assert result == payload
+    # The request and one RR per window of two frames.
+    assert len(written) == 1 + len(response_frames) // 2
+    assert hdlc_connection.state.current_state == state.IDLE
+
+
+def test_send_information_when_not_connected():
+    hdlc_connection = connection.HdlcConnection(
+        client_address=CLIENT_ADDRESS, server_address=SERVER_ADDRESS
+    )
+    with pytest.raises(exceptions.LocalProtocolError):
+        next(exchange.send_information(hdlc_connection, b"\xc0\x01"))
+
+
+def response_frame(payload=b"\xc4\x01", receive_sequence_number=1):
+    return frames.InformationFrame(
+        CLIENT_ADDRESS,
+        SERVER_ADDRESS,
+        payload,
+        send_sequence_number=0,
+        receive_sequence_number=receive_sequence_number,
+        response_frame=True,
+    ).to_bytes()
+
+
+def receive_ready_sequence_number(frame_bytes):
+    control = fields.ReceiveReadyControlField.from_bytes(
+        bytes([frames.unpack_frame(frame_bytes).control_byte])
+    )
+    return control.receive_sequence_number
+
+
+class TestRecovery:
+    def test_request_is_sent_again_on_timeout(self, hdlc_connection):
+        result, written = run_scripted(
+            hdlc_connection,
+            exchange.send_information(hdlc_connection, b"\xc0\x01"),
+            [None, response_frame()],
+        )
+        assert result == b"\xc4\x01"
+        assert len(written) == 2
+        assert written[0] == written[1]
+
+    def test_no_response_after_retries(self, hdlc_connection):
+        hdlc_connection.max_retries = 2
+        with pytest.raises(exceptions.TransmissionFailed):
+            run_scripted(
+                hdlc_connection,
+                exchange.send_information(hdlc_connection, b"\xc0\x01"),
+                [None] * 3,
+            )
+
+    def test_reconnect_after_failure(self, hdlc_connection):
+        hdlc_connection.max_retries = 1
+        with pytest.raises(exceptions.TransmissionFailed):
+            run_scripted(
+                hdlc_connection,
+                exchange.send_information(hdlc_connection, bytes(200)),
+                [None] * 2,
+            )
+        assert hdlc_connection.state.current_state == state.NOT_CONNECTED
+        assert hdlc_connection.state.send_sequence_number == 0
+
+        ua = frames.UnNumberedAcknowledgmentFrame(CLIENT_ADDRESS, SERVER_ADDRESS)
+        run_scripted(
+            hdlc_connection, exchange.connect(hdlc_connection), [ua.to_bytes()]
+        )
+        result, _ = run_scripted(
+            hdlc_connection,
+            exchange.send_information(hdlc_connection, b"\xc0\x01"),
+            [response_frame(receive_sequence_number=1)],
+        )
+        assert result == b"\xc4\x01"
+
+    def test_reset_after_frames_rejected_too_many_times(self, hdlc_connection):
+        hdlc_connection.max_retries = 0
+        with pytest.raises(exceptions.TransmissionFailed):
+            run_scripted(
+                hdlc_connection,
+                exchange.send_information(hdlc_connection, bytes(200)),
+                [
+                    frames.RejectFrame(
+                        CLIENT_ADDRESS, SERVER_ADDRESS, receive_sequence_number=0
+                    ).to_bytes()
+                ],
+            )
+        assert hdlc_connection.state.current_state == state.NOT_CONNECTED
+
+    @pytest.mark.parametrize(
+        "supervisory_frame", [frames.RejectFrame, frames.ReceiveReadyFrame]
+    )
+    def test_frames_not_acknowledged_are_sent_again(
+        self, hdlc_connection, supervisory_frame
+    ):
+        # Two frames sent in one window where the server only got the first.
+        result, written = run_scripted(
+            hdlc_connection,
+            exchange.send_information(hdlc_connection, bytes(200)),
+            [
+                supervisory_frame(
+                    CLIENT_ADDRESS, SERVER_ADDRESS, receive_sequence_number=1
+                ).to_bytes(),
+                response_frame(receive_sequence_number=2),
+            ],
+        )
+        assert result == b"\xc4\x01"
+        assert len(written) == 2
+        control = fields.InformationControlField.from_bytes(
+            bytes([frames.unpack_frame(written[1]).control_byte])
+        )
+        assert control.send_sequence_number == 1
+        assert control.final
+        assert hdlc_connection.state.unacknowledged_count == 0
+
+    def test_repeated_frames_are_discarded(self, hdlc_connection):
+        payload = bytes(range(256)) * 2
+        response_frames = [
+            bytes(frame)
+            for frame in segmentation.segment_information(
+                CLIENT_ADDRESS,
+                SERVER_ADDRESS,
+                payload,
+                send_sequence_number=0,
+                receive_sequence_number=1,
+                response_frame=True,
+                window_size=2,
+            )
+        ]
+        # The second frame of the first window is lost. The server is asked for it
+        # with a RR and sends the first frame again as well.
+        result, written = run_scripted(
+            hdlc_connection,
+            exchange.send_information(hdlc_connection, b"\xc0\x01"),
+            [response_frames[0], None, response_frames[0] + response_frames[1]]
+            + response_frames[2:],
+        )
+        assert result == payload
+        assert receive_ready_sequence_number(written[1]) == 1
+
+    @pytest.mark.parametrize("lost", [1, 2])
+    def test_lost_frame_in_response_window_is_asked_for(self, lost):
+        hdlc_connection = connection.HdlcConnection(
+            client_address=CLIENT_ADDRESS,
+            server_address=SERVER_ADDRESS,
+            parameters=fields.HdlcParameters(window_size_receive=3),
+        )
+        parameters = fields.HdlcParameters(window_size_transmit=3)
+        run_scripted(
+            hdlc_connection,
+            exchange.connect(hdlc_connection),
+            [
+                frames.UnNumberedAcknowledgmentFrame(
+                    CLIENT_ADDRESS, SERVER_ADDRESS, parameters.to_bytes()
+                ).to_bytes()
+            ],
+        )
+        payload = bytes(range(256)) * 2
+        response_frames = [
+            bytes(frame)
+            for frame in segmentation.segment_information(
+                CLIENT_ADDRESS,
+                SERVER_ADDRESS,
+                payload,
+                send_sequence_number=0,
+                receive_sequence_number=1,
+                response_frame=True,
+                window_size=3,
+            )
+        ]
+        # A frame of the first window of three is lost and the frames after it are
+        # discarded. The server sends the rest of the window again on the RR.
+        first_window = b"".join(
+            frame for index, frame in enumerate(response_frames[:3]) if index != lost
+        )
+        result, written = run_scripted(
+            hdlc_connection,
+            exchange.send_information(hdlc_connection, b"\xc0\x01"),
+            [first_window, None, b"".join(response_frames[lost:3])]
+            + response_frames[3:],
+        )
+        assert result == payload
+        assert receive_ready_sequence_number(written[1]) == lost
+        assert receive_ready_sequence_number(written[2]) == 3
+
+    def test_late_ua_after_repeated_snrm(self):
+        hdlc_connection = connection.HdlcConnection(
+            client_address=CLIENT_ADDRESS, server_address=SERVER_ADDRESS
+        )
+        ua = frames.UnNumberedAcknowledgmentFrame(CLIENT_ADDRESS, SERVER_ADDRESS)
+        # The UA of the first SNRM arrives after the timeout and the server answers
+        # the repeated SNRM with a second UA.
+        run_scripted(
+            hdlc_connection, exchange.connect(hdlc_connection), [None, ua.to_bytes()]
+        )
+        result, _ = run_scripted(
+            hdlc_connection,
+            exchange.send_information(hdlc_connection, b"\xc0\x01"),
+            [ua.to_bytes(), response_frame()],
+        )
+        assert result == b"\xc4\x01"
+
+    def test_busy_server_is_polled(self, hdlc_connection):
+        receive_not_ready = frames.ReceiveNotReadyFrame(
+            CLIENT_ADDRESS, SERVER_ADDRESS, receive_sequence_number=1
+        ).to_bytes()
+        result, written = run_scripted(
+            hdlc_connection,
+            exchange.send_information(hdlc_connection, b"\xc0\x01"),
+            [receive_not_ready, None, receive_not_ready, None, response_frame()],
+        )
+        assert result == b"\xc4\x01"
+        assert len(written) == 3
+        assert receive_ready_sequence_number(written[1]) == 0
+        assert written[1] == written[2]
+
+    def test_server_busy_too_long(self, hdlc_connection):
+        hdlc_connection.max_retries = 1
+        receive_not_ready = frames.ReceiveNotReadyFrame(
+            CLIENT_ADDRESS, SERVER_ADDRESS, receive_sequence_number=1
+        ).to_bytes()
+        with pytest.raises(exceptions.TransmissionFailed):
+            run_scripted(
+                hdlc_connection,
+                exchange.send_information(hdlc_connection, b"\xc0\x01"),
+                [receive_not_ready, None, receive_not_ready],
+            )
+        assert hdlc_connection.state.current_state == state.NOT_CONNECTED
+
+    @pytest.mark.parametrize(
+        "frame_class", [frames.DisconnectModeFrame, frames.FrameRejectFrame]
+    )
+    def test_server_disconnected(self, hdlc_connection, frame_class):
+        with pytest.raises(exceptions.ServerDisconnected):
+            run_scripted(
+                hdlc_connection,
+                exchange.send_information(hdlc_connection, b"\xc0\x01"),
+                [frame_class(CLIENT_ADDRESS, SERVER_ADDRESS).to_bytes()],
+            )
+        assert hdlc_connection.state.current_state == state.NOT_CONNECTED
@@ -1,6 +1,11 @@
+import random
+
+import attr
 import pytest
 
+from dlms_cosem.protocol import crc
 from dlms_cosem.protocol.hdlc import (
+    exceptions,
     frames,
     fields,
     address,
@@ -77,6 +82,25 @@ class TestCrc:
         result = _crc.calculate_for(bytes.fromhex(data))
         assert result == bytes.fromhex(correct_crc)
 
+    @pytest.mark.parametrize("data_type", [bytes, bytearray, memoryview])
+    def test_crc_accepts_buffers(self, data_type):
+        data = data_type(bytes.fromhex("033f"))
+        assert frames.HCS.calculate_for(data) == bytes.fromhex("5bec")
+
+    def test_crc_lsb_first(self):
+        result = frames.HCS.calculate_for(bytes.fromhex("033f"), lsb_first=True)
+        assert result == bytes.fromhex("ec5b")
+
+    def test_reflected_table_matches_bit_reversed_calculation(self):
+        rand = random.Random(4711)
+        _crc = crc.CRCCCITT()
+        for length in range(0, 1000):
+            data = bytes(rand.getrandbits(8) for _ in range(length % 300))
+            for lsb_first in (False, True):
+                assert _crc.calculate_for(
+                    data, lsb_first=lsb_first
+                ) == _crc.calculate_for_reversed_bits(data, lsb_first=lsb_first)
+
 
 class TestHdlcFrameValidation:
 
@@ -167,6 +191,33 @@ class TestInformationFrame:
         print(frame.to_bytes())
         assert frame.to_bytes() == total
 
+    def test_serialized_frame_is_cached_until_changed(self):
+        server_address = address.HdlcAddress(
+            logical_address=1, physical_address=17, address_type="server"
+        )
+        client_address = address.HdlcAddress(
+            logical_address=16, physical_address=None, address_type="client"
+        )
+        frame = frames.InformationFrame(
+            destination_address=server_address,
+            source_address=client_address,
+            payload=b"\x01\x02",
+        )
+        first = frame.to_bytes()
+        assert frame.to_bytes() is first
+        assert frame.fcs == first[-3:-1]
+        assert frame.hcs == frames.HCS.calculate_for(frame.header_content)
+
+        frame.send_sequence_number = 1
+        changed = frame.to_bytes()
+        assert changed != first
+        assert changed == frames.InformationFrame(
+            destination_address=server_address,
+            source_address=client_address,
+            payload=b"\x01\x02",
+            send_sequence_number=1,
+        ).to_bytes()
+
 
 class TestInformationResponseFrame:
     def test_contruct(self):
@@ -207,6 +258,92 @@ class TestInformationResponseFrame:
         print(info)
         assert info.to_bytes().hex() == in_data.hex()
 
+    def test_from_bytes_payload_is_view_of_received_data(self):
+        in_data = bytearray(
+            bytes.fromhex(
+                "7EA0382102233034E7E6E7006129A109060760857405080101A203020100A305A103020100BE10040E0800065F1F0400001E1D04C80007B86A7E"
+            )
+        )
+        info = frames.InformationFrame.from_bytes(in_data)
+        assert isinstance(info.payload, memoryview)
+        assert info.payload.obj is in_data
+        assert info.payload == in_data[12:-3]
+        assert info.response_frame
+        assert info.receive_sequence_number == 1
+
+    def test_repr_shows_payload_bytes(self):
+        in_data = bytes.fromhex(
+            "7EA0382102233034E7E6E7006129A109060760857405080101A203020100A305A103020100BE10040E0800065F1F0400001E1D04C80007B86A7E"
+        )
+        info = frames.InformationFrame.from_bytes(in_data)
+        assert f"payload={bytes(in_data[12:-3])!r}" in repr(info)
+        assert "memory at" not in repr(info)
+
+    @pytest.mark.parametrize("position,message", [(8, "HCS"), (20, "FCS"), (-2, "FCS")])
+    def test_from_bytes_wrong_check_sequence(self, position, message):
+        in_data = bytearray(
+            bytes.fromhex(
+                "7EA0382102233034E7E6E7006129A109060760857405080101A203020100A305A103020100BE10040E0800065F1F0400001E1D04C80007B86A7E"
+            )
+        )
+        in_data[position] ^= 0xFF
+        with pytest.raises(exceptions.HdlcParsingError, match=message):
+            frames.InformationFrame.from_bytes(in_data)
+
+
+class TestHdlcParameters:
+    def test_from_bytes(self):
+        parameters = fields.HdlcParameters.from_bytes(
+            bytes.fromhex("81801205019a06019a070400000001080400000001")
+        )
+        assert parameters == fields.HdlcParameters(
+            max_information_length_transmit=154,
+            max_information_length_receive=154,
+            window_size_transmit=1,
+            window_size_receive=1,
+        )
+
+    def test_empty_is_default(self):
+        assert fields.HdlcParameters.from_bytes(b"") == fields.HdlcParameters()
+
+    def test_to_bytes_and_back(self):
+        parameters = fields.HdlcParameters(
+            max_information_length_transmit=1024,
+            max_information_length_receive=200,
+            window_size_transmit=7,
+            window_size_receive=3,
+        )
+        assert fields.HdlcParameters.from_bytes(parameters.to_bytes()) == parameters
+
+    def test_wrong_identifier_raises(self):
+        with pytest.raises(exceptions.HdlcParsingError):
+            fields.HdlcParameters.from_bytes(b"\x81\x81\x00")
+
+    def test_window_size_out_of_range_raises(self):
+        with pytest.raises(exceptions.HdlcParsingError):
+            fields.HdlcParameters.from_bytes(bytes.fromhex("818006070400000000"))
+
+    def test_negotiate(self):
+        proposed = fields.HdlcParameters(1024, 512, 7, 7)
+        response = fields.HdlcParameters(256, 2048, 7, 2)
+        assert proposed.negotiate(response) == fields.HdlcParameters(
+            max_information_length_transmit=1024,
+            max_information_length_receive=256,
+            window_size_transmit=2,
+            window_size_receive=7,
+        )
+
+    def test_snrm_with_parameters_has_hcs(self):
+        snrm = frames.SetNormalResponseModeFrame(
+            destination_address=address.HdlcAddress(1, None, "server"),
+            source_address=address.HdlcAddress(16, None, "client"),
+            payload=fields.HdlcParameters(window_size_transmit=7).to_bytes(),
+        )
+        parsed = frames.HdlcFrameParser().parse(snrm.to_bytes())
+        assert parsed.hcs == snrm.hcs != b""
+        parameters = fields.HdlcParameters.from_bytes(parsed.payload)
+        assert parameters.window_size_transmit == 7
+
 
 class TestInformationControlField:
     def test_from_bytes(self):
@@ -215,3 +352,155 @@ class TestInformationControlField:
         assert ctrl.receive_sequence_number == 1
         assert ctrl.send_sequence_number == 0
         assert ctrl.final
+
+
+class TestIncrementalCrc:
+    def test_chunked_digest_is_same_as_calculate_for(self):
+        data = bytes(range(256)) * 3
+        incremental = crc.IncrementalCRCCCITT()
+        for i in range(0, len(data), 7):
+            incremental.update(memoryview(data)[i : i + 7])
+
+        assert incremental.digest() == frames.FCS.calculate_for(data)
+
+    def test_is_valid_with_crc_appended(self):
+        data = bytes.fromhex("033f")
+        incremental = crc.IncrementalCRCCCITT(data)
+        assert not incremental.is_valid
+        incremental.update(incremental.digest())
+        assert incremental.is_valid
+
+    @pytest.mark.parametrize("length", [0, 1, 7, 8, 9, 31, 32, 33, 128, 2030])
+    def test_slicing_by_8_is_same_as_bytewise(self, length):
+        data = bytes(random.Random(length).getrandbits(8) for _ in range(length))
+        assert crc.crc16_update_slicing_by_8(
+            crc.CRC16_INITIAL_VALUE, data
+        ) == crc.crc16_update_bytewise(crc.CRC16_INITIAL_VALUE, data)
+
+
+class TestHdlcAddressFromBytes:
+    @pytest.mark.parametrize(
+        "address_bytes,logical,physical",
+        [(b"\x21", 16, None), (b"\x02\x23", 1, 17), (b"\x02\x02\x08\x23", 129, 529)],
+    )
+    def test_from_bytes(self, address_bytes, logical, physical):
+        hdlc_address = address.HdlcAddress.from_bytes(address_bytes, "server")
+        assert hdlc_address.logical_address == logical
+        assert hdlc_address.physical_address == physical
+        assert hdlc_address.length == len(address_bytes)
+        assert hdlc_address.to_bytes() == address_bytes
+
+    @pytest.mark.parametrize(
+        "logical,physical",
+        [(1, None), (127, None), (0, 17), (1, 127), (1, 128), (1, 200), (129, 1)]
+        + [(16383, 16383), (128, 0)],
+    )
+    def test_to_bytes_and_back(self, logical, physical):
+        hdlc_address = address.HdlcAddress(logical, physical, "server")
+        parsed = address.HdlcAddress.from_bytes(hdlc_address.to_bytes(), "server")
+        assert parsed == hdlc_address
+
+    def test_split_address_is_always_4_bytes(self):
+        assert address.HdlcAddress(1, 200, "server").to_bytes() == b"\x00\x02\x02\x91"
+
+    def test_frame_with_4_byte_address(self):
+        server = address.HdlcAddress(1, 200, "server")
+        client = address.HdlcAddress(16, None, "client")
+        frame = frames.UnNumberedAcknowledgmentFrame(client, server)
+        parsed = frames.HdlcFrameParser().parse(frame.to_bytes())
+        assert parsed.source_address == server
+        assert parsed.destination_address == client
+
+    def test_long_logical_address_needs_physical_address(self):
+        with pytest.raises(ValueError):
+            address.HdlcAddress(128, None, "server")
+
+    def test_from_bytes_is_interned(self):
+        first = address.HdlcAddress.from_bytes(b"\x02\x23", "server")
+        assert address.HdlcAddress.from_bytes(bytearray(b"\x02\x23"), "server") is first
+        assert address.HdlcAddress.from_bytes(b"\x02\x23", "client") is not first
+
+    def test_address_is_immutable(self):
+        hdlc_address = address.HdlcAddress.from_bytes(b"\x21", "client")
+        with pytest.raises(attr.exceptions.FrozenInstanceError):
+            hdlc_address.address_type = "server"
+
+
+class TestHdlcFrameParser:
+    server_address = address.HdlcAddress(
+        logical_address=1, physical_address=17, address_type="server"
+    )
+    client_address = address.HdlcAddress(
+        logical_address=16, physical_address=None, address_type="client"
+    )
+
+    @pytest.mark.parametrize(
+        "frame_class,kwargs",
+        [
+            (frames.InformationFrame, dict(payload=b"\x01\x02", response_frame=True)),
+            (frames.UnNumberedAcknowledgmentFrame, dict(payload=b"\x81\x80\x00")),
+            (frames.DisconnectModeFrame, dict()),
+            (frames.FrameRejectFrame, dict(payload=b"\x10\x00\x01")),
+            (frames.UnnumberedInformationFrame, dict(payload=b"\xe6\xe7\x00\x0f")),
+            (frames.ReceiveReadyFrame, dict(receive_sequence_number=5)),
+            (frames.ReceiveNotReadyFrame, dict(receive_sequence_number=3)),
+            (frames.RejectFrame, dict(receive_sequence_number=2)),
+        ],
+    )
+    def test_parse_frames_from_server(self, frame_class, kwargs):
+        frame = frame_class(self.client_address, self.server_address, **kwargs)
+        parsed = frames.HdlcFrameParser().parse(frame.to_bytes())
+        assert type(parsed) is frame_class
+        assert parsed == frame
+
+    @pytest.mark.parametrize(
+        "frame_class", [frames.SetNormalResponseModeFrame, frames.DisconnectFrame]
+    )
+    def test_parse_frames_from_client(self, frame_class):
+        frame = frame_class(self.server_address, self.client_address)
+        parsed = frames.HdlcFrameParser().parse(frame.to_bytes())
+        assert type(parsed) is frame_class
+        assert parsed == frame
+
+    def test_parse_segmented_response(self):
+        parser = frames.HdlcFrameParser()
+        first = frames.SegmentedInformationResponseFrame(
+            self.client_address, self.server_address, b"\xe6\xe7\x00\x01"
+        )
+        parsed_first = parser.parse(first.to_bytes())
+        assert type(parsed_first) is frames.SegmentedInformationResponseFrame
+        assert parsed_first == first
+
+        # continuing segments has no LLC header.
+        last = frames.InformationFrame(
+            self.client_address,
+            self.server_address,
+            b"\xe6\xe7\x00\x02",
+            send_sequence_number=1,
+            response_frame=True,
+            first_segment=False,
+        )
+        parsed_last = parser.parse(last.to_bytes(), previous_segment=parsed_first)
+        assert type(parsed_last) is frames.InformationFrame
+        assert parsed_last == last
+        assert parsed_last.payload == b"\xe6\xe7\x00\x02"
+
+    def test_control_field_table_covers_all_values(self):
+        table = frames.CONTROL_FIELD_TABLE
+        assert len(table) == 256
+        assert table[0x10] is frames.InformationFrame
+        assert table[0x93] is table[0x83] is frames.SetNormalResponseModeFrame
+        assert table[0xF1] is frames.ReceiveReadyFrame
+        assert table[0x1F] is frames.DisconnectModeFrame
+
+    def test_unknown_control_field(self):
+        frame = bytearray(
+            frames.DisconnectModeFrame(
+                self.client_address, self.server_address
+            ).to_bytes()
+        )
+        frame[6] = 0x2F  # not a defined U-frame
+        fcs = frames.FCS.calculate_for(frame[1:-3])
+        frame[-3:-1] = fcs
+        with pytest.raises(exceptions.HdlcParsingError):
+            frames.HdlcFrameParser().parse(frame)
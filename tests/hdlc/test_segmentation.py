@@ -0,0 +1,97 @@
+import pytest
+
+from dlms_cosem.protocol.hdlc import address, batch, fields, frames, segmentation
+
+SERVER_ADDRESS = address.HdlcAddress(
+    logical_address=1, physical_address=17, address_type="server"
+)
+CLIENT_ADDRESS = address.HdlcAddress(
+    logical_address=16, physical_address=None, address_type="client"
+)
+
+
+def test_short_payload_is_single_frame():
+    payload = bytes.fromhex(
+        "601DA109060760857405080101BE10040E01000000065F1F0400001E1DFFFF"
+    )
+    segmented = segmentation.segment_information(
+        SERVER_ADDRESS, CLIENT_ADDRESS, payload, 0, 0
+    )
+    assert len(segmented) == 1
+    assert bytes(segmented.buffer) == frames.InformationFrame(
+        SERVER_ADDRESS, CLIENT_ADDRESS, payload
+    ).to_bytes()
+
+
+@pytest.mark.parametrize("payload_length", [125, 126, 300, 2000])
+def test_segments(payload_length):
+    payload = bytes(i % 251 for i in range(payload_length))
+    segmented = segmentation.segment_information(
+        SERVER_ADDRESS, CLIENT_ADDRESS, payload, 6, 3, max_information_length=128
+    )
+    expected_frames = -(-(payload_length + 3) // 128)
+    assert len(segmented) == expected_frames
+
+    valid, _ = batch.verify_many(segmented.buffer)
+    assert len(valid) == expected_frames
+    assert all(valid)
+
+    information = bytearray()
+    for index, frame in enumerate(segmented):
+        frame_format = fields.DlmsHdlcFrameFormatField.from_bytes(frame[1:3])
+        assert frame_format.segmented == (index != expected_frames - 1)
+        control = fields.InformationControlField.from_bytes(frame[6:7])
+        assert control.send_sequence_number == (6 + index) % 8
+        assert control.receive_sequence_number == 3
+        assert control.final
+        information += frame[9:-3]
+        assert len(frame[9:-3]) <= 128
+
+    assert information == frames.LLC_COMMAND_HEADER + payload
+
+
+def test_final_bit_set_on_last_frame_in_window():
+    segmented = segmentation.segment_information(
+        SERVER_ADDRESS,
+        CLIENT_ADDRESS,
+        bytes(1000),
+        0,
+        0,
+        max_information_length=128,
+        window_size=3,
+    )
+    assert segmented.final == [False, False, True, False, False, True, False, True]
+
+
+@pytest.mark.parametrize("max_information_length", [0, 1, 2, 3])
+def test_max_information_length_must_fit_more_than_llc(max_information_length):
+    with pytest.raises(ValueError):
+        segmentation.segment_information(
+            SERVER_ADDRESS,
+            CLIENT_ADDRESS,
+            bytes(10),
+            0,
+            0,
+            max_information_length=max_information_length,
+        )
+
+
+def test_smallest_max_information_length():
+    payload = bytes(range(5))
+    segmented = segmentation.segment_information(
+        SERVER_ADDRESS, CLIENT_ADDRESS, payload, 0, 0, max_information_length=4
+    )
+    assert len(segmented) == 2
+    assert b"".join(frame[9:-3] for frame in segmented) == (
+        frames.LLC_COMMAND_HEADER + payload
+    )
+
+
+def test_segment_reassembler_grows_buffer():
+    reassembler = segmentation.SegmentReassembler(initial_size=4)
+    reassembler.add(b"\x01\x02\x03")
+    reassembler.add(memoryview(b"\x04\x05\x06\x07\x08\x09"))
+    assert len(reassembler) == 9
+    assert reassembler.take() == bytearray(range(1, 10))
+    assert len(reassembler) == 0
+    assert reassembler.take() == bytearray()
@@ -0,0 +1,154 @@
+import pytest
+
+from dlms_cosem.protocol.hdlc import address, exceptions, frames, state
+
+SERVER_ADDRESS = address.HdlcAddress(
+    logical_address=1, physical_address=17, address_type="server"
+)
+CLIENT_ADDRESS = address.HdlcAddress(
+    logical_address=16, physical_address=None, address_type="client"
+)
+
+
+def request(ssn, rsn=0, final=True):
+    return frames.InformationFrame(
+        SERVER_ADDRESS,
+        CLIENT_ADDRESS,
+        b"\x01",
+        send_sequence_number=ssn,
+        receive_sequence_number=rsn,
+        segmented=not final,
+        final=final,
+    )
+
+
+def receive_ready(rsn):
+    return frames.ReceiveReadyFrame(
+        CLIENT_ADDRESS, SERVER_ADDRESS, receive_sequence_number=rsn
+    )
+
+
+@pytest.fixture
+def connected_state():
+    hdlc_state = state.HdlcConnectionState(
+        window_size_transmit=7, window_size_receive=7
+    )
+    hdlc_state.process_frame(
+        frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+    )
+    hdlc_state.process_frame(
+        frames.UnNumberedAcknowledgmentFrame(CLIENT_ADDRESS, SERVER_ADDRESS)
+    )
+    return hdlc_state
+
+
+def test_can_send_counts_unacknowledged_frames(connected_state):
+    assert connected_state.can_send == 7
+    for ssn in range(3):
+        connected_state.process_frame(request(ssn, final=False))
+
+    assert connected_state.can_send == 4
+    assert [
+        frame.send_sequence_number
+        for frame in connected_state.unacknowledged_frames()
+    ] == [0, 1, 2]
+
+
+def test_partial_acknowledgement(connected_state):
+    for ssn in range(6):
+        connected_state.process_frame(request(ssn, final=ssn == 5))
+
+    connected_state.process_frame(receive_ready(4))
+
+    assert connected_state.acknowledged_sequence_number == 4
+    assert [
+        frame.send_sequence_number
+        for frame in connected_state.unacknowledged_frames()
+    ] == [4, 5]
+    assert connected_state.can_send == 5
+
+
+def test_sequence_numbers_wrap_around(connected_state):
+    for ssn in range(6):
+        connected_state.process_frame(request(ssn, final=ssn == 5))
+    connected_state.process_frame(receive_ready(6))
+
+    for ssn in (6, 7, 0, 1):
+        connected_state.process_frame(request(ssn, final=ssn == 1))
+    connected_state.process_frame(receive_ready(2))
+
+    assert connected_state.unacknowledged_count == 0
+    assert connected_state.send_sequence_number == 2
+
+
+def test_acknowledging_unsent_frame_raises(connected_state):
+    connected_state.process_frame(request(0))
+    with pytest.raises(exceptions.LocalProtocolError):
+        connected_state.process_frame(receive_ready(2))
+
+
+def test_frame_outside_send_window_raises(connected_state):
+    connected_state.window_size_transmit = 2
+    connected_state.process_frame(request(0, final=False))
+    with pytest.raises(exceptions.LocalProtocolError):
+        connected_state.process_frame(request(1, final=False))
+
+
+def test_wrong_send_sequence_number_raises(connected_state):
+    with pytest.raises(exceptions.LocalProtocolError):
+        connected_state.process_frame(request(1))
+
+
+def test_snrm_resets_sequence_numbers(connected_state):
+    connected_state.process_frame(request(0))
+    connected_state.current_state = state.NOT_CONNECTED
+    connected_state.process_frame(
+        frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+    )
+    assert connected_state.send_sequence_number == 0
+    assert connected_state.unacknowledged_count == 0
+
+
+def test_sent_information_is_returned_for_resending(connected_state):
+    connected_state.process_sent_information(0, False, "first")
+    connected_state.process_sent_information(1, True, "second")
+    assert connected_state.current_state == state.AWAITING_RESPONSE
+
+    connected_state.process_frame(receive_ready(1))
+
+    assert connected_state.take_unacknowledged() == ["second"]
+    assert connected_state.send_sequence_number == 1
+
+
+def test_poll_starts_a_new_receive_window(connected_state):
+    connected_state.window_size_receive = 2
+    connected_state.process_frame(request(0))
+    response = frames.InformationFrame(
+        CLIENT_ADDRESS,
+        SERVER_ADDRESS,
+        b"\x01",
+        send_sequence_number=0,
+        receive_sequence_number=1,
+        segmented=True,
+        final=False,
+        response_frame=True,
+    )
+    connected_state.process_frame(response)
+
+    connected_state.process_sent_poll(
+        frames.ReceiveReadyFrame(
+            SERVER_ADDRESS, CLIENT_ADDRESS, receive_sequence_number=1
+        )
+    )
+
+    assert connected_state.current_state == state.AWAITING_RESPONSE
+    assert connected_state.received_in_window == 0
+
+
+def test_poll_when_not_awaiting_response_raises(connected_state):
+    with pytest.raises(exceptions.LocalProtocolError):
+        connected_state.process_sent_poll(
+            frames.ReceiveReadyFrame(
+                SERVER_ADDRESS, CLIENT_ADDRESS, receive_sequence_number=0
+            )
+        )
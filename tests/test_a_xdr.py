@@ -0,0 +1,433 @@
+import attr
+import pytest
+
+from dlms_cosem.protocol import a_xdr, dlms_data
+
+
+@pytest.mark.parametrize(
+    "in_bytes, value",
+    [
+        (b"\x02", 2),
+        (b"\x7f", 127),
+        (b"\x81\x80", 128),
+        (b"\x82\x0f\xff", 4095),
+        (b"\x82\xff\xff", 65535),
+    ],
+)
+def test_decode_variable_integer(in_bytes, value):
+    assert a_xdr.decode_variable_integer(in_bytes + b"\xaa") == (value, b"\xaa")
+
+
+def test_decode_variable_integer_at_offset():
+    view = memoryview(b"\x00\x00\x82\x01\x00\x05")
+    assert a_xdr.decode_variable_integer_at(view, 2) == (256, 5)
+
+
+def test_truncated_variable_integer_raises_value_error():
+    with pytest.raises(ValueError):
+        a_xdr.decode_variable_integer(b"\x82\x01")
+
+
+ATTRIBUTES_CONF = a_xdr.EncodingConf(
+    [
+        a_xdr.AttributeEncoding(
+            attribute_name="optional",
+            instance_class=dlms_data.OctetStringData,
+            optional=True,
+        ),
+        a_xdr.AttributeEncoding(
+            attribute_name="fixed",
+            instance_class=dlms_data.DoubleLongUnsignedData,
+            return_value=True,
+            length=4,
+        ),
+        a_xdr.AttributeEncoding(
+            attribute_name="variable",
+            instance_class=dlms_data.OctetStringData,
+            return_value=True,
+        ),
+        a_xdr.AttributeEncoding(
+            attribute_name="rest",
+            instance_class=dlms_data.OctetStringData,
+            return_value=True,
+            wrap_end=True,
+        ),
+    ]
+)
+
+
+class TestDecodeAttributes:
+    def test_decode(self):
+        decoded = a_xdr.AXdrDecoder(ATTRIBUTES_CONF).decode(
+            b"\x01\x02ab" + b"\x00\x00\x01\x00" + b"\x03xyz" + b"end"
+        )
+        assert decoded["optional"].value == b"ab"
+        assert decoded["fixed"] == 256
+        assert decoded["variable"] == b"xyz"
+        assert decoded["rest"] == b"end"
+
+    def test_omitted_optional(self):
+        decoded = a_xdr.AXdrDecoder(ATTRIBUTES_CONF).decode(
+            b"\x00" + b"\x00\x00\x00\x01" + b"\x00"
+        )
+        assert decoded["optional"] is None
+        assert decoded["variable"] == b""
+        assert decoded["rest"] == b""
+
+    def test_long_variable_length(self):
+        value = bytes(range(256)) * 2
+        decoded = a_xdr.AXdrDecoder(ATTRIBUTES_CONF).decode(
+            b"\x00" + b"\x00\x00\x00\x01" + b"\x82\x02\x00" + value
+        )
+        assert decoded["variable"] == value
+
+    def test_decode_at_returns_offset(self):
+        decoder = a_xdr.AXdrDecoder(
+            a_xdr.EncodingConf(
+                [
+                    a_xdr.AttributeEncoding(
+                        attribute_name="value",
+                        instance_class=dlms_data.OctetStringData,
+                        return_value=True,
+                    )
+                ]
+            )
+        )
+        view = memoryview(b"\xff\x02ab\xff")
+        assert decoder.decode_at(view, 1) == ({"value": b"ab"}, 4)
+
+    @pytest.mark.parametrize(
+        "in_bytes", [b"", b"\x01\x05ab", b"\x00\x00\x00", b"\x00\x00\x00\x00\x01\x03x"]
+    )
+    def test_truncated_data_raises_value_error(self, in_bytes):
+        with pytest.raises(ValueError):
+            a_xdr.AXdrDecoder(ATTRIBUTES_CONF).decode(in_bytes)
+
+
+SEQUENCE_CONF = a_xdr.EncodingConf([a_xdr.SequenceEncoding(attribute_name="data")])
+
+
+class TestDecodeSequence:
+    def test_decode(self):
+        decoded = a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(
+            b"\x09\x03abc" + b"\x06\x00\x00\x00\x01" + b"\x12\x00\x02"
+        )["data"]
+        assert [type(data) for data in decoded] == [
+            dlms_data.OctetStringData,
+            dlms_data.DoubleLongUnsignedData,
+            dlms_data.UnsignedLongData,
+        ]
+        assert decoded[0].value == b"abc"
+        assert decoded[0].length == 3
+        assert decoded[1].value == b"\x00\x00\x00\x01"
+
+    def test_large_sequence(self):
+        element = b"\x09\x82\x01\x00" + bytes(256)
+        decoded = a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(element * 10000)["data"]
+        assert len(decoded) == 10000
+        assert all(data.length == 256 for data in decoded)
+
+    def test_truncated_data_raises_value_error(self):
+        with pytest.raises(ValueError):
+            a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(b"\x09\x03abc\x06\x00\x00")
+
+
+@pytest.mark.parametrize("value", [0, 2, 127, 128, 4095, 65535, 2 ** 40])
+def test_encode_variable_integer(value):
+    encoded = a_xdr.encode_variable_integer(value)
+    assert a_xdr.decode_variable_integer(encoded) == (value, b"")
+
+
+def test_encode_negative_variable_integer_raises_value_error():
+    with pytest.raises(ValueError):
+        a_xdr.encode_variable_integer(-1)
+
+
+class TestEncodeAttributes:
+    def test_encode(self):
+        encoded = a_xdr.AXdrEncoder(ATTRIBUTES_CONF).encode(
+            {
+                "optional": dlms_data.OctetStringData(b"ab"),
+                "fixed": 256,
+                "variable": b"xyz",
+                "rest": b"end",
+            }
+        )
+        assert isinstance(encoded, memoryview)
+        assert encoded == b"\x01\x02ab" + b"\x00\x00\x01\x00" + b"\x03xyz" + b"end"
+
+    def test_omitted_optional(self):
+        encoded = a_xdr.AXdrEncoder(ATTRIBUTES_CONF).encode(
+            {"optional": None, "fixed": 1, "variable": b"", "rest": b""}
+        )
+        assert encoded == b"\x00" + b"\x00\x00\x00\x01" + b"\x00"
+
+    def test_round_trip(self):
+        in_dict = {
+            "optional": None,
+            "fixed": 2 ** 32 - 1,
+            "variable": bytes(range(256)) * 2,
+            "rest": b"end",
+        }
+        encoded = a_xdr.AXdrEncoder(ATTRIBUTES_CONF).encode(in_dict)
+        assert a_xdr.AXdrDecoder(ATTRIBUTES_CONF).decode(encoded) == in_dict
+
+    def test_encodes_attributes_of_object(self):
+        class Value:
+            value = b"ab"
+
+        conf = a_xdr.EncodingConf(
+            [
+                a_xdr.AttributeEncoding(
+                    attribute_name="value",
+                    instance_class=dlms_data.OctetStringData,
+                    return_value=True,
+                )
+            ]
+        )
+        assert a_xdr.AXdrEncoder(conf).encode(Value()) == b"\x02ab"
+
+    def test_wrong_fixed_length_raises_value_error(self):
+        conf = a_xdr.EncodingConf(
+            [
+                a_xdr.AttributeEncoding(
+                    attribute_name="value",
+                    instance_class=dlms_data.OctetStringData,
+                    return_value=True,
+                    length=4,
+                )
+            ]
+        )
+        with pytest.raises(ValueError):
+            a_xdr.AXdrEncoder(conf).encode({"value": b"abc"})
+
+
+class TestEncodeSequence:
+    def test_encode(self):
+        encoded = a_xdr.AXdrEncoder(SEQUENCE_CONF).encode(
+            {
+                "data": [
+                    dlms_data.OctetStringData(b"abc"),
+                    dlms_data.DoubleLongUnsignedData(1),
+                    dlms_data.LongData(-2),
+                    dlms_data.BooleanData(True),
+                ]
+            }
+        )
+        assert encoded == (
+            b"\x09\x03abc" + b"\x06\x00\x00\x00\x01" + b"\x10\xff\xfe" + b"\x03\x01"
+        )
+
+    def test_round_trip_of_decoded_data(self):
+        in_bytes = b"\x09\x03abc" + b"\x06\x00\x00\x00\x01" + b"\x12\x00\x02"
+        decoded = a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(in_bytes)
+        assert a_xdr.AXdrEncoder(SEQUENCE_CONF).encode(decoded) == in_bytes
+
+    @pytest.mark.parametrize(
+        "data, encoded",
+        [
+            (dlms_data.Float32Data(1.5), b"\x17\x3f\xc0\x00\x00"),
+            (dlms_data.Float64Data(-2.0), b"\x18\xc0" + bytes(7)),
+            (dlms_data.VisibleStringData("abc"), b"\x0a\x03abc"),
+            (dlms_data.UTF8StringData("\u00e5"), b"\x0c\x02\xc3\xa5"),
+            (dlms_data.DateTimeData(bytes(range(12))), b"\x19" + bytes(range(12))),
+            (dlms_data.DateData(bytes(range(5))), b"\x1a" + bytes(range(5))),
+            (dlms_data.TimeData(bytes(range(4))), b"\x1b" + bytes(range(4))),
+            (dlms_data.BitStringData(b"\xa0\x80"), b"\x04\x10\xa0\x80"),
+        ],
+    )
+    def test_encode_data_types(self, data, encoded):
+        assert a_xdr.AXdrEncoder(SEQUENCE_CONF).encode({"data": [data]}) == encoded
+        (decoded,) = a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(encoded)["data"]
+        assert type(decoded).from_bytes(decoded.value).value == data.value
+
+    def test_bit_string_length_is_in_bits(self):
+        in_bytes = b"\x04\x0c\xab\xc0" + b"\x11\x01"
+        bits, unsigned = a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(in_bytes)["data"]
+        assert bits.value == b"\xab\xc0"
+        assert bits.length == 12
+        assert unsigned.value == b"\x01"
+        assert (
+            a_xdr.AXdrEncoder(SEQUENCE_CONF).encode({"data": [bits, unsigned]})
+            == in_bytes
+        )
+
+    def test_wrong_fixed_length_raises_value_error(self):
+        with pytest.raises(ValueError):
+            a_xdr.AXdrEncoder(SEQUENCE_CONF).encode(
+                {"data": [dlms_data.DoubleLongUnsignedData(b"\x00\x01")]}
+            )
+
+
+class TestDlmsDataToPythonConverter:
+    def test_to_dlms(self):
+        converter = a_xdr.DlmsDataToPythonConverter(
+            [dlms_data.OctetStringData(b""), dlms_data.UnsignedLongData(0)]
+        )
+        data = converter.to_dlms([b"abc", 7])
+        assert [type(item) for item in data] == [
+            dlms_data.OctetStringData,
+            dlms_data.UnsignedLongData,
+        ]
+        assert [item.to_bytes() for item in data] == [b"abc", b"\x00\x07"]
+
+    def test_wrong_number_of_values_raises_value_error(self):
+        converter = a_xdr.DlmsDataToPythonConverter([dlms_data.OctetStringData(b"")])
+        with pytest.raises(ValueError):
+            converter.to_dlms([b"a", b"b"])
+
+
+def profile_buffer(rows):
+    row = (
+        b"\x02\x03"
+        + b"\x09\x0c"
+        + bytes(12)
+        + b"\x06\x00\x00\x00\x2a"
+        + b"\x12\x00\x01"
+    )
+    return b"\x01" + a_xdr.encode_variable_integer(rows) + row * rows
+
+
+class TestDecodeNestedData:
+    def test_array_of_structures(self):
+        (buffer,) = a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(profile_buffer(2))["data"]
+        assert isinstance(buffer, dlms_data.DataArray)
+        assert buffer.length == 2
+        for row in buffer.value:
+            assert isinstance(row, dlms_data.DataStructure)
+            assert [type(data) for data in row.value] == [
+                dlms_data.OctetStringData,
+                dlms_data.DoubleLongUnsignedData,
+                dlms_data.UnsignedLongData,
+            ]
+            assert row.value[1].value == b"\x00\x00\x00\x2a"
+
+    def test_data_after_container(self):
+        decoded = a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(
+            b"\x01\x00" + b"\x02\x01\x01\x01\x11\x05" + b"\x11\x07"
+        )["data"]
+        assert [type(data) for data in decoded] == [
+            dlms_data.DataArray,
+            dlms_data.DataStructure,
+            dlms_data.UnsignedIntegerData,
+        ]
+        assert decoded[0].value == []
+        assert decoded[1].value[0].value[0].value == b"\x05"
+        assert decoded[2].value == b"\x07"
+
+    def test_large_profile_buffer(self):
+        (buffer,) = a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(profile_buffer(20000))[
+            "data"
+        ]
+        assert len(buffer.value) == 20000
+
+    def test_deep_nesting_does_not_recurse(self):
+        depth = 5000
+        in_bytes = b"\x02\x01" * depth + b"\x11\x05"
+        decoder = a_xdr.AXdrDecoder(SEQUENCE_CONF, max_depth=depth)
+        (data,) = decoder.decode(in_bytes)["data"]
+        for _ in range(depth):
+            (data,) = data.value
+        assert data.value == b"\x05"
+
+    def test_max_depth(self):
+        decoder = a_xdr.AXdrDecoder(SEQUENCE_CONF, max_depth=2)
+        decoder.decode(b"\x02\x01\x02\x01\x11\x05")
+        with pytest.raises(ValueError):
+            decoder.decode(b"\x02\x01\x02\x01\x02\x01\x11\x05")
+
+    def test_max_elements(self):
+        decoder = a_xdr.AXdrDecoder(SEQUENCE_CONF, max_elements=10)
+        with pytest.raises(ValueError):
+            decoder.decode(profile_buffer(3))
+
+    def test_more_elements_than_data_raises_value_error(self):
+        with pytest.raises(ValueError):
+            a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(b"\x01\x84\x7f\xff\xff\xff\x11")
+
+    def test_truncated_container_raises_value_error(self):
+        with pytest.raises(ValueError):
+            a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(b"\x01\x03\x11\x01\x11\x02")
+
+    def test_round_trip(self):
+        in_bytes = profile_buffer(3) + b"\x01\x00" + b"\x11\x07"
+        decoded = a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(in_bytes)
+        assert a_xdr.AXdrEncoder(SEQUENCE_CONF).encode(decoded) == in_bytes
+
+
+@attr.s(auto_attribs=True)
+class Attributes:
+    ENCODING_CONF = ATTRIBUTES_CONF
+
+    optional: dlms_data.OctetStringData
+    fixed: int
+    variable: bytes
+    rest: bytes
+
+
+class TestCompiledDecoder:
+    @pytest.mark.parametrize(
+        "in_bytes",
+        [
+            b"\x01\x02ab" + b"\x00\x00\x01\x00" + b"\x03xyz" + b"end",
+            b"\x00" + b"\x00\x00\x00\x01" + b"\x82\x02\x00" + bytes(512),
+        ],
+    )
+    def test_same_as_decoder(self, in_bytes):
+        decoded = a_xdr.compile_decoder(ATTRIBUTES_CONF, dict)(in_bytes)
+        expected = a_xdr.AXdrDecoder(ATTRIBUTES_CONF).decode(in_bytes)
+        assert decoded.keys() == expected.keys()
+        assert decoded["optional"] is None or (
+            decoded["optional"].value == expected["optional"].value
+        )
+        assert decoded["fixed"] == expected["fixed"]
+        assert decoded["variable"] == expected["variable"]
+        assert decoded["rest"] == expected["rest"]
+
+    def test_constructs_target(self):
+        decoded = a_xdr.compiled_decoder(Attributes)(
+            b"\x00" + b"\x00\x00\x00\x01" + b"\x03xyz" + b"end"
+        )
+        assert decoded == Attributes(None, 1, b"xyz", b"end")
+
+    def test_default(self):
+        conf = a_xdr.EncodingConf(
+            [
+                a_xdr.AttributeEncoding(
+                    attribute_name="value",
+                    instance_class=dlms_data.UnsignedIntegerData,
+                    return_value=True,
+                    length=1,
+                    default=5,
+                )
+            ]
+        )
+        decode = a_xdr.compile_decoder(conf, dict)
+        assert decode(b"\x00") == {"value": 5}
+        assert decode(b"\x01\x07") == {"value": 7}
+
+    def test_sequence_and_from_decoded(self):
+        class Body:
+            ENCODING_CONF = SEQUENCE_CONF
+
+            def __init__(self, values):
+                self.values = values
+
+            @classmethod
+            def from_decoded(cls, data):
+                return cls([item.value for item in data])
+
+        body = a_xdr.compiled_decoder(Body)(b"\x11\x01" + b"\x09\x02ab")
+        assert body.values == [b"\x01", b"ab"]
+
+    def test_compiled_once_per_class(self):
+        assert a_xdr.compiled_decoder(Attributes) is a_xdr.compiled_decoder(
+            Attributes
+        )
+
+    @pytest.mark.parametrize(
+        "in_bytes", [b"", b"\x01\x05ab", b"\x00\x00\x00", b"\x00\x00\x00\x00\x01\x03x"]
+    )
+    def test_truncated_data_raises_value_error(self, in_bytes):
+        with pytest.raises(ValueError):
+            a_xdr.compiled_decoder(Attributes)(in_bytes)
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import socket
+import tty
+
+import pytest
+
+from dlms_cosem.clients import async_hdlc
+from dlms_cosem.protocol.hdlc import address, batch, exceptions, frames, state
+
+CLIENT_ADDRESS = address.HdlcAddress(16, None, "client")
+SERVER_ADDRESS = address.HdlcAddress(1, 17, "server")
+
+UA = frames.UnNumberedAcknowledgmentFrame(CLIENT_ADDRESS, SERVER_ADDRESS).to_bytes()
+RESPONSE = frames.InformationFrame(
+    CLIENT_ADDRESS,
+    SERVER_ADDRESS,
+    b"\xc4\x01\xc1\x00",
+    send_sequence_number=0,
+    receive_sequence_number=1,
+    response_frame=True,
+).to_bytes()
+DISCONNECT_UA = frames.UnNumberedAcknowledgmentFrame(
+    CLIENT_ADDRESS, SERVER_ADDRESS
+).to_bytes()
+
+CLIENT_KWARGS = dict(
+    client_logical_address=16, server_logical_address=1, server_physical_address=17
+)
+
+
+async def fake_meter(reader, writer, responses):
+    """Answers each received frame with the next response."""
+    buffer = bytearray()
+    for response in responses:
+        while not batch.split_frames(buffer):
+            buffer += await reader.read(1024)
+        del buffer[:]
+        writer.write(response)
+        await writer.drain()
+
+
+async def open_socketpair_client(**kwargs):
+    client_socket, meter_socket = socket.socketpair()
+    reader, writer = await asyncio.open_connection(sock=client_socket)
+    client = async_hdlc.AsyncHdlcClient(
+        async_hdlc.make_hdlc_connection(**CLIENT_KWARGS), reader, writer, **kwargs
+    )
+    meter = await asyncio.open_connection(sock=meter_socket)
+    return client, meter
+
+
+def test_session_over_socketpair():
+    async def session():
+        client, (meter_reader, meter_writer) = await open_socketpair_client()
+        meter = asyncio.ensure_future(
+            fake_meter(meter_reader, meter_writer, [UA, RESPONSE, DISCONNECT_UA])
+        )
+        async with client:
+            response = await client.send(b"\xc0\x01\xc1\x00")
+        await meter
+        meter_writer.close()
+        return response, client.hdlc_connection.state.current_state
+
+    response, current_state = asyncio.run(session())
+    assert response == b"\xc4\x01\xc1\x00"
+    assert current_state == state.NOT_CONNECTED
+
+
+def test_many_concurrent_sessions():
+    async def session():
+        client, (meter_reader, meter_writer) = await open_socketpair_client()
+        meter = asyncio.ensure_future(
+            fake_meter(meter_reader, meter_writer, [UA, RESPONSE])
+        )
+        await client.connect()
+        response = await client.send(b"\xc0\x01\xc1\x00")
+        await meter
+        await client.close()
+        meter_writer.close()
+        return response
+
+    async def sessions():
+        return await asyncio.gather(*(session() for _ in range(100)))
+
+    assert asyncio.run(sessions()) == [b"\xc4\x01\xc1\x00"] * 100
+
+
+def test_timeout_when_meter_is_silent():
+    async def session():
+        client, (meter_reader, meter_writer) = await open_socketpair_client(
+            timeout=0.05
+        )
+        with pytest.raises(exceptions.TransmissionFailed):
+            await client.connect()
+        await client.close()
+        received = await meter_reader.read()
+        meter_writer.close()
+        return received
+
+    received = asyncio.run(session())
+    # Sent once and then again for each retry.
+    assert len(batch.split_frames(received)) == 4
+
+
+def test_snrm_is_sent_again_on_timeout():
+    async def session():
+        client, (meter_reader, meter_writer) = await open_socketpair_client(
+            timeout=0.05
+        )
+        # The first SNRM is lost, the meter answers the second.
+        meter = asyncio.ensure_future(
+            fake_meter(meter_reader, meter_writer, [b"", UA])
+        )
+        ua_response = await client.connect()
+        await meter
+        await client.close()
+        meter_writer.close()
+        return ua_response
+
+    assert isinstance(asyncio.run(session()), frames.UnNumberedAcknowledgmentFrame)
+
+
+def test_session_over_pty():
+    meter_fd, client_fd = os.openpty()
+    tty.setraw(client_fd)
+    tty.setraw(meter_fd)
+
+    async def session():
+        client = await async_hdlc.AsyncHdlcClient.open_fd(client_fd, **CLIENT_KWARGS)
+        meter = await async_hdlc.AsyncHdlcClient.open_fd(meter_fd, **CLIENT_KWARGS)
+        meter_task = asyncio.ensure_future(
+            fake_meter(meter.reader, meter.writer, [UA, RESPONSE])
+        )
+        await client.connect()
+        response = await client.send(b"\xc0\x01\xc1\x00")
+        await meter_task
+        await client.close()
+        await meter.close()
+        return response
+
+    assert asyncio.run(session()) == b"\xc4\x01\xc1\x00"
+
+
+def test_pipe_writer_drain_waits_until_writing_is_resumed():
+    async def drain_while_paused():
+        writer = async_hdlc._PipeWriter()
+        writer.pause_writing()
+        drain = asyncio.ensure_future(writer.drain())
+        await asyncio.sleep(0)
+        assert not drain.done()
+        writer.resume_writing()
+        await drain
+
+    asyncio.run(drain_while_paused())
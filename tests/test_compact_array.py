@@ -0,0 +1,141 @@
+import array
+
+import pytest
+
+from dlms_cosem.protocol import a_xdr, compact_array, dlms_data
+
+SEQUENCE_CONF = a_xdr.EncodingConf([a_xdr.SequenceEncoding(attribute_name="data")])
+
+# Structure of double-long-unsigned, long and an array of 2 unsigned.
+ROW_DESCRIPTION = b"\x02\x03" + b"\x06" + b"\x10" + b"\x01\x00\x02\x11"
+ROWS = [(1, -1, 2, 3), (70000, 300, 4, 5)]
+ROW_CONTENTS = b"\x00\x00\x00\x01\xff\xff\x02\x03" + b"\x00\x01\x11\x70\x01\x2c\x04\x05"
+
+
+def skip_without_numpy(use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+
+
+def test_parse_type_description():
+    view = memoryview(ROW_DESCRIPTION + b"\xff")
+    description, offset = compact_array.parse_type_description(view, 0)
+    assert description == compact_array.StructureType(
+        (
+            compact_array.SimpleType(6),
+            compact_array.SimpleType(16),
+            compact_array.ArrayType(2, compact_array.SimpleType(17)),
+        )
+    )
+    assert offset == len(ROW_DESCRIPTION)
+
+
+def test_parse_too_deep_type_description_raises_value_error():
+    with pytest.raises(ValueError):
+        compact_array.parse_type_description(
+            memoryview(b"\x01\x00\x01" * 3 + b"\x11"), 0, max_depth=2
+        )
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_decode_simple_type(use_numpy):
+    skip_without_numpy(use_numpy)
+    values = compact_array.decode_contents(
+        compact_array.SimpleType(18), b"\x00\x01\x01\x00\xff\xff", use_numpy=use_numpy
+    )
+    assert list(values) == [1, 256, 65535]
+    if not use_numpy:
+        assert isinstance(values, array.array)
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_decode_date_time(use_numpy):
+    skip_without_numpy(use_numpy)
+    date_time = b"\x07\xe4\x01\x01\x03\x00\x00\x00\x00\x00\x00\x00"
+    (value,) = compact_array.decode_contents(
+        compact_array.SimpleType(25), date_time, use_numpy=use_numpy
+    )
+    assert bytes(value) == date_time
+
+
+def test_decode_structure_with_numpy():
+    np = pytest.importorskip("numpy")
+    description, _ = compact_array.parse_type_description(
+        memoryview(ROW_DESCRIPTION), 0
+    )
+    rows = compact_array.decode_contents(description, ROW_CONTENTS, use_numpy=True)
+    assert isinstance(rows, np.ndarray)
+    assert rows.dtype.names == ("f0", "f1", "f2")
+    assert rows["f0"].tolist() == [1, 70000]
+    assert rows["f1"].tolist() == [-1, 300]
+    assert rows["f2"].tolist() == [[2, 3], [4, 5]]
+
+
+def test_decode_structure_without_numpy():
+    description, _ = compact_array.parse_type_description(
+        memoryview(ROW_DESCRIPTION), 0
+    )
+    rows = compact_array.decode_contents(description, ROW_CONTENTS, use_numpy=False)
+    assert rows == ROWS
+
+
+def test_type_description_is_compiled_once():
+    description = compact_array.StructureType(
+        (compact_array.SimpleType(6), compact_array.SimpleType(5))
+    )
+    compact_array.compile_struct_format.cache_clear()
+    for _ in range(3):
+        compact_array.decode_contents(description, bytes(16), use_numpy=False)
+    assert compact_array.compile_struct_format.cache_info().misses == 3
+    assert compact_array.compile_struct_format.cache_info().hits == 2
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_partial_element_raises_value_error(use_numpy):
+    skip_without_numpy(use_numpy)
+    with pytest.raises(ValueError):
+        compact_array.decode_contents(
+            compact_array.SimpleType(6), bytes(6), use_numpy=use_numpy
+        )
+
+
+def test_variable_length_type_is_unsupported():
+    with pytest.raises(compact_array.UnsupportedTypeDescription):
+        compact_array.decode_contents(
+            compact_array.SimpleType(9), b"\x01a", use_numpy=False
+        )
+
+
+class TestAXdrDecoder:
+    def in_bytes(self):
+        return (
+            b"\x13"
+            + ROW_DESCRIPTION
+            + bytes((len(ROW_CONTENTS),))
+            + ROW_CONTENTS
+            + b"\x11\x07"
+        )
+
+    @pytest.mark.parametrize("use_numpy", [False, True])
+    def test_decode(self, use_numpy):
+        skip_without_numpy(use_numpy)
+        decoder = a_xdr.AXdrDecoder(SEQUENCE_CONF, use_numpy=use_numpy)
+        compact, unsigned = decoder.decode(self.in_bytes())["data"]
+        assert isinstance(compact, dlms_data.CompactArrayData)
+        assert compact.length == 2
+        assert compact.type_description == ROW_DESCRIPTION
+        assert compact.data == ROW_CONTENTS
+        assert unsigned.value == b"\x07"
+
+    def test_variable_length_type_is_left_encoded(self):
+        in_bytes = b"\x13\x09\x04\x01a\x01b"
+        (compact,) = a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(in_bytes)["data"]
+        assert compact.value == b"\x01a\x01b"
+
+    def test_round_trip(self):
+        decoded = a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(self.in_bytes())
+        assert a_xdr.AXdrEncoder(SEQUENCE_CONF).encode(decoded) == self.in_bytes()
+
+    def test_truncated_contents_raises_value_error(self):
+        with pytest.raises(ValueError):
+            a_xdr.AXdrDecoder(SEQUENCE_CONF).decode(self.in_bytes()[:-4])
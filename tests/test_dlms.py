@@ -0,0 +1,21 @@
+from dlms_cosem.protocol import dlms
+
+DATA_NOTIFICATION = b'\x0f\x00\x00\x01\xdb\x00\t"\x12Z\x85\x916\x00\x00\x00\x00I\x00\x00\x00\x11\x00\x00\x00\nZ\x85\x13\xd0\x14\x80\x00\x00\x00\r\x00\x00\x00\n\x01\x00'
+
+
+def test_data_notification_apdu_round_trip():
+    apdu = dlms.apdu_factory.apdu_from_bytes(DATA_NOTIFICATION)
+
+    assert isinstance(apdu, dlms.DataNotificationApdu)
+    assert apdu.long_invoke_id_and_priority.reserved == 0b1011
+    assert apdu.to_bytes() == DATA_NOTIFICATION
+
+
+def test_data_notification_apdu_with_date_time_round_trip():
+    date_time = b"\x07\xe4\x01\x01\x03\x0c\x00\x00\x00\x00\x00\x00"
+    in_bytes = b"\x0f\x00\x00\x01\xdb\x01" + date_time + b"\x09\x02ab"
+
+    apdu = dlms.apdu_factory.apdu_from_bytes(in_bytes)
+
+    assert apdu.date_time.value == date_time
+    assert apdu.to_bytes() == in_bytes
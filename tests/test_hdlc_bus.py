@@ -0,0 +1,137 @@
+import collections
+
+import pytest
+
+from dlms_cosem.clients import hdlc_bus
+from dlms_cosem.protocol.hdlc import address, exceptions, frames, state
+
+CLIENT_ADDRESS = address.HdlcAddress(16, None, "client")
+
+
+def meter_address(physical_address):
+    return address.HdlcAddress(1, physical_address, "server")
+
+
+class FakeBusSerial:
+    """
+    Answers each written frame with the next scripted response of the meter it was
+    addressed to.
+    """
+
+    def __init__(self, responses):
+        self.responses = {
+            physical_address: collections.deque(meter_responses)
+            for physical_address, meter_responses in responses.items()
+        }
+        self.written = list()
+        self.to_read = bytearray()
+        self.baudrate = 9600
+        self.timeout = 1
+
+    def write(self, data):
+        (_, physical_address, _), _ = address.HdlcAddress.find_address_in_frame_bytes(
+            data
+        )
+        self.written.append(physical_address)
+        meter_responses = self.responses[physical_address]
+        if meter_responses:
+            self.to_read += meter_responses.popleft()
+
+    @property
+    def in_waiting(self):
+        return len(self.to_read)
+
+    def read(self, size):
+        data = bytes(self.to_read[:size])
+        del self.to_read[:size]
+        return data
+
+
+def ua(physical_address):
+    return frames.UnNumberedAcknowledgmentFrame(
+        CLIENT_ADDRESS, meter_address(physical_address)
+    ).to_bytes()
+
+
+def response(physical_address, payload):
+    return frames.InformationFrame(
+        CLIENT_ADDRESS,
+        meter_address(physical_address),
+        payload,
+        send_sequence_number=0,
+        receive_sequence_number=1,
+        response_frame=True,
+    ).to_bytes()
+
+
+def make_bus(responses, priorities=None):
+    priorities = priorities or dict()
+    bus = hdlc_bus.SerialHdlcBus(serial_port="fake", serial=FakeBusSerial(responses))
+    for physical_address in responses:
+        bus.add_meter(physical_address, priority=priorities.get(physical_address, 0))
+    return bus
+
+
+def test_exchanges_are_interleaved_round_robin():
+    bus = make_bus(
+        {
+            17: [ua(17), response(17, b"\x01")],
+            18: [ua(18), response(18, b"\x02")],
+        }
+    )
+    connected = [bus.connect(17), bus.connect(18)]
+    responses = [bus.send(17, b"\xc0"), bus.send(18, b"\xc0")]
+
+    bus.run()
+
+    assert bus._serial.written == [17, 18, 17, 18]
+    assert all(
+        isinstance(future.result(), frames.UnNumberedAcknowledgmentFrame)
+        for future in connected
+    )
+    assert [future.result() for future in responses] == [b"\x01", b"\x02"]
+    assert all(type(future.result()) is bytes for future in responses)
+    for meter in bus.meters.values():
+        assert meter.hdlc_connection.state.current_state == state.IDLE
+
+
+def test_lower_priority_value_is_served_first():
+    bus = make_bus(
+        {17: [ua(17), response(17, b"\x01")], 18: [ua(18)]}, priorities={18: 1}
+    )
+    bus.connect(18)
+    bus.connect(17)
+    bus.send(17, b"\xc0")
+
+    bus.run()
+
+    assert bus._serial.written == [17, 17, 18]
+
+
+def test_silent_meter_does_not_stop_the_bus():
+    bus = make_bus({17: [], 18: [ua(18)]})
+    silent = bus.connect(17)
+    connected = bus.connect(18)
+
+    bus.run()
+
+    with pytest.raises(exceptions.TransmissionFailed):
+        silent.result()
+    assert isinstance(connected.result(), frames.UnNumberedAcknowledgmentFrame)
+
+
+def test_late_answer_from_another_meter_is_discarded():
+    bus = make_bus({17: [ua(17)], 18: [ua(17)]})
+    connected = bus.connect(18)
+
+    bus.run()
+
+    with pytest.raises(exceptions.TransmissionFailed):
+        connected.result()
+    assert bus.meters[18].hdlc_connection.state.current_state == state.NOT_CONNECTED
+
+
+def test_unknown_meter_raises():
+    bus = make_bus({17: []})
+    with pytest.raises(hdlc_bus.BusError):
+        bus.send(18, b"\xc0")
@@ -0,0 +1,177 @@
+import pytest
+import serial
+
+from dlms_cosem.clients import optical
+from dlms_cosem.clients.serial_hdlc import SerialHdlcClient
+from dlms_cosem.protocol import iec62056_21
+from dlms_cosem.protocol.hdlc import address, exceptions, frames, state
+
+IDENTIFICATION = b"/LGZ6\\2ZMD3104407.B32\r\n"
+
+
+class FakeOpticalPort:
+    """
+    Meter on an optical port. Answers the sign-on at 300 baud and HDLC frames at
+    baud rates up to `working_baud_rate`.
+    """
+
+    def __init__(self, identification=IDENTIFICATION, working_baud_rate=19200):
+        self.identification = identification
+        self.working_baud_rate = working_baud_rate
+        self.baudrate = 9600
+        self.bytesize = serial.EIGHTBITS
+        self.parity = serial.PARITY_NONE
+        self.stopbits = serial.STOPBITS_ONE
+        self.timeout = None
+        self.to_read = bytearray()
+        self.written = list()
+
+    def reset_input_buffer(self):
+        self.to_read.clear()
+
+    def flush(self):
+        pass
+
+    def write(self, data):
+        data = bytes(data)
+        self.written.append((self.baudrate, data))
+        if data.startswith(b"/?"):
+            assert (self.baudrate, self.bytesize, self.parity) == (
+                300,
+                serial.SEVENBITS,
+                serial.PARITY_EVEN,
+            )
+            self.to_read += self.identification
+        elif data.startswith(frames.HDLC_FLAG):
+            assert self.bytesize == serial.EIGHTBITS
+            if self.baudrate <= self.working_baud_rate:
+                self.to_read += frames.UnNumberedAcknowledgmentFrame(
+                    address.HdlcAddress(16, None, "client"),
+                    address.HdlcAddress(1, None, "server"),
+                ).to_bytes()
+
+    @property
+    def in_waiting(self):
+        return len(self.to_read)
+
+    def read(self, size=1):
+        data = bytes(self.to_read[:size])
+        del self.to_read[:size]
+        return data
+
+    def read_until(self, expected, size=None):
+        end = self.to_read.find(expected)
+        end = len(self.to_read) if end == -1 else end + len(expected)
+        return self.read(min(end, size or end))
+
+
+class TestIdentificationMessage:
+    def test_from_bytes(self):
+        identification = iec62056_21.IdentificationMessage.from_bytes(IDENTIFICATION)
+        assert identification.manufacturer == "LGZ"
+        assert identification.identification == "ZMD3104407.B32"
+        assert identification.max_baud_rate == 19200
+        assert identification.supports_hdlc
+
+    def test_without_mode_e(self):
+        identification = iec62056_21.IdentificationMessage.from_bytes(
+            b"/ISk5ME162-0033\r\n"
+        )
+        assert identification.max_baud_rate == 9600
+        assert not identification.supports_hdlc
+
+    def test_to_bytes(self):
+        identification = iec62056_21.IdentificationMessage.from_bytes(IDENTIFICATION)
+        assert identification.to_bytes() == IDENTIFICATION
+
+    @pytest.mark.parametrize("in_bytes", [b"", b"/LGZ6\r", b"LGZ6ZMD\r\n"])
+    def test_invalid(self, in_bytes):
+        with pytest.raises(iec62056_21.SignOnError):
+            iec62056_21.IdentificationMessage.from_bytes(in_bytes)
+
+
+def test_request_message():
+    assert iec62056_21.request_message() == b"/?!\r\n"
+    assert iec62056_21.request_message("12345678") == b"/?12345678!\r\n"
+
+
+def test_acknowledgement_message():
+    assert iec62056_21.acknowledgement_message(9600) == b"\x06252\r\n"
+
+
+def test_select_baud_rate():
+    identification = iec62056_21.IdentificationMessage.from_bytes(IDENTIFICATION)
+    assert iec62056_21.select_baud_rate(identification, 115200) == 19200
+    assert iec62056_21.select_baud_rate(identification, 9600) == 9600
+    assert iec62056_21.select_baud_rate(identification, 5000) == 4800
+
+
+def test_lower_baud_rate():
+    assert iec62056_21.lower_baud_rate(19200) == 9600
+    assert iec62056_21.lower_baud_rate(300) is None
+
+
+class TestSignOn:
+    def test_switches_to_selected_baud_rate(self):
+        port = FakeOpticalPort()
+        assert optical.sign_on(port, "12345678", switch_delay=0) == 19200
+        assert port.written == [
+            (300, b"/?12345678!\r\n"),
+            (300, b"\x06262\r\n"),
+        ]
+        assert (port.baudrate, port.bytesize, port.parity) == (
+            19200,
+            serial.EIGHTBITS,
+            serial.PARITY_NONE,
+        )
+
+    def test_no_answer(self):
+        port = FakeOpticalPort(identification=b"")
+        with pytest.raises(iec62056_21.SignOnError):
+            optical.sign_on(port, switch_delay=0)
+
+    def test_meter_without_mode_e(self):
+        port = FakeOpticalPort(identification=b"/ISk5ME162-0033\r\n")
+        with pytest.raises(iec62056_21.SignOnError):
+            optical.sign_on(port, switch_delay=0)
+
+
+def make_client(port, cache):
+    return SerialHdlcClient(
+        client_logical_address=16,
+        server_logical_address=1,
+        serial_port="fake",
+        serial_baud_rate=19200,
+        max_retries=0,
+        optical_sign_on=True,
+        device_address="12345678",
+        baud_rate_cache=cache,
+        serial=port,
+    )
+
+
+@pytest.fixture
+def no_switch_delay(monkeypatch):
+    monkeypatch.setattr(optical.time, "sleep", lambda seconds: None)
+
+
+@pytest.mark.usefixtures("no_switch_delay")
+class TestClientSignOn:
+    def test_connect_caches_baud_rate(self):
+        cache = dict()
+        client = make_client(FakeOpticalPort(), cache)
+        client.connect()
+        assert client.hdlc_connection.state.current_state == state.IDLE
+        assert cache == {"12345678": 19200}
+
+    def test_failed_baud_rate_is_not_selected_again(self):
+        cache = dict()
+        port = FakeOpticalPort(working_baud_rate=9600)
+        with pytest.raises(exceptions.TransmissionFailed):
+            make_client(port, cache).connect()
+        assert cache == {"12345678": 9600}
+
+        client = make_client(port, cache)
+        client.connect()
+        assert client.hdlc_connection.state.current_state == state.IDLE
+        assert port.written[-2] == (300, b"\x06252\r\n")
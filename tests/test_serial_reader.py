@@ -0,0 +1,103 @@
+import pytest
+
+from dlms_cosem.clients import serial_reader
+from dlms_cosem.protocol.hdlc import address, connection, frames
+
+CLIENT_ADDRESS = address.HdlcAddress(16, None, "client")
+SERVER_ADDRESS = address.HdlcAddress(1, 17, "server")
+
+RESPONSE = frames.InformationFrame(
+    CLIENT_ADDRESS,
+    SERVER_ADDRESS,
+    bytes(200),
+    send_sequence_number=0,
+    receive_sequence_number=1,
+    response_frame=True,
+).to_bytes()
+
+
+class FakeSerial:
+    """
+    Serial port where the data is received in the given chunks. Only the first chunk
+    is waiting when a read starts, the next is received while blocked in the read.
+    """
+
+    def __init__(self, chunks, baudrate=9600):
+        self.chunks = list(chunks)
+        self.waiting = bytearray()
+        self.baudrate = baudrate
+        self.timeout = None
+        self.reads = list()
+
+    @property
+    def in_waiting(self):
+        return len(self.waiting)
+
+    def read(self, size):
+        self.reads.append((size, self.timeout))
+        while len(self.waiting) < size and self.chunks:
+            self.waiting += self.chunks.pop(0)
+        data = bytes(self.waiting[:size])
+        del self.waiting[:size]
+        return data
+
+
+@pytest.fixture
+def hdlc_connection():
+    hdlc_connection = connection.HdlcConnection(
+        client_address=CLIENT_ADDRESS, server_address=SERVER_ADDRESS
+    )
+    hdlc_connection.send(
+        frames.SetNormalResponseModeFrame(SERVER_ADDRESS, CLIENT_ADDRESS)
+    )
+    hdlc_connection.receive_data(
+        frames.UnNumberedAcknowledgmentFrame(CLIENT_ADDRESS, SERVER_ADDRESS).to_bytes()
+    )
+    hdlc_connection.next_event()
+    hdlc_connection.send(
+        frames.InformationFrame(
+            SERVER_ADDRESS,
+            CLIENT_ADDRESS,
+            b"\xc0",
+            send_sequence_number=0,
+            receive_sequence_number=0,
+        )
+    )
+    return hdlc_connection
+
+
+def test_transfer_time():
+    assert serial_reader.transfer_time(960, 9600) == pytest.approx(1)
+
+
+def test_frame_is_read_in_few_reads(hdlc_connection):
+    port = FakeSerial([RESPONSE[:10], RESPONSE[10:]])
+    reader = serial_reader.SerialFrameReader(port)
+
+    event = reader.next_event(hdlc_connection)
+
+    assert isinstance(event, frames.InformationFrame)
+    # The closing flag of the UA can be the opening flag of the response, so the
+    # first read is for the rest of the frame format field.
+    assert [size for size, _ in port.reads] == [2, 8, len(RESPONSE) - 10]
+
+
+def test_timeouts_from_baud_rate(hdlc_connection):
+    port = FakeSerial([RESPONSE[:3], RESPONSE[3:]], baudrate=9600)
+    reader = serial_reader.SerialFrameReader(
+        port, response_timeout=0.5, inter_character_timeout=0.05
+    )
+
+    reader.next_event(hdlc_connection)
+
+    (_, first_timeout), _, (_, header_timeout), _ = port.reads
+    assert first_timeout == pytest.approx(0.5 + 2 * 10 / 9600)
+    # The frame format field is received, the header is read before the rest.
+    header_bytes = connection.MAX_HEADER_LENGTH - 3
+    assert header_timeout == pytest.approx(0.05 + header_bytes * 10 / 9600)
+
+
+def test_no_response_raises_response_timeout(hdlc_connection):
+    reader = serial_reader.SerialFrameReader(FakeSerial([]))
+    with pytest.raises(serial_reader.ResponseTimeout):
+        reader.next_event(hdlc_connection)
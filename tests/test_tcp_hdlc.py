@@ -0,0 +1,235 @@
+import socket
+import threading
+
+import pytest
+
+from dlms_cosem.clients import tcp_hdlc
+from dlms_cosem.protocol.hdlc import batch, frames, state
+
+CLIENT_KWARGS = dict(
+    client_logical_address=16, server_logical_address=1, server_physical_address=17
+)
+
+
+class FakeGateway:
+    """
+    Accepts TCP connections and answers as a meter: UA to SNRM and DISC, and an I-frame
+    echoing the APDU of each I-frame. Counts the connections and received frames.
+    """
+
+    def __init__(self):
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.port = self.server.getsockname()[1]
+        self.accepted = 0
+        self.received = list()
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn):
+        parser = frames.HdlcFrameParser()
+        buffer = bytearray()
+        send_sequence_number = 0
+        with conn:
+            while True:
+                frame_list = batch.split_frames(bytes(buffer))
+                if not frame_list:
+                    data = conn.recv(1024)
+                    if not data:
+                        return
+                    buffer += data
+                    continue
+                frame = parser.parse(frame_list[0].tobytes())
+                del buffer[: len(frame_list[0])]
+                self.received.append(frame)
+                addresses = (frame.source_address, frame.destination_address)
+                if isinstance(frame, frames.InformationFrame):
+                    response = frames.InformationFrame(
+                        *addresses,
+                        frame.payload,
+                        send_sequence_number=send_sequence_number,
+                        receive_sequence_number=(frame.send_sequence_number + 1) % 8,
+                        response_frame=True,
+                    )
+                    send_sequence_number = (send_sequence_number + 1) % 8
+                else:
+                    response = frames.UnNumberedAcknowledgmentFrame(*addresses)
+                    send_sequence_number = 0
+                conn.sendall(response.to_bytes())
+
+    def count(self, frame_class):
+        return sum(isinstance(frame, frame_class) for frame in self.received)
+
+    def close(self):
+        self.server.close()
+
+
+@pytest.fixture
+def gateway():
+    gateway = FakeGateway()
+    yield gateway
+    gateway.close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_client_session(gateway):
+    with tcp_hdlc.TcpHdlcClient("127.0.0.1", gateway.port, **CLIENT_KWARGS) as client:
+        assert client.is_connected
+        assert client.send(b"\xc0\x01\xc1\x00") == b"\xc0\x01\xc1\x00"
+        assert client.send(b"\xc0\x01\xc2\x00") == b"\xc0\x01\xc2\x00"
+
+    assert client.hdlc_connection.state.current_state == state.NOT_CONNECTED
+    assert gateway.count(frames.DisconnectFrame) == 1
+
+
+def test_pool_reuses_connected_client(gateway):
+    pool = tcp_hdlc.TcpHdlcPool()
+    for _ in range(3):
+        with pool.client("127.0.0.1", gateway.port, **CLIENT_KWARGS) as client:
+            assert client.send(b"\xc0\x01\xc1\x00") == b"\xc0\x01\xc1\x00"
+
+    assert gateway.accepted == 1
+    assert gateway.count(frames.SetNormalResponseModeFrame) == 1
+    assert gateway.count(frames.InformationFrame) == 3
+    pool.close()
+
+
+def test_pool_separates_endpoints(gateway):
+    pool = tcp_hdlc.TcpHdlcPool()
+    with pool.client("127.0.0.1", gateway.port, **CLIENT_KWARGS) as first:
+        with pool.client(
+            "127.0.0.1", gateway.port, **dict(CLIENT_KWARGS, client_logical_address=32)
+        ) as second:
+            assert first is not second
+            assert second.hdlc_connection.client_address.logical_address == 32
+    pool.close()
+
+
+def test_pool_size_limit(gateway):
+    pool = tcp_hdlc.TcpHdlcPool(max_size=2)
+    first = pool.acquire("127.0.0.1", gateway.port, **CLIENT_KWARGS)
+    second = pool.acquire("127.0.0.1", gateway.port, **CLIENT_KWARGS)
+
+    with pytest.raises(tcp_hdlc.PoolTimeout):
+        pool.acquire("127.0.0.1", gateway.port, timeout=0.05, **CLIENT_KWARGS)
+
+    pool.release(first)
+    assert pool.acquire("127.0.0.1", gateway.port, timeout=0.05, **CLIENT_KWARGS) is (
+        first
+    )
+    pool.release(first)
+    pool.release(second)
+    pool.close()
+
+
+def test_pool_waiting_caller_gets_released_client(gateway):
+    pool = tcp_hdlc.TcpHdlcPool(max_size=1)
+    client = pool.acquire("127.0.0.1", gateway.port, **CLIENT_KWARGS)
+    threading.Timer(0.05, pool.release, args=(client,)).start()
+
+    assert pool.acquire("127.0.0.1", gateway.port, timeout=5, **CLIENT_KWARGS) is client
+    pool.release(client)
+    pool.close()
+
+
+def test_pool_closes_idle_clients(gateway):
+    clock = FakeClock()
+    pool = tcp_hdlc.TcpHdlcPool(max_idle_time=30, clock=clock)
+    with pool.client("127.0.0.1", gateway.port, **CLIENT_KWARGS) as client:
+        pass
+
+    clock.now = 31
+    pool.expire_idle()
+
+    assert not client.is_connected
+    assert gateway.count(frames.DisconnectFrame) == 1
+    with pool.client("127.0.0.1", gateway.port, **CLIENT_KWARGS) as new_client:
+        assert new_client is not client
+    assert gateway.accepted == 2
+    pool.close()
+
+
+def test_pool_discards_client_on_error(gateway):
+    pool = tcp_hdlc.TcpHdlcPool(max_size=1)
+    with pytest.raises(ValueError):
+        with pool.client("127.0.0.1", gateway.port, **CLIENT_KWARGS) as client:
+            raise ValueError()
+
+    with pool.client("127.0.0.1", gateway.port, timeout=0.05, **CLIENT_KWARGS) as new:
+        assert new is not client
+    pool.close()
+
+
+def test_pool_closes_client_released_after_close(gateway):
+    pool = tcp_hdlc.TcpHdlcPool()
+    client = pool.acquire("127.0.0.1", gateway.port, **CLIENT_KWARGS)
+    pool.close()
+    pool.release(client)
+
+    assert not client.is_connected
+    assert gateway.count(frames.DisconnectFrame) == 1
+
+
+def test_closed_pool_raises_on_acquire(gateway):
+    pool = tcp_hdlc.TcpHdlcPool()
+    pool.close()
+    with pytest.raises(tcp_hdlc.PoolClosed):
+        pool.acquire("127.0.0.1", gateway.port, **CLIENT_KWARGS)
+    assert gateway.accepted == 0
+
+
+def test_pool_expires_idle_clients_on_release(gateway):
+    clock = FakeClock()
+    pool = tcp_hdlc.TcpHdlcPool(max_idle_time=30, clock=clock)
+    first = pool.acquire("127.0.0.1", gateway.port, **CLIENT_KWARGS)
+    second = pool.acquire("127.0.0.1", gateway.port, **CLIENT_KWARGS)
+    pool.release(first)
+
+    clock.now = 31
+    pool.release(second)
+
+    assert not first.is_connected
+    assert second.is_connected
+    pool.close()
+
+
+def test_pool_disconnects_idle_clients_without_holding_the_lock(gateway):
+    clock = FakeClock()
+    pool = tcp_hdlc.TcpHdlcPool(max_idle_time=30, clock=clock)
+    locked_while_disconnecting = list()
+
+    def try_lock():
+        acquired = pool._condition.acquire(blocking=False)
+        if acquired:
+            pool._condition.release()
+        locked_while_disconnecting.append(not acquired)
+
+    class Client(tcp_hdlc.TcpHdlcClient):
+        def disconnect(self):
+            # The lock is reentrant, so try to take it from another thread.
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+            return super().disconnect()
+
+    pool.client_factory = Client
+    with pool.client("127.0.0.1", gateway.port, **CLIENT_KWARGS):
+        pass
+    clock.now = 31
+    pool.expire_idle()
+
+    assert locked_while_disconnecting == [False]